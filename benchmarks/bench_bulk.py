@@ -0,0 +1,90 @@
+"""
+Loading heroes with N single POST /heroes/ requests vs one POST /heroes/bulk.
+
+Usage:
+    python -m benchmarks.bench_bulk --rows 2000
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from benchmarks.common import print_table, temporary_database_url, write_json
+from src.database import SQLITE_PROFILES, get_engine
+from src.dependencies import get_session_factory
+from src.main import app
+from src.security.basic import get_current_username
+
+
+async def load(rows: int, bulk: bool) -> float:
+    with temporary_database_url() as url:
+        engine = get_engine(url, profile=SQLITE_PROFILES["production"])
+        async with engine.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.create_all)
+
+        app.dependency_overrides[get_session_factory] = lambda: async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+        # Authentication is not what is measured here.
+        app.dependency_overrides[get_current_username] = lambda: "bench"
+        heroes = [
+            {"name": f"Hero {i}", "secret_name": f"Secret {i}", "age": 30}
+            for i in range(rows)
+        ]
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://b"
+        ) as client:
+            started = time.perf_counter()
+            if bulk:
+                response = await client.post("/heroes/bulk", json=heroes)
+                response.raise_for_status()
+            else:
+                for hero in heroes:
+                    response = await client.post("/heroes/", json=hero)
+                    response.raise_for_status()
+            elapsed = time.perf_counter() - started
+        app.dependency_overrides.clear()
+        await engine.dispose()
+    return elapsed
+
+
+async def run(rows: int) -> dict:
+    results = []
+    for mode, bulk in (("single", False), ("bulk", True)):
+        seconds = await load(rows, bulk)
+        results.append(
+            {
+                "mode": mode,
+                "rows": rows,
+                "seconds": round(seconds, 3),
+                "rows_per_second": round(rows / seconds, 1),
+            }
+        )
+    return {"benchmark": "bulk", "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.rows))
+    print_table(
+        ["mode", "rows", "seconds", "rows/s"],
+        [
+            [r["mode"], r["rows"], r["seconds"], r["rows_per_second"]]
+            for r in report["results"]
+        ],
+    )
+    write_json(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,557 @@
+"""
+Mixed read/write load against every hero and team route, at fixed concurrency.
+
+Seeds ``heroes`` heroes spread over ``teams`` teams, then lets ``concurrency``
+clients send ``requests`` requests drawn from a weighted workload (``read``,
+``mixed`` or ``write``) covering every route of src/routers/heroes.py and
+src/routers/teams.py. Requests, and the ids and payloads they use, are drawn
+from ``--seed``, so two runs send the same requests in the same order per
+client. Deletes only target rows the run created, so reads keep hitting the
+seeded data.
+
+By default the app runs in process through httpx's ASGI transport on a
+temporary database. With ``--url`` the load goes to a running server instead,
+e.g. one started with ``CRUD_DATABASE_NAME=bench uvicorn src.main:app``; the
+data is then seeded through the bulk endpoints.
+
+The report has throughput and latency percentiles overall and per operation.
+Written with ``--json``, it can be compared to an earlier one with ``--baseline``
+to spot regressions between commits.
+
+Usage:
+    python -m benchmarks.bench_load --heroes 10000 --concurrency 16 --requests 5000
+    python -m benchmarks.bench_load --json after.json --baseline before.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from collections import Counter
+from collections.abc import Callable
+from pathlib import Path
+from typing import NamedTuple
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from benchmarks.common import (
+    print_table,
+    seed,
+    summarize,
+    temporary_database_url,
+    write_json,
+)
+from src.cache import cache
+from src.crud.bulk import MAX_BULK_ITEMS
+from src.crud.user import create_user
+from src.database import SQLITE_PROFILES, create_db_and_tables, get_engine
+from src.dependencies import get_session_factory
+from src.main import app
+from src.models.user import UserCreate
+from src.security.basic import credential_cache
+
+# Rows written by one bulk or import request of the workload.
+BATCH_SIZE = 20
+# Seeded heroes have ids 1..N: list pages are drawn from the first ones.
+MAX_LIST_OFFSET = 1000
+
+
+class Request(NamedTuple):
+    method: str
+    url: str
+    params: dict | None = None
+    json: object = None
+    content: bytes | None = None
+
+
+class LoadState:
+    """
+    Ids known to the clients: the seeded rows, and the rows the run created and
+    has not deleted yet.
+    """
+
+    def __init__(self, hero_ids: list[int], team_ids: list[int]) -> None:
+        self.hero_ids = hero_ids
+        self.team_ids = team_ids
+        self.created_heroes: list[int] = []
+        self.created_teams: list[int] = []
+
+
+class Operation(NamedTuple):
+    name: str
+    build: Callable[[LoadState, random.Random], Request | None]
+    # Besides these, any status is counted as an error.
+    ok: frozenset[int] = frozenset({200})
+    # Called with the response of a successful request.
+    record: Callable[[LoadState, httpx.Response], None] | None = None
+
+
+def _hero(rng: random.Random, state: LoadState) -> dict:
+    return {
+        "name": f"Load Hero {rng.getrandbits(48):012x}",
+        "secret_name": "Load",
+        "age": rng.randint(18, 77),
+        "team_id": rng.choice(state.team_ids) if state.team_ids else None,
+    }
+
+
+def _team(rng: random.Random) -> dict:
+    return {
+        "name": f"Load Team {rng.getrandbits(48):012x}",
+        "headquarters": f"City {rng.randrange(97)}",
+    }
+
+
+def _ndjson(rows: list[dict]) -> bytes:
+    return b"".join(json.dumps(row).encode() + b"\n" for row in rows)
+
+
+def _age_filter(min_age: int) -> Request:
+    return Request(
+        "GET", "/heroes/", params={"min_age": min_age, "max_age": min_age + 5}
+    )
+
+
+def _pop(ids: list[int], rng: random.Random) -> int | None:
+    return ids.pop(rng.randrange(len(ids))) if ids else None
+
+
+def _delete(path: str, ids: Callable[[LoadState], list[int]]):
+    def build(state: LoadState, rng: random.Random) -> Request | None:
+        row_id = _pop(ids(state), rng)
+        return None if row_id is None else Request("DELETE", f"{path}{row_id}")
+
+    return build
+
+
+def _created(ids: Callable[[LoadState], list[int]]):
+    def record(state: LoadState, response: httpx.Response) -> None:
+        ids(state).append(response.json()["id"])
+
+    return record
+
+
+OPERATIONS = {
+    operation.name: operation
+    for operation in (
+        Operation(
+            "list_heroes",
+            lambda state, rng: Request(
+                "GET",
+                "/heroes/",
+                params={"limit": 20, "offset": rng.randrange(MAX_LIST_OFFSET)},
+            ),
+        ),
+        Operation(
+            "filter_heroes",
+            lambda state, rng: _age_filter(rng.randint(18, 70)),
+        ),
+        Operation(
+            "get_hero",
+            lambda state, rng: Request("GET", f"/heroes/{rng.choice(state.hero_ids)}"),
+        ),
+        Operation("export_heroes", lambda state, rng: Request("GET", "/heroes/export")),
+        Operation(
+            "create_hero",
+            lambda state, rng: Request("POST", "/heroes/", json=_hero(rng, state)),
+            ok=frozenset({201}),
+            record=_created(lambda state: state.created_heroes),
+        ),
+        Operation(
+            "bulk_heroes",
+            lambda state, rng: Request(
+                "POST",
+                "/heroes/bulk",
+                json=[_hero(rng, state) for _ in range(BATCH_SIZE)],
+            ),
+        ),
+        Operation(
+            "import_heroes",
+            lambda state, rng: Request(
+                "POST",
+                "/heroes/import",
+                content=_ndjson([_hero(rng, state) for _ in range(BATCH_SIZE)]),
+            ),
+        ),
+        Operation(
+            "update_hero",
+            lambda state, rng: Request(
+                "PATCH",
+                f"/heroes/{rng.choice(state.hero_ids)}",
+                json={"age": rng.randint(18, 77)},
+            ),
+        ),
+        Operation(
+            "delete_hero",
+            _delete("/heroes/", lambda state: state.created_heroes),
+            ok=frozenset({204}),
+        ),
+        Operation(
+            "list_teams",
+            lambda state, rng: Request(
+                "GET",
+                "/teams/",
+                params={"limit": 10, "offset": rng.randrange(len(state.team_ids))},
+            ),
+        ),
+        Operation(
+            "get_team",
+            lambda state, rng: Request("GET", f"/teams/{rng.choice(state.team_ids)}"),
+        ),
+        Operation(
+            "team_stats",
+            lambda state, rng: Request(
+                "GET", f"/teams/{rng.choice(state.team_ids)}/stats"
+            ),
+        ),
+        Operation("export_teams", lambda state, rng: Request("GET", "/teams/export")),
+        Operation(
+            "create_team",
+            lambda state, rng: Request("POST", "/teams/", json=_team(rng)),
+            ok=frozenset({201}),
+            record=_created(lambda state: state.created_teams),
+        ),
+        Operation(
+            "bulk_teams",
+            lambda state, rng: Request(
+                "POST", "/teams/bulk", json=[_team(rng) for _ in range(BATCH_SIZE)]
+            ),
+        ),
+        Operation(
+            "import_teams",
+            lambda state, rng: Request(
+                "POST",
+                "/teams/import",
+                content=_ndjson([_team(rng) for _ in range(BATCH_SIZE)]),
+            ),
+        ),
+        Operation(
+            "update_team",
+            lambda state, rng: Request(
+                "PATCH",
+                f"/teams/{rng.choice(state.team_ids)}",
+                json={"headquarters": f"City {rng.randrange(97)}"},
+            ),
+        ),
+        Operation(
+            "delete_team",
+            _delete("/teams/", lambda state: state.created_teams),
+            ok=frozenset({204}),
+        ),
+    )
+}
+
+# Relative weights of the operations. Exports stream whole tables, so they are rare.
+WORKLOADS = {
+    "read": {
+        "list_heroes": 20,
+        "filter_heroes": 5,
+        "get_hero": 35,
+        "export_heroes": 0.05,
+        "list_teams": 10,
+        "get_team": 20,
+        "team_stats": 10,
+        "export_teams": 0.05,
+    },
+    "mixed": {
+        "list_heroes": 16,
+        "filter_heroes": 4,
+        "get_hero": 28,
+        "export_heroes": 0.05,
+        "create_hero": 5,
+        "bulk_heroes": 1,
+        "import_heroes": 0.5,
+        "update_hero": 4,
+        "delete_hero": 2,
+        "list_teams": 8,
+        "get_team": 16,
+        "team_stats": 8,
+        "export_teams": 0.05,
+        "create_team": 2,
+        "bulk_teams": 0.5,
+        "import_teams": 0.25,
+        "update_team": 2,
+        "delete_team": 1,
+    },
+    "write": {
+        "get_hero": 10,
+        "get_team": 5,
+        "create_hero": 25,
+        "bulk_heroes": 5,
+        "import_heroes": 2,
+        "update_hero": 20,
+        "delete_hero": 10,
+        "create_team": 8,
+        "bulk_teams": 2,
+        "import_teams": 1,
+        "update_team": 8,
+        "delete_team": 4,
+    },
+}
+
+
+def schedule(workload: str, requests: int, seed_value: int) -> list[str]:
+    """
+    Draw the sequence of operations sent by the run.
+    """
+    weights = WORKLOADS[workload]
+    rng = random.Random(seed_value)
+    return rng.choices(list(weights), weights=list(weights.values()), k=requests)
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    state: LoadState,
+    operations: list[str],
+    concurrency: int,
+    seed_value: int,
+) -> tuple[dict[str, list[float]], dict[str, Counter], float]:
+    """
+    Send ``operations`` from ``concurrency`` clients; client ``c`` sends those at
+    positions ``c``, ``c + concurrency``, ...
+
+    Returns:
+        The latencies (ms) and statuses per operation, and the wall time.
+    """
+    durations = {name: [] for name in OPERATIONS}
+    statuses = {name: Counter() for name in OPERATIONS}
+
+    async def run_client(index: int) -> None:
+        for position in range(index, len(operations), concurrency):
+            operation = OPERATIONS[operations[position]]
+            rng = random.Random(seed_value * 1_000_003 + position)
+            request = operation.build(state, rng)
+            if request is None:
+                # Nothing created yet to delete; read a seeded row instead.
+                operation = OPERATIONS["get_hero"]
+                request = operation.build(state, rng)
+            started = time.perf_counter()
+            response = await client.request(
+                request.method,
+                request.url,
+                params=request.params,
+                json=request.json,
+                content=request.content,
+            )
+            durations[operation.name].append((time.perf_counter() - started) * 1000)
+            statuses[operation.name][response.status_code] += 1
+            if response.status_code in operation.ok and operation.record:
+                operation.record(state, response)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_client(index) for index in range(concurrency)))
+    return durations, statuses, time.perf_counter() - started
+
+
+async def seed_over_http(
+    client: httpx.AsyncClient, heroes: int, teams: int
+) -> LoadState:
+    """
+    Seed a running server through the bulk endpoints.
+    """
+    team_ids, hero_ids = [], []
+    for start in range(0, teams, MAX_BULK_ITEMS):
+        batch = [
+            {"name": f"Team {i:07d}", "headquarters": f"City {i % 97}"}
+            for i in range(start, min(start + MAX_BULK_ITEMS, teams))
+        ]
+        response = await client.post("/teams/bulk", json=batch, timeout=None)
+        response.raise_for_status()
+        team_ids += [result["id"] for result in response.json()]
+    for start in range(0, heroes, MAX_BULK_ITEMS):
+        batch = [
+            {
+                "name": f"Hero {i:07d}",
+                "secret_name": f"Secret {i:07d}",
+                "age": 18 + i % 60,
+                "team_id": team_ids[i % len(team_ids)] if team_ids else None,
+            }
+            for i in range(start, min(start + MAX_BULK_ITEMS, heroes))
+        ]
+        response = await client.post("/heroes/bulk", json=batch, timeout=None)
+        response.raise_for_status()
+        hero_ids += [result["id"] for result in response.json()]
+    return LoadState(hero_ids, team_ids)
+
+
+def report_rows(
+    durations: dict[str, list[float]], statuses: dict[str, Counter], seconds: float
+) -> tuple[dict, list[dict]]:
+    """
+    Summarize the run overall and per operation.
+    """
+    operations = []
+    for name, operation in OPERATIONS.items():
+        if not durations[name]:
+            continue
+        errors = sum(
+            count
+            for status, count in statuses[name].items()
+            if status not in operation.ok
+        )
+        operations.append(
+            {
+                "operation": name,
+                **summarize(durations[name]),
+                "throughput_rps": round(len(durations[name]) / seconds, 1),
+                "errors": errors,
+                "statuses": {str(status): n for status, n in statuses[name].items()},
+            }
+        )
+    everything = [duration for name in OPERATIONS for duration in durations[name]]
+    overall = {
+        **summarize(everything),
+        "throughput_rps": round(len(everything) / seconds, 1),
+        "errors": sum(operation["errors"] for operation in operations),
+    }
+    return overall, operations
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> dict:
+    operations = schedule(args.workload, args.requests, args.seed)
+    warmup = schedule(args.workload, args.warmup, args.seed + 1)
+    auth = (args.user, args.password)
+    if args.url:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(
+            base_url=args.url, auth=auth, limits=limits, timeout=60
+        ) as client:
+            state = await seed_over_http(client, args.heroes, args.teams)
+            await drive(client, state, warmup, args.concurrency, args.seed + 1)
+            measured = await drive(
+                client, state, operations, args.concurrency, args.seed
+            )
+    else:
+        with temporary_database_url() as url:
+            engine = get_engine(url, profile=SQLITE_PROFILES["production"])
+            await create_db_and_tables(engine)
+            await seed(engine, heroes=args.heroes, teams=args.teams)
+            factory = async_sessionmaker(
+                engine, class_=AsyncSession, expire_on_commit=False
+            )
+            async with factory() as session:
+                await create_user(
+                    UserCreate(username=args.user, password=args.password), session
+                )
+                await session.commit()
+            app.dependency_overrides[get_session_factory] = lambda: factory
+            await cache.clear()
+            credential_cache.clear()
+            state = LoadState(
+                list(range(1, args.heroes + 1)), list(range(1, args.teams + 1))
+            )
+            # Report server errors (e.g. "database is locked") as 500s.
+            transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://b", auth=auth, timeout=60
+            ) as client:
+                await drive(client, state, warmup, args.concurrency, args.seed + 1)
+                measured = await drive(
+                    client, state, operations, args.concurrency, args.seed
+                )
+            app.dependency_overrides.clear()
+            await engine.dispose()
+    overall, per_operation = report_rows(*measured)
+    return {
+        "benchmark": "load",
+        "commit": git_commit(),
+        "target": args.url or "asgi",
+        "workload": args.workload,
+        "heroes": args.heroes,
+        "teams": args.teams,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "seed": args.seed,
+        "seconds": round(measured[2], 3),
+        "overall": overall,
+        "operations": per_operation,
+    }
+
+
+def compare(report: dict, baseline: dict) -> None:
+    """
+    Print the change of throughput and p99 per operation against ``baseline``.
+    """
+    before = {row["operation"]: row for row in baseline["operations"]}
+    before["overall"] = {"operation": "overall", **baseline["overall"]}
+    rows = []
+    for row in [{"operation": "overall", **report["overall"]}, *report["operations"]]:
+        old = before.get(row["operation"])
+        if old is None:
+            continue
+        rows.append(
+            [
+                row["operation"],
+                old["throughput_rps"],
+                row["throughput_rps"],
+                f"{(row['throughput_rps'] / old['throughput_rps'] - 1) * 100:+.1f}%",
+                old["p99_ms"],
+                row["p99_ms"],
+                f"{(row['p99_ms'] / old['p99_ms'] - 1) * 100:+.1f}%",
+            ]
+        )
+    print(f"\nagainst {baseline.get('commit') or 'baseline'}:")
+    print_table(
+        ["operation", "req/s before", "req/s", "change", "p99 before", "p99", "change"],
+        rows,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--heroes", type=int, default=10_000)
+    parser.add_argument("--teams", type=int, help="Defaults to one per 10 heroes")
+    parser.add_argument("--workload", choices=list(WORKLOADS), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--url", help="Load a running server instead of the ASGI app")
+    parser.add_argument("--user", default="saber")
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare with the JSON of an earlier run")
+    args = parser.parse_args()
+    if args.teams is None:
+        args.teams = max(1, args.heroes // 10)
+
+    report = asyncio.run(run(args))
+    print_table(
+        ["operation", "requests", "errors", "req/s", "p50 ms", "p95 ms", "p99 ms"],
+        [
+            [
+                row["operation"],
+                row["count"],
+                row["errors"],
+                row["throughput_rps"],
+                row["p50_ms"],
+                row["p95_ms"],
+                row["p99_ms"],
+            ]
+            for row in [{"operation": "overall", **report["overall"]}]
+            + report["operations"]
+        ],
+    )
+    write_json(args.json, report)
+    if args.baseline:
+        compare(report, json.loads(Path(args.baseline).read_text()))
+
+
+if __name__ == "__main__":
+    main()
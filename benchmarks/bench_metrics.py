@@ -0,0 +1,104 @@
+"""
+Overhead of the request metrics middleware on a list endpoint.
+
+Seeds heroes spread over teams, then requests GET /teams/?limit=20 ``repeat``
+times through the app alone and through MetricsMiddleware wrapped around it,
+alternating rounds so that both modes see the same warm caches. The app is
+imported with CRUD_METRICS_ENABLED=false so the bare mode really is bare; the
+route and SQL hooks stay registered in both modes, and only find no timing to
+update in the bare one.
+
+Usage:
+    python -m benchmarks.bench_metrics --repeat 2000
+"""
+
+import os
+
+os.environ["CRUD_METRICS_ENABLED"] = "false"
+
+import argparse
+import asyncio
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from benchmarks.common import (
+    create_schema,
+    measure,
+    print_table,
+    seed,
+    summarize,
+    temporary_database_url,
+    write_json,
+)
+from src.dependencies import get_session_factory
+from src.main import app
+from src.metrics import MetricsMiddleware, RequestMetrics
+from src.security.basic import get_current_username
+
+
+async def run(heroes: int, teams: int, repeat: int, rounds: int = 5) -> dict:
+    durations = {"bare": [], "metrics": []}
+    with temporary_database_url() as url:
+        engine = await create_schema(url)
+        await seed(engine, heroes=heroes, teams=teams)
+        app.dependency_overrides[get_session_factory] = lambda: async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+        # Authentication is not what is measured here.
+        app.dependency_overrides[get_current_username] = lambda: "bench"
+        apps = {"bare": app, "metrics": MetricsMiddleware(app, RequestMetrics())}
+        clients = {
+            mode: httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=asgi_app), base_url="http://b"
+            )
+            for mode, asgi_app in apps.items()
+        }
+        for _ in range(rounds):
+            for mode, client in clients.items():
+
+                async def list_teams(client=client):
+                    response = await client.get("/teams/", params={"limit": 20})
+                    response.raise_for_status()
+
+                durations[mode] += await measure(list_teams, repeat // rounds)
+        for client in clients.values():
+            await client.aclose()
+        app.dependency_overrides.clear()
+        await engine.dispose()
+    results = [{"mode": mode, **summarize(durations[mode])} for mode in durations]
+    bare, metrics = results
+    return {
+        "benchmark": "metrics",
+        "heroes": heroes,
+        "teams": teams,
+        "results": results,
+        "overhead_percent": round(
+            (metrics["mean_ms"] - bare["mean_ms"]) / bare["mean_ms"] * 100, 2
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--heroes", type=int, default=2000)
+    parser.add_argument("--teams", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.heroes, args.teams, args.repeat))
+    print_table(
+        ["mode", "requests", "mean ms", "p50 ms", "p99 ms"],
+        [
+            [r["mode"], r["count"], r["mean_ms"], r["p50_ms"], r["p99_ms"]]
+            for r in report["results"]
+        ],
+    )
+    print(f"overhead: {report['overhead_percent']}%")
+    write_json(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
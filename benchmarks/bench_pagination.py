@@ -0,0 +1,123 @@
+"""
+Page latency of offset pagination vs keyset (cursor) pagination for get_heroes.
+
+Seeds ``pages * page_size`` heroes, then times fetching page 1, 10, 100, ...
+up to ``pages`` both ways. Offset latency grows with the page number because
+SQLite walks and discards every skipped row; cursor latency stays flat.
+
+Usage:
+    python -m benchmarks.bench_pagination --pages 10000 --page-size 100
+"""
+
+import argparse
+import asyncio
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from benchmarks.common import (
+    create_schema,
+    measure,
+    print_table,
+    seed,
+    summarize,
+    temporary_database_url,
+    write_json,
+)
+from src.crud.hero import get_heroes
+from src.crud.loading import LoadStrategy
+from src.crud.pagination import Cursor, encode_cursor
+from src.models.hero import Hero
+
+
+def probe_pages(pages: int) -> list[int]:
+    probes, page = [], 1
+    while page < pages:
+        probes.append(page)
+        page *= 10
+    return probes + [pages]
+
+
+async def cursor_before(
+    session: AsyncSession, order_by: str, offset: int
+) -> str | None:
+    """Cursor pointing at the row just before ``offset`` (computed untimed)."""
+    if offset == 0:
+        return None
+    column = getattr(Hero, order_by)
+    statement = select(Hero).order_by(column, Hero.id).offset(offset - 1).limit(1)
+    last = (await session.exec(statement)).one()
+    return encode_cursor(
+        Cursor(key=order_by, value=getattr(last, order_by), id=last.id)
+    )
+
+
+async def run(pages: int, page_size: int, order_by: str, repeat: int) -> dict:
+    results = []
+    with temporary_database_url() as url:
+        engine = await create_schema(url)
+        await seed(engine, heroes=pages * page_size)
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            for page in probe_pages(pages):
+                offset = (page - 1) * page_size
+                cursor = await cursor_before(session, order_by, offset)
+
+                async def by_offset(offset=offset):
+                    await get_heroes(
+                        session=session,
+                        offset=offset,
+                        limit=page_size,
+                        load=LoadStrategy.NONE,
+                        order_by=order_by,
+                    )
+                    session.expunge_all()
+
+                async def by_cursor(cursor=cursor):
+                    await get_heroes(
+                        session=session,
+                        limit=page_size,
+                        load=LoadStrategy.NONE,
+                        order_by=order_by,
+                        cursor=cursor,
+                    )
+                    session.expunge_all()
+
+                results.append(
+                    {
+                        "page": page,
+                        "offset": summarize(await measure(by_offset, repeat)),
+                        "cursor": summarize(await measure(by_cursor, repeat)),
+                    }
+                )
+        await engine.dispose()
+    return {
+        "benchmark": "pagination",
+        "rows": pages * page_size,
+        "page_size": page_size,
+        "order_by": order_by,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=10_000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--order-by", choices=["id", "name", "age"], default="id")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.pages, args.page_size, args.order_by, args.repeat))
+    print_table(
+        ["page", "offset p50 ms", "cursor p50 ms"],
+        [
+            [row["page"], row["offset"]["p50_ms"], row["cursor"]["p50_ms"]]
+            for row in report["results"]
+        ],
+    )
+    write_json(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
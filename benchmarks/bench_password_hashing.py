@@ -0,0 +1,168 @@
+"""
+Latency of unrelated GETs while a burst of hero creations hashes passwords.
+
+Seeds a few heroes, then keeps requesting GET /heroes/?limit=20 one after the
+other: first alone, then while ``burst`` concurrent POST /heroes/ with a password
+are in flight, once with the scrypt hashes on the bounded worker pool and once
+with the same hashes run inline on the event loop. On the pool the GET
+percentiles stay close to the idle ones; inline, every GET waits behind the
+hashes queued on the loop. Creations turned away with 503, and those that failed
+otherwise, are counted.
+
+Usage:
+    python -m benchmarks.bench_password_hashing --burst 200
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import src.crud.hero
+from benchmarks.common import (
+    create_schema,
+    print_table,
+    seed,
+    summarize,
+    temporary_database_url,
+    write_json,
+)
+from src.dependencies import get_session_factory
+from src.main import app
+from src.security.basic import get_current_username
+from src.security.passwords import PasswordHasher
+from src.settings import get_settings
+
+
+class InlineHasher(PasswordHasher):
+    """Hashes on the calling thread: what a KDF call inside create_hero would do."""
+
+    async def _run(self, function, *args):
+        return function(*args)
+
+
+async def probe(client: httpx.AsyncClient, until: asyncio.Event) -> list[float]:
+    """Time GET /heroes/ back to back until ``until`` is set."""
+    durations = []
+    while not until.is_set():
+        started = time.perf_counter()
+        response = await client.get("/heroes/", params={"limit": 20})
+        response.raise_for_status()
+        durations.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0)
+    return durations
+
+
+async def scenario(client: httpx.AsyncClient, burst: int, idle_seconds: float) -> dict:
+    done = asyncio.Event()
+    probing = asyncio.create_task(probe(client, done))
+    started = time.perf_counter()
+    if burst:
+        responses = await asyncio.gather(
+            *(
+                client.post(
+                    "/heroes/",
+                    json={"name": f"Burst {i}", "secret_name": "B", "password": "pw"},
+                )
+                for i in range(burst)
+            )
+        )
+    else:
+        responses = []
+        await asyncio.sleep(idle_seconds)
+    seconds = time.perf_counter() - started
+    done.set()
+    durations = await probing
+    return {
+        "seconds": round(seconds, 3),
+        "created": sum(response.status_code == 201 for response in responses),
+        "rejected": sum(response.status_code == 503 for response in responses),
+        "failed": sum(
+            response.status_code >= 500 and response.status_code != 503
+            for response in responses
+        ),
+        "get": summarize(durations),
+    }
+
+
+async def run(burst: int) -> dict:
+    settings = get_settings()
+    pooled = src.crud.hero.hasher
+    inline = InlineHasher(
+        workers=1,
+        n=settings.password_hash_n,
+        r=settings.password_hash_r,
+        p=settings.password_hash_p,
+    )
+    results = []
+    with temporary_database_url() as url:
+        engine = await create_schema(url)
+        await seed(engine, heroes=1000, teams=10)
+        app.dependency_overrides[get_session_factory] = lambda: async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+        # Authentication is not what is measured here.
+        app.dependency_overrides[get_current_username] = lambda: "bench"
+        # Report server errors (e.g. "database is locked") as 500s, not exceptions.
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://b"
+        ) as client:
+            idle = await scenario(client, burst=0, idle_seconds=2.0)
+            results.append({"mode": "idle", **idle})
+            for mode, hasher in (("pool", pooled), ("inline", inline)):
+                src.crud.hero.hasher = hasher
+                results.append({"mode": mode, **await scenario(client, burst, 0)})
+            src.crud.hero.hasher = pooled
+        app.dependency_overrides.clear()
+        await engine.dispose()
+    return {
+        "benchmark": "password_hashing",
+        "burst": burst,
+        "workers": pooled.workers,
+        "max_pending": pooled.max_pending,
+        "cost": pooled.cost,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--burst", type=int, default=200)
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.burst))
+    print_table(
+        [
+            "mode",
+            "seconds",
+            "created",
+            "503",
+            "500",
+            "GETs",
+            "GET p50 ms",
+            "GET p99 ms",
+        ],
+        [
+            [
+                row["mode"],
+                row["seconds"],
+                row["created"],
+                row["rejected"],
+                row["failed"],
+                row["get"]["count"],
+                row["get"]["p50_ms"],
+                row["get"]["p99_ms"],
+            ]
+            for row in report["results"]
+        ],
+    )
+    write_json(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Latency of the full-text search against a LIKE '%term%' scan of the hero table.
+
+Seeds ``heroes`` heroes and ``heroes // 10`` teams (kept in sync with their FTS5
+indexes by the triggers), then times a few searches through
+``src.crud.search.search`` and the equivalent ``LIKE`` query. The search cost
+follows the number of matches; the ``LIKE`` scan reads every row.
+
+Usage:
+    python -m benchmarks.bench_search --heroes 1000000
+"""
+
+import argparse
+import asyncio
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from benchmarks.common import (
+    create_schema,
+    measure,
+    print_table,
+    seed,
+    summarize,
+    temporary_database_url,
+    write_json,
+)
+from src.crud.search import search
+from src.models.hero import Hero
+
+
+def queries(heroes: int) -> list[tuple[str, str]]:
+    """
+    Return (label, query) pairs from a unique token down to a frequent prefix.
+    """
+    middle = f"{heroes // 2:07d}"
+    return [
+        ("unique number", middle),
+        ("name and number", f"hero {middle}"),
+        ("prefix, ~100 matches", middle[:5]),
+        ("secret name and prefix", f"secret {middle[:5]}"),
+    ]
+
+
+async def run(heroes: int, repeat: int) -> dict:
+    results = []
+    with temporary_database_url() as url:
+        engine = await create_schema(url)
+        await seed(engine, heroes=heroes, teams=max(1, heroes // 10))
+        async with AsyncSession(engine) as session:
+            for label, query in queries(heroes):
+                found = await search(query=query, limit=20, session=session)
+
+                async def by_index(query=query):
+                    await search(query=query, limit=20, session=session)
+
+                async def by_scan(query=query):
+                    await session.exec(
+                        select(Hero.id)
+                        .where(Hero.name.contains(query.split()[-1]))
+                        .limit(20)
+                    )
+
+                results.append(
+                    {
+                        "query": label,
+                        "q": query,
+                        "results": len(found),
+                        "search": summarize(await measure(by_index, repeat)),
+                        "like": summarize(await measure(by_scan, repeat)),
+                    }
+                )
+        await engine.dispose()
+    return {"benchmark": "search", "heroes": heroes, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--heroes", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.heroes, args.repeat))
+    print_table(
+        ["query", "q", "results", "search p50 ms", "search p95 ms", "LIKE p50 ms"],
+        [
+            [
+                row["query"],
+                row["q"],
+                row["results"],
+                row["search"]["p50_ms"],
+                row["search"]["p95_ms"],
+                row["like"]["p50_ms"],
+            ]
+            for row in report["results"]
+        ],
+    )
+    write_json(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
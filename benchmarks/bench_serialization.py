@@ -0,0 +1,119 @@
+"""
+List endpoint throughput with response_model serialization vs the fast path.
+
+Seeds heroes spread over teams, then pages through GET /heroes/ and GET /teams/
+with keyset cursors, once through FastAPI's response_model (ORM objects
+revalidated as HeroPublicWithTeam / TeamPublicWithHeroes) and once with
+CRUD_FAST_SERIALIZATION (plain rows encoded straight to JSON). The bodies of
+both modes are compared byte for byte.
+
+Usage:
+    python -m benchmarks.bench_serialization --heroes 20000 --teams 200
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from benchmarks.common import (
+    create_schema,
+    print_table,
+    seed,
+    temporary_database_url,
+    write_json,
+)
+from src.cache import cache
+from src.dependencies import get_session_factory
+from src.main import app
+from src.security.basic import get_current_username
+from src.settings import Settings, get_settings
+
+
+async def page_through(
+    client: httpx.AsyncClient, path: str, page_size: int
+) -> tuple[int, float, list[bytes]]:
+    """Fetch every page of ``path``; return rows, seconds and the bodies."""
+    rows, bodies, params = 0, [], {"limit": page_size}
+    started = time.perf_counter()
+    while True:
+        response = await client.get(path, params=params)
+        response.raise_for_status()
+        bodies.append(response.content)
+        rows += len(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params = {"limit": page_size, "cursor": cursor}
+    return rows, time.perf_counter() - started, bodies
+
+
+async def run(heroes: int, teams: int, page_size: int) -> dict:
+    results = []
+    with temporary_database_url() as url:
+        engine = await create_schema(url)
+        await seed(engine, heroes=heroes, teams=teams)
+        app.dependency_overrides[get_session_factory] = lambda: async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+        # Authentication is not what is measured here.
+        app.dependency_overrides[get_current_username] = lambda: "bench"
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://b"
+        ) as client:
+            for path in ("/heroes/", "/teams/"):
+                bodies_by_mode = {}
+                for mode, fast in (("response_model", False), ("fast", True)):
+                    app.dependency_overrides[get_settings] = lambda fast=fast: Settings(
+                        fast_serialization=fast
+                    )
+                    await cache.clear()
+                    rows, seconds, bodies = await page_through(client, path, page_size)
+                    bodies_by_mode[mode] = bodies
+                    results.append(
+                        {
+                            "path": path,
+                            "mode": mode,
+                            "rows": rows,
+                            "seconds": round(seconds, 3),
+                            "rows_per_second": round(rows / seconds, 1),
+                        }
+                    )
+                if bodies_by_mode["fast"] != bodies_by_mode["response_model"]:
+                    raise AssertionError(f"{path}: fast path output differs")
+        app.dependency_overrides.clear()
+        await engine.dispose()
+    return {
+        "benchmark": "serialization",
+        "heroes": heroes,
+        "teams": teams,
+        "page_size": page_size,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--heroes", type=int, default=20_000)
+    parser.add_argument("--teams", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.heroes, args.teams, args.page_size))
+    print_table(
+        ["path", "mode", "rows", "seconds", "rows/s"],
+        [
+            [r["path"], r["mode"], r["rows"], r["seconds"], r["rows_per_second"]]
+            for r in report["results"]
+        ],
+    )
+    write_json(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Write throughput of create_hero with and without the production SQLite profile.
+
+Each create_hero call is committed as its own transaction, as one request per
+hero would be, so with the default rollback journal every row pays an fsync;
+WAL with synchronous=NORMAL defers those to checkpoints.
+
+Usage:
+    python -m benchmarks.bench_sqlite_profile --rows 2000
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from benchmarks.common import print_table, temporary_database_url, write_json
+from src.crud.hero import create_hero
+from src.database import SQLITE_PROFILES, get_engine
+from src.models.hero import HeroCreate
+
+
+async def run_profile(name: str, rows: int) -> dict:
+    with temporary_database_url() as url:
+        engine = get_engine(url, profile=SQLITE_PROFILES[name])
+        async with engine.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.create_all)
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            started = time.perf_counter()
+            for i in range(rows):
+                hero = HeroCreate(name=f"Hero {i}", secret_name=f"Secret {i}", age=30)
+                await create_hero(hero=hero, session=session)
+                await session.commit()
+            elapsed = time.perf_counter() - started
+        await engine.dispose()
+    return {
+        "profile": name,
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed, 1),
+    }
+
+
+async def run(rows: int) -> dict:
+    results = [await run_profile(name, rows) for name in ("default", "production")]
+    return {"benchmark": "sqlite_profile", "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.rows))
+    print_table(
+        ["profile", "rows", "seconds", "rows/s"],
+        [
+            [r["profile"], r["rows"], r["seconds"], r["rows_per_second"]]
+            for r in report["results"]
+        ],
+    )
+    write_json(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
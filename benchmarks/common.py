@@ -0,0 +1,117 @@
+import json
+import statistics
+import tempfile
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel import SQLModel
+
+from src.models.hero import Hero
+from src.models.team import Team
+
+
+@contextmanager
+def temporary_database_url() -> Iterator[str]:
+    """
+    Yield an aiosqlite URL pointing to a database file that is removed afterwards.
+    """
+    with tempfile.TemporaryDirectory(prefix="crud-bench-") as directory:
+        yield f"sqlite+aiosqlite:///{Path(directory) / 'bench.db'}"
+
+
+async def create_schema(url: str, **engine_kwargs) -> AsyncEngine:
+    """
+    Create an async engine for ``url`` and the application tables on it.
+    """
+    engine = create_async_engine(url, **engine_kwargs)
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    return engine
+
+
+async def seed(
+    engine: AsyncEngine, heroes: int, teams: int = 0, batch_size: int = 10_000
+) -> None:
+    """
+    Insert ``teams`` teams and ``heroes`` heroes spread evenly across them.
+
+    Rows are written with executemany inserts in batches so seeding a million
+    heroes takes seconds and constant memory.
+    """
+    async with engine.begin() as connection:
+        for start in range(0, teams, batch_size):
+            await connection.execute(
+                insert(Team),
+                [
+                    {"name": f"Team {i:07d}", "headquarters": f"City {i % 97}"}
+                    for i in range(start, min(start + batch_size, teams))
+                ],
+            )
+        for start in range(0, heroes, batch_size):
+            await connection.execute(
+                insert(Hero),
+                [
+                    {
+                        "name": f"Hero {i:07d}",
+                        "secret_name": f"Secret {i:07d}",
+                        "age": 18 + i % 60,
+                        "team_id": (i % teams) + 1 if teams else None,
+                    }
+                    for i in range(start, min(start + batch_size, heroes))
+                ],
+            )
+
+
+async def measure(
+    operation: Callable[[], Awaitable[object]], repeat: int
+) -> list[float]:
+    """
+    Await ``operation`` ``repeat`` times and return each duration in milliseconds.
+    """
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await operation()
+        durations.append((time.perf_counter() - started) * 1000)
+    return durations
+
+
+def summarize(durations: list[float]) -> dict[str, float]:
+    """
+    Reduce durations (milliseconds) to mean and p50/p95/p99.
+    """
+    ordered = sorted(durations)
+
+    def percentile(fraction: float) -> float:
+        index = min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))
+        return round(ordered[index], 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+    }
+
+
+def print_table(headers: list[str], rows: list[list[object]]) -> None:
+    """
+    Print rows as a left-aligned plain-text table.
+    """
+    cells = [headers] + [[str(value) for value in row] for row in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(headers))]
+    for row in cells:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)))
+
+
+def write_json(path: str | None, payload: dict) -> None:
+    """
+    Write ``payload`` to ``path`` as indented JSON, if a path was given.
+    """
+    if path:
+        Path(path).write_text(json.dumps(payload, indent=2) + "\n")
@@ -0,0 +1,509 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+from contextlib import contextmanager
+from typing import TypeVar
+
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+from sqlalchemy.util.concurrency import in_greenlet
+
+from src.settings import Settings, get_settings
+
+T = TypeVar("T")
+
+STALE_TAGS_KEY = "stale_cache_tags"
+
+
+def hero_tag(hero_id: int) -> str:
+    """Tag of every cached payload that embeds the hero's row."""
+    return f"hero:{hero_id}"
+
+
+def team_tag(team_id: int) -> str:
+    """Tag of every cached payload that embeds the team's row."""
+    return f"team:{team_id}"
+
+
+def members_tag(team_id: int) -> str:
+    """Tag of the cached team payload that lists the team's heroes."""
+    return f"members:{team_id}"
+
+
+class CacheStats(BaseModel):
+    backend: str
+    entries: int
+    max_entries: int
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    invalidations: int
+
+
+class CacheBackend(ABC):
+    """
+    Store of serialized payloads with a time-to-live, invalidated by tag.
+
+    Each entry carries tags naming the rows it was built from, so a write can
+    drop every payload that embeds a row without knowing their keys. The
+    hit/miss/eviction counters are kept per process.
+    """
+
+    name: str
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        ttl_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._evictions = 0
+        self._expirations = self._invalidations = 0
+
+    @abstractmethod
+    def _get_generation(self) -> int: ...
+
+    @abstractmethod
+    def _get(self, key: str) -> bytes | None: ...
+
+    @abstractmethod
+    def _set(
+        self, key: str, value: bytes, tags: Iterable[str], generation: int | None
+    ) -> None: ...
+
+    @abstractmethod
+    def _invalidate_tags(self, tags: Iterable[str]) -> None: ...
+
+    @abstractmethod
+    def _clear(self) -> None: ...
+
+    @abstractmethod
+    def _count_entries(self) -> int: ...
+
+    async def _run(self, operation: Callable[..., T], *args) -> T:
+        """
+        Run a storage operation. Backends doing blocking I/O run it off the
+        event loop.
+        """
+        return operation(*args)
+
+    async def generation(self) -> int:
+        """
+        Counter bumped by every invalidation; a read that started before an
+        invalidation must not store what it read.
+        """
+        return await self._run(self._get_generation)
+
+    async def get(self, key: str) -> bytes | None:
+        """
+        Return the cached payload for ``key``, or None if absent or expired.
+        """
+        return await self._run(self._get, key)
+
+    async def set(
+        self,
+        key: str,
+        value: bytes,
+        tags: Iterable[str] = (),
+        generation: int | None = None,
+    ) -> None:
+        """
+        Store ``value`` under ``key``, evicting entries beyond ``max_entries``.
+
+        Args:
+            key (str): The cache key.
+            value (bytes): The serialized payload.
+            tags (Iterable[str]): Tags of the rows the payload was built from.
+            generation (int, optional): ``generation()`` observed before the
+                payload was read from the database; if an invalidation happened
+                since, the payload may be stale and is not stored.
+        """
+        await self._run(self._set, key, value, list(tags), generation)
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> None:
+        """
+        Drop every entry carrying any of ``tags``.
+        """
+        await self._run(self._invalidate_tags, list(tags))
+
+    async def clear(self) -> None:
+        """
+        Drop every entry.
+        """
+        await self._run(self._clear)
+
+    async def stats(self) -> CacheStats:
+        entries = await self._run(self._count_entries)
+        with self._lock:
+            return CacheStats(
+                backend=self.name,
+                entries=entries,
+                max_entries=self.max_entries,
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                expirations=self._expirations,
+                invalidations=self._invalidations,
+            )
+
+    async def read_through(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[tuple[bytes, Iterable[str]]]],
+    ) -> bytes:
+        """
+        Return the cached payload for ``key``, calling ``load`` on a miss.
+
+        Args:
+            key (str): The cache key.
+            load: Reads the row(s) and returns the serialized payload and its tags.
+                Exceptions (e.g. not found) propagate and nothing is cached.
+
+        Returns:
+            bytes: The serialized payload.
+        """
+        value = await self.get(key)
+        if value is not None:
+            return value
+        generation = await self.generation()
+        value, tags = await load()
+        await self.set(key, value, tags, generation=generation)
+        return value
+
+
+class MemoryCache(CacheBackend):
+    """
+    LRU cache held in the memory of the current process.
+
+    Fastest, but each worker process has its own copy and only sees the
+    invalidations made by its own writes.
+    """
+
+    name = "memory"
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        ttl_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__(max_entries, ttl_seconds, clock)
+        self._entries: OrderedDict[str, tuple[float, bytes, frozenset[str]]] = (
+            OrderedDict()
+        )
+        self._keys_by_tag: dict[str, set[str]] = {}
+        self._generation = 0
+
+    def _get_generation(self) -> int:
+        return self._generation
+
+    def _get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            expires_at, value, _ = entry
+            if expires_at <= self._clock():
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def _set(
+        self, key: str, value: bytes, tags: Iterable[str], generation: int | None
+    ) -> None:
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            tags = frozenset(tags)
+            self._entries[key] = (self._clock() + self.ttl_seconds, value, tags)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def _invalidate_tags(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in self._keys_by_tag.pop(tag, ()):
+                    if key in self._entries:
+                        self._remove(key)
+                        self._invalidations += 1
+
+    def _clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+    def _count_entries(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _remove(self, key: str) -> None:
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+
+SQLITE_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entry (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_cache_entry_expires_at ON cache_entry (expires_at);
+CREATE TABLE IF NOT EXISTS cache_tag (
+    tag TEXT NOT NULL,
+    key TEXT NOT NULL REFERENCES cache_entry (key) ON DELETE CASCADE,
+    PRIMARY KEY (tag, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_cache_tag_key ON cache_tag (key);
+CREATE TABLE IF NOT EXISTS cache_generation (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_generation (id, value) VALUES (0, 0);
+CREATE TABLE IF NOT EXISTS cache_size (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    entries INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_size (id, entries)
+    VALUES (0, (SELECT COUNT(*) FROM cache_entry));
+CREATE TRIGGER IF NOT EXISTS cache_entry_insert AFTER INSERT ON cache_entry BEGIN
+    UPDATE cache_size SET entries = entries + 1 WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entry_delete AFTER DELETE ON cache_entry BEGIN
+    UPDATE cache_size SET entries = entries - 1 WHERE id = 0;
+END;
+"""
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache shared by every worker process through a SQLite file.
+
+    Entries, their tags and the generation counter live in the file, so an
+    invalidation made by any worker is seen by all of them on their next read.
+    Expiry uses wall-clock time because monotonic clocks are not comparable
+    across processes, and when full the entries closest to expiry (the oldest
+    ones) are evicted first, since tracking recency would turn every hit into
+    a write. The number of entries is kept up to date by triggers, so checking
+    whether the cache is full reads one row instead of counting them.
+
+    Every operation runs in a worker thread: waiting for the file's write lock
+    must not block the event loop.
+    """
+
+    name = "sqlite"
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 10_000,
+        ttl_seconds: float = 30.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        super().__init__(max_entries, ttl_seconds, clock)
+        self.path = path
+        self._open_connection: sqlite3.Connection | None = None
+        self._connect_lock = threading.Lock()
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        """
+        The connection to the cache file. It is opened, and the schema created,
+        on first use rather than at import, so importing the app opens no file.
+        """
+        if self._open_connection is None:
+            with self._connect_lock:
+                if self._open_connection is None:
+                    self._open_connection = self._connect()
+        return self._open_connection
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE.
+        connection = sqlite3.connect(
+            self.path, timeout=5.0, isolation_level=None, check_same_thread=False
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA foreign_keys=ON")
+        connection.executescript(f"BEGIN IMMEDIATE; {SQLITE_CACHE_SCHEMA} COMMIT;")
+        return connection
+
+    async def _run(self, operation: Callable[..., T], *args) -> T:
+        return await asyncio.to_thread(operation, *args)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._connection
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def _get_generation(self) -> int:
+        with self._lock:
+            return self._read_generation()
+
+    def _read_generation(self) -> int:
+        return self._connection.execute(
+            "SELECT value FROM cache_generation WHERE id = 0"
+        ).fetchone()[0]
+
+    def _get(self, key: str) -> bytes | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, expires_at FROM cache_entry WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._misses += 1
+                return None
+            value, expires_at = row
+            if expires_at <= self._clock():
+                self._connection.execute(
+                    "DELETE FROM cache_entry WHERE key = ? AND expires_at <= ?",
+                    (key, expires_at),
+                )
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._hits += 1
+            return value
+
+    def _set(
+        self, key: str, value: bytes, tags: Iterable[str], generation: int | None
+    ) -> None:
+        now = self._clock()
+        with self._transaction() as db:
+            if generation is not None and generation != self._read_generation():
+                return
+            expired = db.execute(
+                "DELETE FROM cache_entry WHERE expires_at <= ?", (now,)
+            ).rowcount
+            db.execute("DELETE FROM cache_entry WHERE key = ?", (key,))
+            db.execute(
+                "INSERT INTO cache_entry (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + self.ttl_seconds),
+            )
+            db.executemany(
+                "INSERT INTO cache_tag (tag, key) VALUES (?, ?)",
+                [(tag, key) for tag in set(tags)],
+            )
+            entries = self._read_size()
+            evicted = 0
+            if entries > self.max_entries:
+                evicted = db.execute(
+                    "DELETE FROM cache_entry WHERE key IN ("
+                    "SELECT key FROM cache_entry ORDER BY expires_at LIMIT ?)",
+                    (entries - self.max_entries,),
+                ).rowcount
+            self._expirations += expired
+            self._evictions += evicted
+
+    def _invalidate_tags(self, tags: Iterable[str]) -> None:
+        with self._transaction() as db:
+            db.execute("UPDATE cache_generation SET value = value + 1 WHERE id = 0")
+            self._invalidations += db.execute(
+                "DELETE FROM cache_entry WHERE key IN ("
+                "SELECT key FROM cache_tag WHERE tag IN (SELECT value FROM json_each(?)))",
+                (json.dumps(list(tags)),),
+            ).rowcount
+
+    def _clear(self) -> None:
+        with self._transaction() as db:
+            db.execute("UPDATE cache_generation SET value = value + 1 WHERE id = 0")
+            db.execute("DELETE FROM cache_entry")
+
+    def _count_entries(self) -> int:
+        with self._lock:
+            return self._read_size()
+
+    def _read_size(self) -> int:
+        return self._connection.execute(
+            "SELECT entries FROM cache_size WHERE id = 0"
+        ).fetchone()[0]
+
+
+def create_cache(settings: Settings) -> CacheBackend:
+    """
+    Build the cache backend selected by ``settings.cache_backend``.
+
+    Args:
+        settings (Settings): The application settings.
+
+    Returns:
+        CacheBackend: The configured cache.
+    """
+    if settings.cache_backend == "sqlite":
+        return SQLiteCache(
+            path=settings.cache_path,
+            max_entries=settings.cache_max_entries,
+            ttl_seconds=settings.cache_ttl_seconds,
+        )
+    return MemoryCache(
+        max_entries=settings.cache_max_entries, ttl_seconds=settings.cache_ttl_seconds
+    )
+
+
+cache = create_cache(get_settings())
+
+
+def mark_stale(session, *tags: str) -> None:
+    """
+    Record cache tags to invalidate once the session's transaction commits.
+
+    Invalidating after the commit (rather than before the write) means no other
+    request can re-cache the old rows in between.
+
+    Args:
+        session: The (async) session performing the write.
+        *tags (str): Tags of the rows being written.
+    """
+    session.info.setdefault(STALE_TAGS_KEY, set()).update(tags)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_committed_tags(session: Session) -> None:
+    tags = session.info.pop(STALE_TAGS_KEY, None)
+    if not tags:
+        return
+    if in_greenlet():
+        # Committed by an AsyncSession: wait for the invalidation on the event
+        # loop, so the commit returns only once no stale entry can be read.
+        await_only(cache.invalidate_tags(tags))
+    else:
+        cache._invalidate_tags(tags)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def discard_rolled_back_tags(session: Session, previous_transaction) -> None:
+    session.info.pop(STALE_TAGS_KEY, None)
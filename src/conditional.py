@@ -0,0 +1,90 @@
+import hashlib
+
+ENTITY_SEPARATOR = b"\n"
+
+
+class PreconditionFailedError(Exception):
+    """
+    Exception raised when an ``If-Match`` precondition does not hold because the
+    resource changed since the client read it.
+    """
+
+
+def make_etag(*parts) -> str:
+    """
+    Build a strong entity tag from the versions of the rows a representation is
+    built from.
+
+    Args:
+        *parts: Identifiers and version numbers; any change to them changes the tag.
+
+    Returns:
+        str: The quoted entity tag.
+    """
+    digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=12)
+    return f'"{digest.hexdigest()}"'
+
+
+def parse_etags(header: str) -> list[str]:
+    """
+    Split an ``If-Match``/``If-None-Match`` header into its entity tags.
+
+    Args:
+        header (str): The header value, e.g. ``"a", W/"b"`` or ``*``.
+
+    Returns:
+        list[str]: The entity tags, with any weak prefix kept.
+    """
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def if_none_match(header: str | None, etag: str) -> bool:
+    """
+    Tell whether the client's cached copy is current (RFC 9110, section 13.1.2).
+    Uses the weak comparison, so ``W/"x"`` matches ``"x"``.
+
+    Args:
+        header (str | None): The ``If-None-Match`` header, if sent.
+        etag (str): The current entity tag.
+
+    Returns:
+        bool: True if a 304 Not Modified should be returned.
+    """
+    if header is None:
+        return False
+    tags = parse_etags(header)
+    return "*" in tags or etag in [tag.removeprefix("W/") for tag in tags]
+
+
+def check_if_match(header: str | None, etag: str) -> None:
+    """
+    Enforce an ``If-Match`` precondition (RFC 9110, section 13.1.1). Uses the
+    strong comparison, so weak tags never match.
+
+    Args:
+        header (str | None): The ``If-Match`` header, if sent.
+        etag (str): The current entity tag.
+
+    Raises:
+        PreconditionFailedError: If the header is set and no tag matches.
+    """
+    if header is None:
+        return
+    tags = parse_etags(header)
+    if "*" not in tags and etag not in tags:
+        raise PreconditionFailedError("Resource was modified since it was read")
+
+
+def pack_entity(etag: str, body: bytes) -> bytes:
+    """
+    Join an entity tag and a serialized body into a single cache value.
+    """
+    return etag.encode("ascii") + ENTITY_SEPARATOR + body
+
+
+def unpack_entity(entity: bytes) -> tuple[str, bytes]:
+    """
+    Split a value built by ``pack_entity`` into the entity tag and the body.
+    """
+    etag, body = entity.split(ENTITY_SEPARATOR, 1)
+    return etag.decode("ascii"), body
@@ -0,0 +1,149 @@
+from collections.abc import Iterator, Sequence
+from itertools import groupby
+from typing import NamedTuple
+
+from sqlalchemy import Table, bindparam, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.models.bulk import BulkItemResult, BulkItemStatus
+
+# Upper bound on the items accepted by one bulk request.
+MAX_BULK_ITEMS = 10_000
+# Keeps ``IN (...)`` lists well below SQLite's bound-parameter limit.
+IN_CLAUSE_CHUNK_SIZE = 500
+
+
+class BulkRow(NamedTuple):
+    """
+    One item of a bulk request: its position in the payload and the column
+    values used when it is inserted or, on upsert, when it updates a row.
+    """
+
+    index: int
+    name: str
+    insert_values: dict
+    update_values: dict
+
+
+def chunked(items: Sequence, size: int) -> Iterator[Sequence]:
+    """
+    Yield consecutive slices of ``items`` of at most ``size`` elements.
+    """
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+async def existing_ids(connection: AsyncConnection, column, values: set) -> set:
+    """
+    Return the subset of ``values`` present in ``column``.
+    """
+    found = set()
+    for chunk in chunked(list(values), IN_CLAUSE_CHUNK_SIZE):
+        rows = await connection.execute(select(column).where(column.in_(chunk)))
+        found.update(rows.scalars().all())
+    return found
+
+
+async def ids_by_name(connection: AsyncConnection, table: Table, names: list[str]):
+    """
+    Map each name that already exists in ``table`` to its id. When several rows
+    share a name, the oldest (lowest id) one is used.
+    """
+    found = {}
+    for chunk in chunked(names, IN_CLAUSE_CHUNK_SIZE):
+        rows = await connection.execute(
+            select(table.c.name, func.min(table.c.id))
+            .where(table.c.name.in_(chunk))
+            .group_by(table.c.name)
+        )
+        found.update(rows.tuples().all())
+    return found
+
+
+async def write_rows(
+    connection: AsyncConnection,
+    table: Table,
+    rows: list[BulkRow],
+    *,
+    upsert: bool,
+) -> list[BulkItemResult]:
+    """
+    Insert ``rows`` into ``table`` with executemany statements, or upsert them by
+    name, inside the connection's current transaction.
+
+    With ``upsert``, a row whose name already exists updates that row instead of
+    inserting, and when the payload repeats a name only its last occurrence is
+    written; earlier ones are reported as skipped.
+
+    Args:
+        connection (AsyncConnection): The connection of the caller's session.
+        table (Table): The table to write to.
+        rows (list[BulkRow]): The validated items to write.
+        upsert (bool): Update rows that already exist with the same name.
+
+    Returns:
+        list[BulkItemResult]: One result per row, in payload order.
+    """
+    results = []
+    to_insert, to_update = rows, []
+    if upsert:
+        last_by_name = {}
+        for row in rows:
+            if row.name in last_by_name:
+                results.append(
+                    BulkItemResult(
+                        index=last_by_name[row.name].index,
+                        status=BulkItemStatus.SKIPPED,
+                        detail=f"Superseded by item {row.index}",
+                    )
+                )
+            last_by_name[row.name] = row
+        known = await ids_by_name(connection, table, list(last_by_name))
+        to_insert = [row for row in last_by_name.values() if row.name not in known]
+        to_update = [
+            (known[row.name], row) for row in last_by_name.values() if row.name in known
+        ]
+
+    if to_insert:
+        inserted = await connection.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True),
+            [row.insert_values for row in to_insert],
+        )
+        new_ids = inserted.scalars().all()
+        results.extend(
+            BulkItemResult(index=row.index, status=BulkItemStatus.CREATED, id=row_id)
+            for row, row_id in zip(to_insert, new_ids)
+        )
+
+    # executemany needs the same columns in every parameter set, so updates are
+    # grouped by the set of fields each item provides.
+    def update_columns(item):
+        return tuple(sorted(item[1].update_values))
+
+    for columns, group in groupby(
+        sorted(to_update, key=update_columns), update_columns
+    ):
+        group = list(group)
+        if columns:
+            statement = (
+                update(table)
+                .where(table.c.id == bindparam("row_id"))
+                .values({column: bindparam(f"new_{column}") for column in columns})
+            )
+            if "version" in table.c:
+                statement = statement.values(version=table.c.version + 1)
+            await connection.execute(
+                statement,
+                [
+                    {
+                        "row_id": row_id,
+                        **{f"new_{k}": v for k, v in row.update_values.items()},
+                    }
+                    for row_id, row in group
+                ],
+            )
+        results.extend(
+            BulkItemResult(index=row.index, status=BulkItemStatus.UPDATED, id=row_id)
+            for row_id, row in group
+        )
+    return results
@@ -0,0 +1,41 @@
+import sys
+
+from sqlalchemy import and_
+from sqlalchemy.sql import ColumnElement
+
+MAX_CHARACTER = chr(sys.maxunicode)
+
+
+def next_character(character: str) -> str:
+    """
+    Return the character following ``character`` in code point order, skipping
+    surrogates, which cannot be encoded in UTF-8.
+    """
+    following = ord(character) + 1
+    if 0xD800 <= following <= 0xDFFF:
+        following = 0xE000
+    return chr(following)
+
+
+def prefix_condition(column, prefix: str) -> ColumnElement[bool]:
+    """
+    Build a case-sensitive "starts with" filter that SQLite answers with a range
+    search on the column's index.
+
+    ``column LIKE 'abc%'`` can only use an index when ``LIKE`` is case-sensitive
+    (or the index uses ``NOCASE``), so the prefix is written as the half-open
+    range ``[prefix, upper)`` instead, where ``upper`` is the smallest string
+    greater than every string starting with ``prefix``.
+
+    Args:
+        column: The indexed text column.
+        prefix (str): The non-empty prefix.
+
+    Returns:
+        ColumnElement[bool]: The filter expression.
+    """
+    stem = prefix.rstrip(MAX_CHARACTER)
+    if not stem:
+        return column >= prefix
+    upper = stem[:-1] + next_character(stem[-1])
+    return and_(column >= prefix, column < upper)
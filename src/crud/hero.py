@@ -1,5 +1,35 @@
-from sqlmodel import Session, select
-from src.models.hero import Hero, HeroCreate, HeroUpdate
+from collections.abc import AsyncIterator, Sequence
+from typing import Literal
+
+from sqlalchemy import Row
+from sqlalchemy.sql import ColumnElement
+
+# Unlike sqlmodel's select(), yields rows even when a single column is selected.
+from sqlalchemy import select as select_rows
+from sqlalchemy.orm.exc import StaleDataError
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.cache import hero_tag, mark_stale, members_tag
+from src.conditional import PreconditionFailedError, check_if_match, make_etag
+from src.crud.bulk import BulkRow, existing_ids, write_rows
+from src.crud.loading import LoadStrategy, relationship_loader
+from src.crud.filtering import prefix_condition
+from src.crud.pagination import paginate, sort_column
+from src.crud.team import TEAM_EXPORT_COLUMNS, TeamNotFoundError
+from src.models.bulk import BulkItemResult, BulkItemStatus
+from src.models.hero import Hero, HeroCreate, HeroFilter, HeroUpdate
+from src.models.team import Team
+from src.security.passwords import hasher
+
+
+HeroOrderBy = Literal["id", "name", "age", "-id", "-name", "-age"]
+# Columns of an exported hero, in the order of HeroPublic's fields.
+HERO_EXPORT_COLUMNS = ("name", "secret_name", "age", "team_id", "id")
+# Fields a client can request with ``fields=``: the public columns and the team.
+HERO_FIELDS = (*HERO_EXPORT_COLUMNS, "team")
+# Bound of SQLite's 64-bit INTEGER, used to close one-sided age ranges.
+MAX_SQLITE_INTEGER = 2**63 - 1
 
 
 class HeroNotFoundError(Exception):
@@ -12,26 +42,46 @@ class HeroNotFoundError(Exception):
         self.message = message
 
 
-def hash_password(password: str) -> str:
+def hero_etag(hero: Hero) -> str:
+    """
+    Computes the strong ETag of a hero's representation, which embeds its team.
+
+    Args:
+        hero (Hero): The hero, with ``Hero.team`` loaded.
+
+    Returns:
+        str: The quoted entity tag.
     """
-    Hashes a given password.
+    team_version = hero.team.version if hero.team is not None else None
+    return make_etag("hero", hero.id, hero.version, hero.team_id, team_version)
+
+
+def hero_row_etag(row: Row, fields: Sequence[str]) -> str:
+    """
+    Computes the strong ETag of a projection of a hero read by ``get_hero_row``.
 
     Args:
-        password (str): The plain text password to hash.
+        row (Row): The row returned by ``get_hero_row``.
+        fields (Sequence[str]): The fields it was read with.
 
     Returns:
-        str: The hashed password.
+        str: The quoted entity tag.
     """
-    return f"hashed_{password}"
+    team_version = row.team__version if "team" in fields else None
+    return make_etag("hero", row.id, row.version, team_version, tuple(fields))
 
 
-def create_hero(hero: HeroCreate, session: Session) -> Hero:
+async def create_hero(hero: HeroCreate, session: AsyncSession) -> Hero:
     """
     Creates a new hero in the database.
 
     Args:
         hero (HeroCreate): The hero data to create.
-        session (Session): The database session.
+        session (AsyncSession): The database session.
+
+    Raises:
+        TeamNotFoundError: If ``hero.team_id`` names no team.
+        HasherBusyError: If the password hashing pool is saturated.
 
     Returns:
         Hero: The created hero object.
@@ -39,39 +89,331 @@ def create_hero(hero: HeroCreate, session: Session) -> Hero:
     extra_data = {}
     hero_data = hero.model_dump(exclude_unset=True)
     if "password" in hero_data:
-        hashed_password = hash_password(password=hero.password)
+        hashed_password = await hasher.hash(hero.password)
         extra_data = {"hashed_password": hashed_password}
+    await _check_team_exists(hero.team_id, session)
     db_hero = Hero.model_validate(hero, update=extra_data)
     session.add(db_hero)
-    session.commit()
-    session.refresh(db_hero)
+    if db_hero.team_id is not None:
+        mark_stale(session, members_tag(db_hero.team_id))
+    await session.flush()
     return db_hero
 
 
-def get_heroes(session: Session, offset: int = 0, limit: int = 100) -> list[Hero]:
+async def create_heroes_bulk(
+    heroes: list[HeroCreate], session: AsyncSession, upsert: bool = False
+) -> list[BulkItemResult]:
+    """
+    Creates many heroes using executemany inserts.
+
+    Items referencing a team that does not exist are reported as failed and
+    not written; the rest are written together.
+
+    Args:
+        heroes (list[HeroCreate]): The heroes to create.
+        session (AsyncSession): The database session.
+        upsert (bool, optional): Update the existing hero with the same name
+            (only the fields provided) instead of creating a new one. Defaults to False.
+
+    Raises:
+        HasherBusyError: If the password hashing pool is saturated.
+
+    Returns:
+        list[BulkItemResult]: One result per item, in payload order.
+    """
+    # Hashed before the transaction starts, so no connection is held meanwhile.
+    hashed_passwords = await hasher.hash_many(hero.password for hero in heroes)
+    connection = await session.connection()
+    team_ids = {hero.team_id for hero in heroes if hero.team_id is not None}
+    known_team_ids = await existing_ids(connection, Team.id, team_ids)
+
+    results, rows = [], []
+    for index, hero in enumerate(heroes):
+        if hero.team_id is not None and hero.team_id not in known_team_ids:
+            results.append(
+                BulkItemResult(
+                    index=index,
+                    status=BulkItemStatus.FAILED,
+                    detail=f"Team with id {hero.team_id} not found",
+                )
+            )
+            continue
+        hashed_password = hashed_passwords[index]
+        insert_values = hero.model_dump(exclude={"password"})
+        insert_values["hashed_password"] = hashed_password
+        update_values = hero.model_dump(exclude_unset=True, exclude={"password"})
+        if hashed_password is not None:
+            update_values["hashed_password"] = hashed_password
+        rows.append(BulkRow(index, hero.name, insert_values, update_values))
+
+    written = await write_rows(connection, Hero.__table__, rows, upsert=upsert)
+    team_ids = {row.index: row.insert_values["team_id"] for row in rows}
+    for result in written:
+        if result.status == BulkItemStatus.UPDATED:
+            mark_stale(session, hero_tag(result.id))
+        if team_ids[result.index] is not None:
+            mark_stale(session, members_tag(team_ids[result.index]))
+    results.extend(written)
+    return sorted(results, key=lambda result: result.index)
+
+
+async def get_heroes(
+    session: AsyncSession,
+    offset: int = 0,
+    limit: int = 100,
+    load: LoadStrategy = LoadStrategy.SELECTIN,
+    order_by: HeroOrderBy = "id",
+    cursor: str | None = None,
+    filters: HeroFilter | None = None,
+) -> list[Hero]:
     """
     Retrieves a list of heroes from the database with pagination.
 
+    Heroes are ordered by ``order_by`` then ``id``. Passing the ``cursor`` of the
+    previous page (keyset pagination) seeks straight to the next rows through the
+    index instead of walking and discarding ``offset`` rows.
+
     Args:
-        session (Session): The database session.
+        session (AsyncSession): The database session.
         offset (int, optional): The starting index for pagination. Defaults to 0.
         limit (int, optional): The maximum number of heroes to retrieve. Defaults to 100.
+        load (LoadStrategy, optional): How ``Hero.team`` is loaded. Defaults to SELECTIN.
+        order_by (HeroOrderBy, optional): The indexed column to order by, prefixed
+            with "-" for descending order. Defaults to "id".
+        cursor (str, optional): Opaque cursor returned with the previous page.
+        filters (HeroFilter, optional): Restricts the heroes returned.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or built for another ordering.
 
     Returns:
         list[Hero]: A list of hero objects.
     """
-    statement = select(Hero).offset(offset).limit(limit)
-    heroes = session.exec(statement=statement).all()
+    statement = paginate(
+        select(Hero)
+        .options(relationship_loader(Hero.team, load))
+        .where(*hero_conditions(filters)),
+        getattr(Hero, sort_column(order_by)),
+        Hero.id,
+        key=order_by,
+        offset=offset,
+        limit=limit,
+        cursor=cursor,
+    )
+    heroes = (await session.exec(statement=statement)).unique().all()
     return heroes
 
 
-def get_hero_by_id(hero_id: int, session: Session) -> Hero:
+def hero_conditions(filters: HeroFilter | None) -> list[ColumnElement[bool]]:
+    """
+    Translates hero filters into ``WHERE`` conditions on indexed columns.
+
+    Args:
+        filters (HeroFilter, optional): The filters to apply.
+
+    Returns:
+        list[ColumnElement[bool]]: The conditions, to be combined with ``AND``.
+    """
+    if filters is None:
+        return []
+    conditions = []
+    if filters.name_prefix is not None:
+        conditions.append(prefix_condition(Hero.name, filters.name_prefix))
+    if filters.min_age is not None or filters.max_age is not None:
+        # Always a closed range: SQLite's planner expects a one-sided range to
+        # match most rows and would rather scan the table in ORDER BY order.
+        conditions.append(
+            Hero.age.between(
+                filters.min_age if filters.min_age is not None else -MAX_SQLITE_INTEGER,
+                filters.max_age if filters.max_age is not None else MAX_SQLITE_INTEGER,
+            )
+        )
+    if filters.team_id is not None:
+        conditions.append(Hero.team_id == filters.team_id)
+    return conditions
+
+
+def hero_projection(fields: Sequence[str], extra: Sequence[str] = ()) -> list:
+    """
+    Lists the columns to select for a projection of heroes.
+
+    The requested hero columns come first, in the order of ``HERO_EXPORT_COLUMNS``,
+    then the team's columns (labelled ``team__<column>``) if "team" is requested,
+    then the ``extra`` hero columns not already selected (e.g. what pagination
+    needs), so a serializer can slice each row by position.
+
+    Args:
+        fields (Sequence[str]): The requested fields, out of ``HERO_FIELDS``.
+        extra (Sequence[str], optional): Hero columns needed besides the fields.
+
+    Returns:
+        list: The columns to select.
+    """
+    names = [column for column in HERO_EXPORT_COLUMNS if column in fields]
+    columns = [getattr(Hero, column) for column in names]
+    if "team" in fields:
+        columns += [
+            getattr(Team, column).label(f"team__{column}")
+            for column in TEAM_EXPORT_COLUMNS
+        ]
+    columns += [
+        getattr(Hero, column) for column in dict.fromkeys(extra) if column not in names
+    ]
+    return columns
+
+
+async def get_hero_rows(
+    session: AsyncSession,
+    offset: int = 0,
+    limit: int = 100,
+    order_by: HeroOrderBy = "id",
+    cursor: str | None = None,
+    fields: Sequence[str] = HERO_FIELDS,
+    filters: HeroFilter | None = None,
+) -> Sequence[Row]:
+    """
+    Retrieves a page of heroes, like ``get_heroes``, as plain rows.
+
+    Only the columns of the requested ``fields`` are selected (see
+    ``hero_projection``), and the team is only joined if "team" is requested, so
+    no ORM objects are built and no unneeded column is read.
+
+    Args:
+        session (AsyncSession): The database session.
+        offset (int, optional): The starting index for pagination. Defaults to 0.
+        limit (int, optional): The maximum number of heroes to retrieve. Defaults to 100.
+        order_by (HeroOrderBy, optional): The indexed column to order by, prefixed
+            with "-" for descending order. Defaults to "id".
+        cursor (str, optional): Opaque cursor returned with the previous page.
+        fields (Sequence[str], optional): The fields to read. Defaults to HERO_FIELDS.
+        filters (HeroFilter, optional): Restricts the heroes returned.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or built for another ordering.
+
+    Returns:
+        Sequence[Row]: The selected columns, per hero.
+    """
+    column = sort_column(order_by)
+    statement = select_rows(*hero_projection(fields, extra=(column, "id")))
+    if "team" in fields:
+        statement = statement.outerjoin(Team, Hero.team_id == Team.id)
+    statement = paginate(
+        statement.where(*hero_conditions(filters)),
+        getattr(Hero, column),
+        Hero.id,
+        key=order_by,
+        offset=offset,
+        limit=limit,
+        cursor=cursor,
+    )
+    return (await session.exec(statement)).all()
+
+
+async def get_hero_row(
+    hero_id: int, session: AsyncSession, fields: Sequence[str] = HERO_FIELDS
+) -> Row:
+    """
+    Retrieves the requested ``fields`` of a hero as a plain row.
+
+    Besides the projection (see ``hero_projection``) the row holds ``id``,
+    ``team_id`` and ``version``, plus ``team__version`` if "team" is requested,
+    to tag and version the representation.
+
+    Args:
+        hero_id (int): The ID of the hero to retrieve.
+        session (AsyncSession): The database session.
+        fields (Sequence[str], optional): The fields to read. Defaults to HERO_FIELDS.
+
+    Raises:
+        HeroNotFoundError: If the hero with the given ID is not found.
+
+    Returns:
+        Row: The selected columns.
+    """
+    columns = hero_projection(fields, extra=("id", "team_id", "version"))
+    statement = select_rows(*columns).where(Hero.id == hero_id)
+    if "team" in fields:
+        statement = statement.add_columns(Team.version.label("team__version"))
+        statement = statement.outerjoin(Team, Hero.team_id == Team.id)
+    row = (await session.exec(statement)).first()
+    if row is None:
+        raise HeroNotFoundError(message=f"Hero with id {hero_id} not found")
+    return row
+
+
+async def get_hero_etag(
+    hero_id: int, session: AsyncSession, fields: Sequence[str] | None = None
+) -> str:
+    """
+    Computes the ETag of a hero's representation from the versions of its rows
+    alone, so that a conditional request is answered without building the body.
+
+    Args:
+        hero_id (int): The ID of the hero.
+        session (AsyncSession): The database session.
+        fields (Sequence[str], optional): The fields of a projection, as read by
+            ``get_hero_row``; None for the full representation.
+
+    Raises:
+        HeroNotFoundError: If the hero with the given ID is not found.
+
+    Returns:
+        str: The quoted entity tag, equal to ``hero_etag`` (or ``hero_row_etag``
+        for a projection) of the same hero.
+    """
+    statement = (
+        select_rows(
+            Hero.id, Hero.version, Hero.team_id, Team.version.label("team__version")
+        )
+        .outerjoin(Team, Hero.team_id == Team.id)
+        .where(Hero.id == hero_id)
+    )
+    row = (await session.exec(statement)).first()
+    if row is None:
+        raise HeroNotFoundError(message=f"Hero with id {hero_id} not found")
+    if fields is not None:
+        return hero_row_etag(row, fields)
+    return make_etag("hero", row.id, row.version, row.team_id, row.team__version)
+
+
+async def stream_heroes(
+    session: AsyncSession, batch_size: int = 1000
+) -> AsyncIterator[Sequence[Row]]:
+    """
+    Streams every hero, ordered by id, through a server-side cursor.
+
+    Only the public columns (``HERO_EXPORT_COLUMNS``) are selected as plain rows,
+    so no ORM objects are built and memory stays at one batch whatever the
+    table size.
+
+    Args:
+        session (AsyncSession): The database session; it must stay open while
+            the stream is consumed.
+        batch_size (int, optional): Rows fetched per round-trip. Defaults to 1000.
+
+    Yields:
+        Sequence[Row]: The next batch of rows.
+    """
+    columns = [getattr(Hero, column) for column in HERO_EXPORT_COLUMNS]
+    statement = (
+        select(*columns).order_by(Hero.id).execution_options(yield_per=batch_size)
+    )
+    result = await session.stream(statement)
+    async for partition in result.partitions():
+        yield partition
+
+
+async def get_hero_by_id(
+    hero_id: int, session: AsyncSession, load: LoadStrategy = LoadStrategy.SELECTIN
+) -> Hero:
     """
     Retrieves a hero by its ID.
 
     Args:
         hero_id (int): The ID of the hero to retrieve.
-        session (Session): The database session.
+        session (AsyncSession): The database session.
+        load (LoadStrategy, optional): How ``Hero.team`` is loaded. Defaults to SELECTIN.
 
     Raises:
         HeroNotFoundError: If the hero with the given ID is not found.
@@ -79,49 +421,108 @@ def get_hero_by_id(hero_id: int, session: Session) -> Hero:
     Returns:
         Hero: The hero object.
     """
-    hero = session.get(Hero, hero_id)
+    hero = await session.get(
+        Hero, hero_id, options=[relationship_loader(Hero.team, load)]
+    )
     if not hero:
         raise HeroNotFoundError(message=f"Hero with id {hero_id} not found")
     return hero
 
 
-def update_hero(hero_id: int, hero: HeroUpdate, session: Session) -> Hero:
+async def update_hero(
+    hero_id: int, hero: HeroUpdate, session: AsyncSession, if_match: str | None = None
+) -> Hero:
     """
     Updates an existing hero in the database.
 
     Args:
         hero_id (int): The ID of the hero to update.
         hero (HeroUpdate): The updated hero data.
-        session (Session): The database session.
+        session (AsyncSession): The database session.
+        if_match (str, optional): ``If-Match`` header; the update only happens
+            if the hero's current ETag matches.
+
+    Raises:
+        HeroNotFoundError: If the hero with the given ID is not found.
+        TeamNotFoundError: If ``hero.team_id`` names no team.
+        PreconditionFailedError: If ``if_match`` does not match, or the hero was
+            changed concurrently.
+        HasherBusyError: If the password hashing pool is saturated.
 
     Returns:
         Hero: The updated hero object.
     """
-    hero_db = get_hero_by_id(hero_id, session)
     hero_data = hero.model_dump(exclude_unset=True)
     extra_data = {}
+    # Hashed before reading the hero, so no connection is held meanwhile.
     if "password" in hero_data:
-        hashed_password = hash_password(hero_data["password"])
+        hashed_password = await hasher.hash(hero_data["password"])
         extra_data["hashed_password"] = hashed_password
+    hero_db = await _get_hero_if_match(hero_id, session, if_match)
+    await _check_team_exists(hero_data.get("team_id"), session)
     hero_db.sqlmodel_update(hero_data, update=extra_data)
     session.add(hero_db)
-    session.commit()
-    session.refresh(hero_db)
+    # The hero's old team payload carries the hero's tag; the new one does not.
+    mark_stale(session, hero_tag(hero_id))
+    if hero_db.team_id is not None:
+        mark_stale(session, members_tag(hero_db.team_id))
+    await _flush_versioned(session)
     return hero_db
 
 
-def delete_hero(hero_id: int, session: Session) -> dict:
+async def delete_hero(
+    hero_id: int, session: AsyncSession, if_match: str | None = None
+) -> dict:
     """
     Deletes a hero from the database.
 
     Args:
         hero_id (int): The ID of the hero to delete.
-        session (Session): The database session.
+        session (AsyncSession): The database session.
+        if_match (str, optional): ``If-Match`` header; the hero is only deleted
+            if its current ETag matches.
+
+    Raises:
+        HeroNotFoundError: If the hero with the given ID is not found.
+        PreconditionFailedError: If ``if_match`` does not match, or the hero was
+            changed concurrently.
 
     Returns:
         dict: A confirmation of the deletion.
     """
-    hero_db = get_hero_by_id(hero_id, session)
-    session.delete(hero_db)
-    session.commit()
+    hero_db = await _get_hero_if_match(hero_id, session, if_match)
+    await session.delete(hero_db)
+    mark_stale(session, hero_tag(hero_id))
+    await _flush_versioned(session)
     return True
+
+
+async def _get_hero_if_match(
+    hero_id: int, session: AsyncSession, if_match: str | None
+) -> Hero:
+    # The team is only needed to compute the ETag.
+    load = LoadStrategy.NONE if if_match is None else LoadStrategy.JOINED
+    hero_db = await get_hero_by_id(hero_id, session, load=load)
+    if if_match is not None:
+        check_if_match(if_match, hero_etag(hero_db))
+    return hero_db
+
+
+async def _check_team_exists(team_id: int | None, session: AsyncSession) -> None:
+    # Checked up front: with foreign keys enforced, the flush would otherwise
+    # fail with an IntegrityError that says nothing about which team.
+    if team_id is None:
+        return
+    found = await session.exec(select(Team.id).where(Team.id == team_id))
+    if found.first() is None:
+        raise TeamNotFoundError(f"Team with id {team_id} not found")
+
+
+async def _flush_versioned(session: AsyncSession) -> None:
+    # The UPDATE/DELETE is guarded by the version read above; no row matching
+    # means another request changed the hero in between. Rolling back is left
+    # to whoever owns the transaction.
+    try:
+        await session.flush()
+    except StaleDataError as e:
+        raise PreconditionFailedError("Hero was modified concurrently") from e
@@ -0,0 +1,39 @@
+from enum import Enum
+
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+from sqlalchemy.sql.base import ExecutableOption
+
+
+class LoadStrategy(str, Enum):
+    """
+    How a relationship is loaded together with the rows that own it.
+
+    - ``SELECTIN``: one extra ``SELECT ... WHERE id IN (...)`` per page, best for
+      collections such as ``Team.heroes``.
+    - ``JOINED``: a ``LEFT OUTER JOIN`` in the same statement, best for
+      many-to-one relationships such as ``Hero.team``.
+    - ``NONE``: the relationship is not loaded; accessing it raises instead of
+      silently issuing one query per row.
+    """
+
+    SELECTIN = "selectin"
+    JOINED = "joined"
+    NONE = "none"
+
+
+def relationship_loader(relationship, strategy: LoadStrategy) -> ExecutableOption:
+    """
+    Build the loader option for a relationship attribute.
+
+    Args:
+        relationship: The relationship attribute (e.g. ``Hero.team``).
+        strategy (LoadStrategy): How the relationship should be loaded.
+
+    Returns:
+        ExecutableOption: A loader option for ``select(...).options()`` or ``session.get()``.
+    """
+    if strategy is LoadStrategy.JOINED:
+        return joinedload(relationship)
+    if strategy is LoadStrategy.NONE:
+        return raiseload(relationship)
+    return selectinload(relationship)
@@ -0,0 +1,168 @@
+import base64
+import binascii
+import json
+from typing import Any, NamedTuple
+
+from sqlalchemy import Select, and_, or_, tuple_
+from sqlalchemy.sql import ColumnElement
+
+
+class InvalidCursorError(Exception):
+    """
+    Exception raised when a pagination cursor cannot be decoded or does not
+    match the requested ordering.
+    """
+
+
+class Cursor(NamedTuple):
+    """
+    Position of the last row of a page: the ordering key, its value and the row id
+    used as a tie-breaker.
+    """
+
+    key: str
+    value: Any
+    id: int
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    """
+    Encode a cursor as an opaque, URL-safe string.
+
+    Args:
+        cursor (Cursor): The position to encode.
+
+    Returns:
+        str: The encoded cursor.
+    """
+    raw = json.dumps([cursor.key, cursor.value, cursor.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(token: str, key: str) -> Cursor:
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    Args:
+        token (str): The opaque cursor string.
+        key (str): The ordering key of the current request; the cursor must have
+                   been produced for the same key.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or was built for another key.
+
+    Returns:
+        Cursor: The decoded position.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        cursor_key, value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as e:
+        raise InvalidCursorError("Malformed pagination cursor") from e
+    if cursor_key != key or not isinstance(row_id, int):
+        raise InvalidCursorError(f"Cursor does not match ordering by '{key}'")
+    return Cursor(key=cursor_key, value=value, id=row_id)
+
+
+def sort_column(key: str) -> str:
+    """
+    Return the column name of an ordering key; a leading ``-`` means descending.
+    """
+    return key.removeprefix("-")
+
+
+def keyset_condition(
+    column, id_column, cursor: Cursor, descending: bool = False
+) -> ColumnElement[bool]:
+    """
+    Build the ``WHERE`` clause selecting the rows that come after ``cursor`` when
+    ordering by ``(column, id_column)``.
+
+    The comparison is written as a row value, ``(column, id) > (:value, :id)``, which
+    SQLite answers with a range search on the column's index (the index implicitly
+    ends with the rowid). ``NULL`` sorts first in SQLite, so ascending, a ``NULL``
+    cursor value continues with the remaining ``NULL`` rows and then every
+    non-``NULL`` one; descending, the ``NULL`` rows come last.
+
+    Args:
+        column: The ordering column.
+        id_column: The primary key column, used as a tie-breaker.
+        cursor (Cursor): The position of the last row already returned.
+        descending (bool, optional): Whether the rows are in descending order.
+
+    Returns:
+        ColumnElement[bool]: The filter expression.
+    """
+    if column is id_column:
+        return id_column < cursor.id if descending else id_column > cursor.id
+    if descending:
+        if cursor.value is None:
+            return and_(column.is_(None), id_column < cursor.id)
+        return or_(
+            tuple_(column, id_column) < tuple_(cursor.value, cursor.id),
+            column.is_(None),
+        )
+    if cursor.value is None:
+        return or_(and_(column.is_(None), id_column > cursor.id), column.is_not(None))
+    return tuple_(column, id_column) > tuple_(cursor.value, cursor.id)
+
+
+def paginate(
+    statement: Select,
+    column,
+    id_column,
+    *,
+    key: str,
+    offset: int,
+    limit: int,
+    cursor: str | None,
+) -> Select:
+    """
+    Order ``statement`` by ``(column, id_column)`` and restrict it to one page,
+    starting after ``cursor`` if given.
+
+    Args:
+        statement (Select): The statement selecting the rows.
+        column: The ordering column.
+        id_column: The primary key column, used as a tie-breaker.
+        key (str): The name of the ordering, checked against the cursor; a
+            leading ``-`` sorts in descending order.
+        offset (int): The number of rows to skip.
+        limit (int): The maximum number of rows.
+        cursor (str, optional): Opaque cursor returned with the previous page.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or built for another key.
+
+    Returns:
+        Select: The paginated statement.
+    """
+    descending = key.startswith("-")
+    if cursor is not None:
+        position = decode_cursor(cursor, key=key)
+        statement = statement.where(
+            keyset_condition(column, id_column, position, descending=descending)
+        )
+    ordering = [id_column] if column is id_column else [column, id_column]
+    if descending:
+        ordering = [part.desc() for part in ordering]
+    return statement.order_by(*ordering).offset(offset).limit(limit)
+
+
+def next_cursor(items: list, key: str, limit: int) -> str | None:
+    """
+    Compute the cursor of the page following ``items``.
+
+    Args:
+        items (list): The rows of the current page, in order.
+        key (str): The ordering key of the page, e.g. ``age`` or ``-age``.
+        limit (int): The page size that was requested.
+
+    Returns:
+        str | None: The encoded cursor, or None if this was the last page.
+    """
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    value = getattr(last, sort_column(key))
+    return encode_cursor(Cursor(key=key, value=value, id=last.id))
@@ -0,0 +1,101 @@
+from collections.abc import Collection
+
+from sqlalchemy import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.hero import Hero
+from src.models.search import SearchKind, SearchResult, search_table_name
+from src.models.team import Team
+
+# Indexed table and bm25 weights of its columns, per kind: a match in the name
+# ranks above a match in the secret name or the headquarters.
+SEARCH_SOURCES = {
+    SearchKind.HERO: (Hero.__table__, (2.0, 1.0)),
+    SearchKind.TEAM: (Team.__table__, (2.0, 1.0)),
+}
+
+
+class InvalidSearchError(Exception):
+    """
+    Exception raised when a search query has no term to look for.
+    """
+
+
+def match_expression(query: str) -> str:
+    """
+    Turn free text into an FTS5 ``MATCH`` expression.
+
+    Every whitespace-separated term is quoted, so FTS5 operators typed by the
+    client (``AND``, ``NEAR``, ``-``, ``"``...) are searched for literally, and all
+    terms must match. The last term matches as a prefix, for search-as-you-type.
+    Terms without a letter or digit are dropped: the ``unicode61`` tokenizer
+    makes no token of them, and an empty quoted prefix is a syntax error.
+
+    Args:
+        query (str): The text typed by the client.
+
+    Raises:
+        InvalidSearchError: If the query has no letter or digit.
+
+    Returns:
+        str: The ``MATCH`` expression.
+    """
+    terms = [term for term in query.split() if any(c.isalnum() for c in term)]
+    if not terms:
+        raise InvalidSearchError("The search query is empty")
+    phrases = ['"' + term.replace('"', '""') + '"' for term in terms]
+    return " ".join(phrases) + "*"
+
+
+async def search(
+    *,
+    query: str,
+    kinds: Collection[SearchKind] = tuple(SearchKind),
+    offset: int = 0,
+    limit: int = 20,
+    session: AsyncSession,
+) -> list[SearchResult]:
+    """
+    Search heroes by name and secret name, and teams by name and headquarters.
+
+    Each kind is looked up in its FTS5 index, so the cost depends on the number
+    of matches, not on the size of the tables. Results are ranked by bm25, best
+    first, with the kind and id as tie-breakers so that pages are stable.
+
+    Args:
+        query (str): Free text; see ``match_expression``.
+        kinds (Collection[SearchKind], optional): The kinds to search, default is all.
+        offset (int, optional): The number of results to skip, default is 0.
+        limit (int, optional): The maximum number of results, default is 20.
+        session (AsyncSession): The database session to execute queries.
+
+    Raises:
+        InvalidSearchError: If the query is blank.
+
+    Returns:
+        list[SearchResult]: The matching heroes and teams, best match first.
+    """
+    selects = []
+    for kind in SearchKind:
+        if kind not in kinds:
+            continue
+        table, weights = SEARCH_SOURCES[kind]
+        index = search_table_name(table)
+        # bm25() is lower for better matches; the score is flipped to read naturally.
+        selects.append(
+            f"SELECT '{kind.value}' AS kind, rowid AS id, name, "
+            f"-bm25({index}, {', '.join(map(str, weights))}) AS score "
+            f"FROM {index} WHERE {index} MATCH :match"
+        )
+    if not selects:
+        return []
+    statement = text(
+        " UNION ALL ".join(selects)
+        + " ORDER BY score DESC, kind, id LIMIT :limit OFFSET :offset"
+    )
+    connection = await session.connection()
+    rows = await connection.execute(
+        statement,
+        {"match": match_expression(query), "limit": limit, "offset": offset},
+    )
+    return [SearchResult.model_validate(row) for row in rows.mappings()]
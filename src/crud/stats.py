@@ -0,0 +1,155 @@
+from sqlalchemy import func
+
+# Unlike sqlmodel's select(), yields rows even when a single column is selected.
+from sqlalchemy import select as select_rows
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.crud.team import TeamNotFoundError
+from src.models.hero import Hero
+from src.models.stats import (
+    AgeBucket,
+    StatsPublic,
+    TeamHeroCount,
+    TeamStats,
+    TeamStatsPublic,
+)
+from src.models.team import Team
+
+
+def average(total: int | None, count: int | None) -> float | None:
+    """
+    Divide ``total`` by ``count``, or return None when there is nothing to average.
+    """
+    return total / count if count else None
+
+
+async def age_histogram(
+    *, bucket_size: int, team_id: int | None = None, session: AsyncSession
+) -> list[AgeBucket]:
+    """
+    Count heroes with a known age per age bucket, with ``GROUP BY`` over the age
+    index (or the team_id index when restricted to a team).
+
+    Args:
+        bucket_size (int): The width of each bucket, in years.
+        team_id (int, optional): Only count the heroes of this team.
+        session (AsyncSession): The database session to execute queries.
+
+    Returns:
+        list[AgeBucket]: The non-empty buckets, youngest first.
+    """
+    bucket = (Hero.age // bucket_size) * bucket_size
+    statement = select_rows(bucket.label("bucket"), func.count()).where(
+        Hero.age.is_not(None)
+    )
+    if team_id is not None:
+        statement = statement.where(Hero.team_id == team_id)
+    rows = await session.exec(statement.group_by("bucket").order_by("bucket"))
+    return [
+        AgeBucket(min_age=start, max_age=start + bucket_size - 1, count=count)
+        for start, count in rows
+    ]
+
+
+async def get_team_stats(
+    *, team_id: int, bucket_size: int = 10, session: AsyncSession
+) -> TeamStatsPublic:
+    """
+    Read the hero count and average age of a team from its counters, and compute
+    its age histogram.
+
+    Args:
+        team_id (int): The ID of the team.
+        bucket_size (int, optional): The width of the histogram buckets, default is 10.
+        session (AsyncSession): The database session to execute queries.
+
+    Raises:
+        TeamNotFoundError: If the team with the given ID does not exist.
+
+    Returns:
+        TeamStatsPublic: The statistics of the team.
+    """
+    counters = (
+        await session.exec(
+            select_rows(
+                TeamStats.hero_count, TeamStats.age_count, TeamStats.age_sum
+            ).where(TeamStats.team_id == team_id)
+        )
+    ).first()
+    if counters is None:
+        raise TeamNotFoundError(f"Team with id: {team_id} not found")
+    return TeamStatsPublic(
+        team_id=team_id,
+        hero_count=counters.hero_count,
+        average_age=average(counters.age_sum, counters.age_count),
+        age_histogram=await age_histogram(
+            bucket_size=bucket_size, team_id=team_id, session=session
+        ),
+    )
+
+
+async def get_stats(
+    *, bucket_size: int = 10, limit: int = 100, session: AsyncSession
+) -> StatsPublic:
+    """
+    Compute the statistics of all heroes and the teams with the most heroes.
+
+    Totals add up the team counters and the heroes without a team (found through
+    the team_id index), so they do not read every hero; only the histogram does.
+
+    Args:
+        bucket_size (int, optional): The width of the histogram buckets, default is 10.
+        limit (int, optional): The maximum number of teams listed, default is 100.
+        session (AsyncSession): The database session to execute queries.
+
+    Returns:
+        StatsPublic: The statistics, with the largest teams first.
+    """
+    teamed = (
+        await session.exec(
+            select_rows(
+                func.count(),
+                func.coalesce(func.sum(TeamStats.hero_count), 0),
+                func.coalesce(func.sum(TeamStats.age_count), 0),
+                func.coalesce(func.sum(TeamStats.age_sum), 0),
+            )
+        )
+    ).one()
+    team_count, teamed_heroes, teamed_ages, teamed_age_sum = teamed
+    unteamed_heroes, unteamed_ages, unteamed_age_sum = (
+        await session.exec(
+            select_rows(
+                func.count(), func.count(Hero.age), func.coalesce(func.sum(Hero.age), 0)
+            ).where(Hero.team_id.is_(None))
+        )
+    ).one()
+    teams = await session.exec(
+        select_rows(
+            Team.id,
+            Team.name,
+            TeamStats.hero_count,
+            TeamStats.age_count,
+            TeamStats.age_sum,
+        )
+        .join(TeamStats, TeamStats.team_id == Team.id)
+        .order_by(TeamStats.hero_count.desc(), Team.id)
+        .limit(limit)
+    )
+    return StatsPublic(
+        team_count=team_count,
+        hero_count=teamed_heroes + unteamed_heroes,
+        heroes_without_team=unteamed_heroes,
+        average_age=average(
+            teamed_age_sum + unteamed_age_sum, teamed_ages + unteamed_ages
+        ),
+        age_histogram=await age_histogram(bucket_size=bucket_size, session=session),
+        teams=[
+            TeamHeroCount(
+                team_id=team.id,
+                name=team.name,
+                hero_count=team.hero_count,
+                average_age=average(team.age_sum, team.age_count),
+            )
+            for team in teams
+        ],
+    )
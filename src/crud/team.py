@@ -1,5 +1,34 @@
-from sqlmodel import Session, select
-from src.models.team import TeamCreate, Team, TeamUpdate
+from collections.abc import AsyncIterator, Sequence
+from typing import Literal
+
+from sqlalchemy import Row
+from sqlalchemy.sql import ColumnElement
+
+# Unlike sqlmodel's select(), yields rows even when a single column is selected.
+from sqlalchemy import select as select_rows
+from sqlalchemy.orm.exc import StaleDataError
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.cache import mark_stale, team_tag
+from src.conditional import PreconditionFailedError, check_if_match, make_etag
+from src.crud.bulk import BulkRow, write_rows
+from src.crud.loading import LoadStrategy, relationship_loader
+from src.crud.filtering import prefix_condition
+from src.crud.pagination import paginate, sort_column
+from src.models.bulk import BulkItemResult, BulkItemStatus
+from src.models.hero import Hero
+from src.models.public import HeroPublic
+from src.models.team import TeamCreate, Team, TeamFilter, TeamUpdate
+
+
+TeamOrderBy = Literal["id", "name", "-id", "-name"]
+# Columns of an exported team, in the order of TeamPublic's fields.
+TEAM_EXPORT_COLUMNS = ("name", "headquarters", "id")
+# Columns of a team member, in the order of HeroPublic's fields.
+MEMBER_COLUMNS = tuple(HeroPublic.model_fields)
+# Fields a client can request with ``fields=``: the public columns and the heroes.
+TEAM_FIELDS = (*TEAM_EXPORT_COLUMNS, "heroes")
 
 
 class TeamNotFoundError(Exception):
@@ -10,47 +39,368 @@ class TeamNotFoundError(Exception):
     pass
 
 
-def create_team(team: TeamCreate, session: Session) -> Team:
+def team_etag(team: Team) -> str:
+    """
+    Compute the strong ETag of a team's representation, which embeds its heroes.
+
+    Args:
+        team (Team): The team, with ``Team.heroes`` loaded.
+
+    Returns:
+        str: The quoted entity tag.
+    """
+    members = sorted((hero.id, hero.version) for hero in team.heroes)
+    return make_etag("team", team.id, team.version, members)
+
+
+def team_row_etag(team: Row, members: list[Row], fields: Sequence[str]) -> str:
+    """
+    Compute the strong ETag of a projection of a team read by ``get_team_row``.
+
+    Args:
+        team (Row): The team row returned by ``get_team_row``.
+        members (list[Row]): The hero rows returned with it.
+        fields (Sequence[str]): The fields they were read with.
+
+    Returns:
+        str: The quoted entity tag.
+    """
+    versions = [(hero.id, hero.version) for hero in members]
+    return make_etag("team", team.id, team.version, versions, tuple(fields))
+
+
+async def create_team(team: TeamCreate, session: AsyncSession) -> Team:
     """
     Create a team in the database.
 
     Args:
         team (TeamCreate): Data required to create a new team.
-        session (Session): The database session used for operations.
+        session (AsyncSession): The database session used for operations.
 
     Returns:
-        Team: The newly created and saved team instance.
+        Team: The newly created team, flushed so that its ID is set.
     """
     db_team = Team.model_validate(team)
     session.add(db_team)
-    session.commit()
-    session.refresh(db_team)
+    await session.flush()
     return db_team
 
 
-def get_teams(*, offset: int = 0, limit: int = 100, session: Session) -> list[Team]:
+async def create_teams_bulk(
+    *, teams: list[TeamCreate], upsert: bool = False, session: AsyncSession
+) -> list[BulkItemResult]:
+    """
+    Create many teams using executemany inserts.
+
+    Args:
+        teams (list[TeamCreate]): Data of the teams to create.
+        upsert (bool, optional): Update the existing team with the same name
+            (only the fields provided) instead of creating a new one, default is False.
+        session (AsyncSession): The database session used for operations.
+
+    Returns:
+        list[BulkItemResult]: One result per item, in payload order.
+    """
+    rows = [
+        BulkRow(
+            index,
+            team.name,
+            team.model_dump(),
+            team.model_dump(exclude_unset=True),
+        )
+        for index, team in enumerate(teams)
+    ]
+    connection = await session.connection()
+    results = await write_rows(connection, Team.__table__, rows, upsert=upsert)
+    mark_stale(
+        session,
+        *(
+            team_tag(result.id)
+            for result in results
+            if result.status == BulkItemStatus.UPDATED
+        ),
+    )
+    return sorted(results, key=lambda result: result.index)
+
+
+async def get_teams(
+    *,
+    offset: int = 0,
+    limit: int = 100,
+    load: LoadStrategy = LoadStrategy.SELECTIN,
+    order_by: TeamOrderBy = "id",
+    cursor: str | None = None,
+    filters: TeamFilter | None = None,
+    session: AsyncSession,
+) -> list[Team]:
     """
     Retrieve teams from the database.
 
+    Teams are ordered by ``order_by`` then ``id``; the ``cursor`` of the previous
+    page continues from its last row using the index (keyset pagination).
+
     Args:
         offset (int, optional): The number of records to skip, default is 0.
         limit (int, optional): The maximum number of records to retrieve, default is 100.
-        session (Session): The database session to execute queries.
+        load (LoadStrategy, optional): How ``Team.heroes`` is loaded, default is SELECTIN.
+        order_by (TeamOrderBy, optional): The indexed column to order by, prefixed
+            with "-" for descending order, default is "id".
+        cursor (str, optional): Opaque cursor returned with the previous page.
+        filters (TeamFilter, optional): Restricts the teams returned.
+        session (AsyncSession): The database session to execute queries.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or built for another ordering.
 
     Returns:
         list[Team]: A list of retrieved team objects.
     """
-    statement = select(Team).offset(offset).limit(limit)
-    return session.exec(statement).all()
+    statement = paginate(
+        select(Team)
+        .options(relationship_loader(Team.heroes, load))
+        .where(*team_conditions(filters)),
+        getattr(Team, sort_column(order_by)),
+        Team.id,
+        key=order_by,
+        offset=offset,
+        limit=limit,
+        cursor=cursor,
+    )
+    return (await session.exec(statement)).unique().all()
+
+
+def team_conditions(filters: TeamFilter | None) -> list[ColumnElement[bool]]:
+    """
+    Translate team filters into ``WHERE`` conditions on indexed columns.
+
+    Args:
+        filters (TeamFilter, optional): The filters to apply.
+
+    Returns:
+        list[ColumnElement[bool]]: The conditions, to be combined with ``AND``.
+    """
+    if filters is None:
+        return []
+    conditions = []
+    if filters.name_prefix is not None:
+        conditions.append(prefix_condition(Team.name, filters.name_prefix))
+    if filters.headquarters is not None:
+        conditions.append(Team.headquarters == filters.headquarters)
+    return conditions
+
+
+def team_projection(fields: Sequence[str], extra: Sequence[str] = ()) -> list:
+    """
+    List the columns to select for a projection of teams.
+
+    The requested team columns come first, in the order of ``TEAM_EXPORT_COLUMNS``,
+    then the ``extra`` columns not already selected (e.g. what pagination needs),
+    so a serializer can slice each row by position.
+
+    Args:
+        fields (Sequence[str]): The requested fields, out of ``TEAM_FIELDS``.
+        extra (Sequence[str], optional): Team columns needed besides the fields.
+
+    Returns:
+        list: The columns to select.
+    """
+    names = [column for column in TEAM_EXPORT_COLUMNS if column in fields]
+    columns = [getattr(Team, column) for column in names]
+    columns += [
+        getattr(Team, column) for column in dict.fromkeys(extra) if column not in names
+    ]
+    return columns
+
+
+async def get_member_rows(
+    *, team_ids: list[int], extra: Sequence[str] = (), session: AsyncSession
+) -> dict[int, list[Row]]:
+    """
+    Retrieve the heroes of several teams in one query, as plain rows.
+
+    Args:
+        team_ids (list[int]): The teams whose heroes to read.
+        extra (Sequence[str], optional): Hero columns to read after ``MEMBER_COLUMNS``.
+        session (AsyncSession): The database session to execute queries.
+
+    Returns:
+        dict[int, list[Row]]: The hero rows of each team, ordered by id.
+    """
+    members = {team_id: [] for team_id in team_ids}
+    if members:
+        columns = [getattr(Hero, column) for column in (*MEMBER_COLUMNS, *extra)]
+        heroes = await session.exec(
+            select_rows(*columns).where(Hero.team_id.in_(team_ids)).order_by(Hero.id)
+        )
+        for hero in heroes:
+            members[hero.team_id].append(hero)
+    return members
 
 
-def get_team_by_id(*, team_id: int, session: Session) -> Team:
+async def get_team_rows(
+    *,
+    offset: int = 0,
+    limit: int = 100,
+    order_by: TeamOrderBy = "id",
+    cursor: str | None = None,
+    fields: Sequence[str] = TEAM_FIELDS,
+    filters: TeamFilter | None = None,
+    session: AsyncSession,
+) -> list[tuple[Row, list[Row]]]:
+    """
+    Retrieve a page of teams, like ``get_teams``, as plain rows.
+
+    Only the columns of the requested ``fields`` are selected (see
+    ``team_projection``), and the heroes of the page are only read, in one more
+    query, if "heroes" is requested, so no ORM objects are built.
+
+    Args:
+        offset (int, optional): The number of records to skip, default is 0.
+        limit (int, optional): The maximum number of records to retrieve, default is 100.
+        order_by (TeamOrderBy, optional): The indexed column to order by, prefixed
+            with "-" for descending order, default is "id".
+        cursor (str, optional): Opaque cursor returned with the previous page.
+        fields (Sequence[str], optional): The fields to read, default is TEAM_FIELDS.
+        filters (TeamFilter, optional): Restricts the teams returned.
+        session (AsyncSession): The database session to execute queries.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or built for another ordering.
+
+    Returns:
+        list[tuple[Row, list[Row]]]: Each team row with the rows of its heroes
+        (empty if "heroes" is not requested).
+    """
+    column = sort_column(order_by)
+    statement = paginate(
+        select_rows(*team_projection(fields, extra=(column, "id"))).where(
+            *team_conditions(filters)
+        ),
+        getattr(Team, column),
+        Team.id,
+        key=order_by,
+        offset=offset,
+        limit=limit,
+        cursor=cursor,
+    )
+    teams = (await session.exec(statement)).all()
+    members = {}
+    if "heroes" in fields:
+        members = await get_member_rows(
+            team_ids=[team.id for team in teams], session=session
+        )
+    return [(team, members.get(team.id, [])) for team in teams]
+
+
+async def get_team_row(
+    *, team_id: int, fields: Sequence[str] = TEAM_FIELDS, session: AsyncSession
+) -> tuple[Row, list[Row]]:
+    """
+    Retrieve the requested ``fields`` of a team as plain rows.
+
+    Besides the projection (see ``team_projection``) the team row holds ``id``
+    and ``version``, and each hero row ends with its ``version``, to tag and
+    version the representation.
+
+    Args:
+        team_id (int): The unique identifier of the team to retrieve.
+        fields (Sequence[str], optional): The fields to read, default is TEAM_FIELDS.
+        session (AsyncSession): The database session used for operations.
+
+    Returns:
+        tuple[Row, list[Row]]: The team row and the rows of its heroes (empty if
+        "heroes" is not requested).
+
+    Raises:
+        TeamNotFoundError: If no team is found with the given identifier.
+    """
+    columns = team_projection(fields, extra=("id", "version"))
+    team = (await session.exec(select_rows(*columns).where(Team.id == team_id))).first()
+    if team is None:
+        raise TeamNotFoundError(f"Team with id: {team_id} not found")
+    members = []
+    if "heroes" in fields:
+        by_team = await get_member_rows(
+            team_ids=[team_id], extra=("version",), session=session
+        )
+        members = by_team[team_id]
+    return team, members
+
+
+async def get_team_etag(
+    *, team_id: int, fields: Sequence[str] | None = None, session: AsyncSession
+) -> str:
+    """
+    Compute the ETag of a team's representation from the versions of its rows
+    alone, so that a conditional request is answered without building the body.
+
+    Args:
+        team_id (int): The unique identifier of the team.
+        fields (Sequence[str], optional): The fields of a projection, as read by
+            ``get_team_row``; None for the full representation.
+        session (AsyncSession): The database session used for operations.
+
+    Returns:
+        str: The quoted entity tag, equal to ``team_etag`` (or ``team_row_etag``
+        for a projection) of the same team.
+
+    Raises:
+        TeamNotFoundError: If no team is found with the given identifier.
+    """
+    statement = select_rows(Team.id, Team.version).where(Team.id == team_id)
+    team = (await session.exec(statement)).first()
+    if team is None:
+        raise TeamNotFoundError(f"Team with id: {team_id} not found")
+    members = []
+    if fields is None or "heroes" in fields:
+        statement = (
+            select_rows(Hero.id, Hero.version)
+            .where(Hero.team_id == team_id)
+            .order_by(Hero.id)
+        )
+        members = (await session.exec(statement)).all()
+    if fields is not None:
+        return team_row_etag(team, members, fields)
+    versions = [(hero.id, hero.version) for hero in members]
+    return make_etag("team", team.id, team.version, versions)
+
+
+async def stream_teams(
+    *, batch_size: int = 1000, session: AsyncSession
+) -> AsyncIterator[Sequence[Row]]:
+    """
+    Stream every team, ordered by id, through a server-side cursor.
+
+    Args:
+        batch_size (int, optional): Rows fetched per round-trip, default is 1000.
+        session (AsyncSession): The database session; it must stay open while
+            the stream is consumed.
+
+    Yields:
+        Sequence[Row]: The next batch of rows holding ``TEAM_EXPORT_COLUMNS``.
+    """
+    columns = [getattr(Team, column) for column in TEAM_EXPORT_COLUMNS]
+    statement = (
+        select(*columns).order_by(Team.id).execution_options(yield_per=batch_size)
+    )
+    result = await session.stream(statement)
+    async for partition in result.partitions():
+        yield partition
+
+
+async def get_team_by_id(
+    *,
+    team_id: int,
+    load: LoadStrategy = LoadStrategy.SELECTIN,
+    session: AsyncSession,
+) -> Team:
     """
     Retrieve a team by its ID.
 
     Args:
         team_id (int): The unique identifier of the team to retrieve.
-        session (Session): The database session used for operations.
+        load (LoadStrategy, optional): How ``Team.heroes`` is loaded, default is SELECTIN.
+        session (AsyncSession): The database session used for operations.
 
     Returns:
         Team: The retrieved team object.
@@ -58,45 +408,95 @@ def get_team_by_id(*, team_id: int, session: Session) -> Team:
     Raises:
         TeamNotFoundError: If no team is found with the given identifier.
     """
-    team = session.get(Team, team_id)
+    team = await session.get(
+        Team, team_id, options=[relationship_loader(Team.heroes, load)]
+    )
     if not team:
         raise TeamNotFoundError(f"Team with id: {team_id} not found")
     return team
 
 
-def update_team(*, team_id: int, team: TeamUpdate, session: Session) -> Team:
+async def update_team(
+    *,
+    team_id: int,
+    team: TeamUpdate,
+    if_match: str | None = None,
+    session: AsyncSession,
+) -> Team:
     """
     Update a team by its ID.
 
     Args:
         team_id (int): The unique identifier of the team to update.
         team (TeamUpdate): An object containing updated team data.
-        session (Session): The database session used to update records.
+        if_match (str, optional): ``If-Match`` header; the update only happens if
+            the team's current ETag matches, default is None.
+        session (AsyncSession): The database session used to update records.
 
     Returns:
         Team: The updated team object.
+
+    Raises:
+        TeamNotFoundError: If no team is found with the given identifier.
+        PreconditionFailedError: If ``if_match`` does not match, or the team was
+            changed concurrently.
     """
-    db_team = get_team_by_id(team_id=team_id, session=session)
+    db_team = await _get_team_if_match(
+        team_id=team_id, if_match=if_match, session=session
+    )
     team_data = team.model_dump(exclude_unset=True)
     db_team.sqlmodel_update(team_data)
     session.add(db_team)
-    session.commit()
-    session.refresh(db_team)
+    mark_stale(session, team_tag(team_id))
+    await _flush_versioned(session)
     return db_team
 
 
-def delete_team(*, team_id: int, session: Session) -> bool:
+async def delete_team(
+    *, team_id: int, if_match: str | None = None, session: AsyncSession
+) -> bool:
     """
     Delete a team by its ID.
 
     Args:
         team_id (int): The unique identifier of the team to delete.
-        session (Session): The database session to perform the deletion.
+        if_match (str, optional): ``If-Match`` header; the team is only deleted if
+            its current ETag matches, default is None.
+        session (AsyncSession): The database session to perform the deletion.
 
     Returns:
         bool: True if the team was successfully deleted.
+
+    Raises:
+        TeamNotFoundError: If no team is found with the given identifier.
+        PreconditionFailedError: If ``if_match`` does not match, or the team was
+            changed concurrently.
     """
-    db_team = get_team_by_id(team_id=team_id, session=session)
-    session.delete(db_team)
-    session.commit()
+    db_team = await _get_team_if_match(
+        team_id=team_id, if_match=if_match, session=session
+    )
+    await session.delete(db_team)
+    mark_stale(session, team_tag(team_id))
+    await _flush_versioned(session)
     return True
+
+
+async def _get_team_if_match(
+    *, team_id: int, if_match: str | None, session: AsyncSession
+) -> Team:
+    # The heroes are only needed to compute the ETag.
+    load = LoadStrategy.NONE if if_match is None else LoadStrategy.SELECTIN
+    db_team = await get_team_by_id(team_id=team_id, load=load, session=session)
+    if if_match is not None:
+        check_if_match(if_match, team_etag(db_team))
+    return db_team
+
+
+async def _flush_versioned(session: AsyncSession) -> None:
+    # The UPDATE/DELETE is guarded by the version read above; no row matching
+    # means another request changed the team in between. Rolling back is left
+    # to whoever owns the transaction.
+    try:
+        await session.flush()
+    except StaleDataError as e:
+        raise PreconditionFailedError("Team was modified concurrently") from e
@@ -0,0 +1,41 @@
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.user import User, UserCreate
+from src.security.passwords import hasher
+
+
+async def create_user(user: UserCreate, session: AsyncSession) -> User:
+    """
+    Creates a user, storing only a KDF hash of the password.
+
+    Args:
+        user (UserCreate): The username and plain text password.
+        session (AsyncSession): The database session.
+
+    Raises:
+        HasherBusyError: If the password hashing pool is saturated.
+
+    Returns:
+        User: The created user.
+    """
+    db_user = User(
+        username=user.username, hashed_password=await hasher.hash(user.password)
+    )
+    session.add(db_user)
+    await session.flush()
+    return db_user
+
+
+async def get_user_by_username(username: str, session: AsyncSession) -> User | None:
+    """
+    Retrieves a user by username.
+
+    Args:
+        username (str): The username to look up.
+        session (AsyncSession): The database session.
+
+    Returns:
+        User | None: The user, or None if there is no such user.
+    """
+    return (await session.exec(select(User).where(User.username == username))).first()
@@ -1,16 +1,33 @@
-from contextlib import asynccontextmanager, contextmanager
-from typing import Generator
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
 
 from fastapi import FastAPI
-from sqlalchemy import create_engine, Engine
-from sqlmodel import Session, SQLModel, text
-from pathlib import Path
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from src.crud.user import create_user, get_user_by_username
 from src.models.hero import Hero
 from src.models.team import Team
+from src.migrations import (
+    SCHEMA_VERSION,
+    MigrationRunner,
+    get_schema_version,
+)
+from src.models.user import UserCreate
+from src.pool import PoolConfig
+from src.querylog import query_log
+from src.settings import Settings, get_settings
 
 
-def init_db(session: Session):
+async def init_db(session: AsyncSession):
     # Heroes
     hero_batman = Hero(name="Batman", secret_name="Bruce Wayne", age=35)
     hero_superman = Hero(name="Superman", secret_name="Clark Kent", age=30)
@@ -25,87 +42,320 @@ def init_db(session: Session):
         ),
         Team(name="Humanity", headquarters="Earth", heroes=[hero_cyborg, hero_flash]),
     ]
-    for team in teams:
-        session.add(team)
-        session.commit()
+    session.add_all(teams)
+    # Sample user for HTTP Basic authentication; only its scrypt hash is stored.
+    await create_user(UserCreate(username="saber", password="password"), session)
+    await session.commit()
 
 
 def get_database_url(name: str) -> str:
     """
-    Generate an SQLite database URL string for the given database name.
+    Generate an async SQLite database URL string for the given database name.
 
     Args:
         name (str): The name of the database.
 
     Returns:
-        str: The SQLite database URL.
+        str: The SQLite database URL, using the aiosqlite driver.
     """
-    # check if a databse with this name exist in the current directory
-    if Path(f"{name}.db").exists():
-        print(f"Database {name}.db already exists. Deleting it.")
-        Path(f"{name}.db").unlink()
-    # return the SQLite database URL
-    return f"sqlite:///{name}.db"
+    return f"sqlite+aiosqlite:///{name}.db"
 
 
-def get_engine(db_url: str) -> Engine:
-    """Create and return a new SQLAlchemy engine using the provided database URL.
+class SQLiteProfile(BaseModel):
+    """
+    PRAGMAs applied to every new SQLite connection. A field set to None leaves
+    SQLite's default in place.
+    """
+
+    journal_mode: str | None = None
+    synchronous: str | None = None
+    mmap_size: int | None = None
+    cache_size: int | None = None
+    busy_timeout: int | None = None
+    temp_store: str | None = None
+    foreign_keys: bool = True
+
+    def pragmas(self) -> list[str]:
+        """
+        Render the profile as PRAGMA statements.
+
+        Returns:
+            list[str]: One ``PRAGMA name=value`` statement per configured field.
+        """
+        statements = []
+        for name, value in self.model_dump(exclude_none=True).items():
+            if isinstance(value, bool):
+                value = "ON" if value else "OFF"
+            statements.append(f"PRAGMA {name}={value}")
+        return statements
+
+
+SQLITE_PROFILES = {
+    # SQLite defaults, plus foreign keys so ON DELETE CASCADE is enforced.
+    "default": SQLiteProfile(),
+    # WAL lets readers run alongside the writer and, with synchronous=NORMAL,
+    # only fsyncs at checkpoints instead of on every commit.
+    "production": SQLiteProfile(
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        mmap_size=256 * 1024 * 1024,
+        cache_size=-64 * 1024,  # negative: KiB, i.e. 64 MiB
+        busy_timeout=5000,
+        temp_store="MEMORY",
+    ),
+}
+
+
+def apply_sqlite_profile(engine: AsyncEngine, profile: SQLiteProfile) -> None:
+    """
+    Register a connect event that applies ``profile`` to every pooled connection.
 
     Args:
-        db_url (str): The database URL to connect to.
+        engine (AsyncEngine): The engine whose connections are configured.
+        profile (SQLiteProfile): The PRAGMAs to apply.
+    """
+    pragmas = profile.pragmas()
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def get_engine(
+    db_url: str,
+    profile: SQLiteProfile | None = None,
+    echo: bool = False,
+    pool: PoolConfig | None = None,
+) -> AsyncEngine:
+    """Create and return a new async SQLAlchemy engine using the provided database URL.
+
+    Args:
+        db_url (str): The database URL to connect to. Must use an async driver
+                      (e.g. ``sqlite+aiosqlite://``).
+        profile (SQLiteProfile, optional): PRAGMAs applied to each new connection.
+                                           Defaults to the "default" profile.
+        echo (bool, optional): Log every SQL statement. Defaults to False.
+        pool (PoolConfig, optional): How connections are pooled. Defaults to a
+                                     monitored queue pool of 5 (+10 overflow).
 
     Returns:
-        Engine: A SQLAlchemy Engine instance connected to the specified database.
+        AsyncEngine: A SQLAlchemy AsyncEngine instance connected to the specified database.
     """
-    return create_engine(url=db_url, echo=True)
+    engine = create_async_engine(
+        url=db_url, echo=echo, **(pool or PoolConfig()).engine_options()
+    )
+    apply_sqlite_profile(engine, profile or SQLITE_PROFILES["default"])
+    return engine
 
 
-@contextmanager
-def get_session(engine: Engine) -> Generator[Session, None, None]:
+@asynccontextmanager
+async def get_session(engine: AsyncEngine) -> AsyncGenerator[AsyncSession, None]:
     """
-    Context manager that yields a new Session object bound to the provided engine.
+    Async context manager that yields a new AsyncSession bound to the provided engine.
+
+    Objects are not expired on commit, so their loaded attributes stay usable
+    without triggering implicit (blocking) IO afterwards.
 
     Args:
-        engine (Engine): The SQLAlchemy Engine instance to bind the session to.
+        engine (AsyncEngine): The SQLAlchemy AsyncEngine instance to bind the session to.
 
     Yields:
-        Session: A SQLModel Session instance.
+        AsyncSession: A SQLModel AsyncSession instance.
     """
-    session = Session(engine)
+    session = AsyncSession(engine, expire_on_commit=False)
     try:
         yield session
     finally:
-        session.close()
+        await session.close()
 
 
-def create_db_and_tables(engine: Engine, models=None):
+async def create_db_and_tables(engine: AsyncEngine, models=None):
     """
     Create tables in the database using the provided engine and models.
 
     Args:
-        engine (Engine): The SQLAlchemy Engine instance to use for table creation.
+        engine (AsyncEngine): The SQLAlchemy AsyncEngine instance to use for table creation.
         models (list, optional): List of SQLModel classes to create tables for.
-                               If None, uses all registered models.
+                               If None, creates the whole schema, or migrates
+                               an existing database to it (see ``ensure_schema``).
     """
-    if models:
-        # Create only the specified models
-        SQLModel.metadata.create_all(
-            engine, tables=[model.__table__ for model in models]
+    if not models:
+        await ensure_schema(engine)
+        return
+    async with engine.begin() as connection:
+        await connection.run_sync(
+            SQLModel.metadata.create_all,
+            tables=[model.__table__ for model in models],
         )
-    else:
-        # Create all models
-        SQLModel.metadata.create_all(engine)
 
-    with engine.connect() as connection:
-        connection.execute(text("PRAGMA foreign_keys=ON"))
+
+async def ensure_schema(
+    engine: AsyncEngine, runner: MigrationRunner | None = None
+) -> bool:
+    """
+    Bring the database to ``SCHEMA_VERSION``: create the schema if it has no
+    tables, otherwise apply the migrations it is missing.
+
+    A database at the current version costs one PRAGMA, however large it is.
+    A new schema is created under the write lock, so that workers starting
+    together create it once; migrations take care of their own locking.
+
+    Args:
+        engine (AsyncEngine): The engine of the database.
+        runner (MigrationRunner, optional): Runs the migrations. Defaults to a
+            runner on ``engine`` with the default batch size.
+
+    Returns:
+        bool: Whether the schema was created by this call. False when it
+        existed, including when it was migrated.
+    """
+    async with engine.connect() as connection:
+        if await get_schema_version(connection) >= SCHEMA_VERSION:
+            return False
+        await connection.exec_driver_sql("BEGIN IMMEDIATE")
+        if await get_schema_version(connection) >= SCHEMA_VERSION:
+            # Another worker got the lock first.
+            await connection.rollback()
+            return False
+        tables = await connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table'"
+        )
+        if tables.first() is None:
+            await connection.run_sync(SQLModel.metadata.create_all)
+            await connection.exec_driver_sql(f"PRAGMA user_version={SCHEMA_VERSION}")
+            await connection.commit()
+            return True
+        await connection.rollback()
+    await (runner or MigrationRunner(engine)).migrate()
+    return False
+
+
+class Database:
+    """
+    The engines of the app and their session factories.
+
+    Engines are created on first use rather than at import, so importing the
+    app opens and changes no file. ``start`` prepares the database when the app
+    starts; it never drops or deletes data.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self._engine: AsyncEngine | None = None
+        self._replica_engine: AsyncEngine | None = None
+        self._session_factory: async_sessionmaker[AsyncSession] | None = None
+        self._read_session_factory: async_sessionmaker[AsyncSession] | None = None
+
+    def _create_engine(self, db_url: str) -> AsyncEngine:
+        engine = get_engine(
+            db_url,
+            profile=SQLITE_PROFILES[self.settings.sqlite_profile],
+            echo=self.settings.echo_sql,
+            pool=PoolConfig.from_settings(self.settings),
+        )
+        if self.settings.query_log_enabled:
+            query_log.attach(engine)
+        return engine
+
+    @property
+    def engine(self) -> AsyncEngine:
+        """The engine of the primary database."""
+        if self._engine is None:
+            self._engine = self._create_engine(
+                get_database_url(name=self.settings.database_name)
+            )
+        return self._engine
+
+    @property
+    def replica_engine(self) -> AsyncEngine | None:
+        """Read-only engine for requests that do not write; None reads the primary."""
+        if self._replica_engine is None and self.settings.replica_database_url:
+            self._replica_engine = self._create_engine(
+                self.settings.replica_database_url
+            )
+        return self._replica_engine
+
+    @property
+    def session_factory(self) -> async_sessionmaker[AsyncSession]:
+        """Opens sessions on the primary database."""
+        if self._session_factory is None:
+            self._session_factory = async_sessionmaker(
+                self.engine, class_=AsyncSession, expire_on_commit=False
+            )
+        return self._session_factory
+
+    @property
+    def read_session_factory(self) -> async_sessionmaker[AsyncSession] | None:
+        """Opens sessions on the replica; None when there is none."""
+        if self._read_session_factory is None and self.replica_engine is not None:
+            self._read_session_factory = async_sessionmaker(
+                self.replica_engine, class_=AsyncSession, expire_on_commit=False
+            )
+        return self._read_session_factory
+
+    async def start(self) -> None:
+        """
+        Create or migrate the schema if the database is not at ``SCHEMA_VERSION``
+        yet, write the sample data if ``seed_sample_data`` is set and the
+        schema was new, and create the bootstrap user if it is configured.
+        """
+        runner = MigrationRunner(
+            self.engine,
+            batch_size=self.settings.migration_batch_size,
+            pause_seconds=self.settings.migration_pause_ms / 1000,
+        )
+        created = await ensure_schema(self.engine, runner)
+        if created and self.settings.seed_sample_data:
+            async with get_session(self.engine) as session:
+                await init_db(session)
+        if self.settings.bootstrap_username and self.settings.bootstrap_password:
+            await self.create_bootstrap_user(
+                UserCreate(
+                    username=self.settings.bootstrap_username,
+                    password=self.settings.bootstrap_password,
+                )
+            )
+
+    async def create_bootstrap_user(self, user: UserCreate) -> bool:
+        """
+        Create ``user`` unless a user with its name exists. An existing user is
+        left alone, so changing the setting does not reset a password.
+
+        Args:
+            user (UserCreate): The username and password of the first user.
+
+        Returns:
+            bool: Whether the user was created.
+        """
+        async with get_session(self.engine) as session:
+            if await get_user_by_username(user.username, session) is not None:
+                return False
+            try:
+                await create_user(user, session)
+                await session.commit()
+            except IntegrityError:
+                # Another worker starting at the same time created it first.
+                await session.rollback()
+                return False
+        return True
+
+    async def dispose(self) -> None:
+        """
+        Close the pooled connections of the engines created so far.
+        """
+        for engine in (self._engine, self._replica_engine):
+            if engine is not None:
+                await engine.dispose()
 
 
-db_url = get_database_url(name="crud")
-engine = get_engine(db_url)
+database = Database(get_settings())
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    create_db_and_tables(engine)
-    init_db(Session(engine))
+    await database.start()
     yield
+    await database.dispose()
@@ -1,15 +1,111 @@
+import time
 from typing import Annotated
-from sqlmodel import Session
-from fastapi import Depends
-from src.database import engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+from fastapi import Depends, Request, Response
+from src.database import database
+from src.settings import Settings, get_settings
 
+# Requests with these methods never write, so they may read from the replica.
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+# Set after a write; until the time it holds, the client's reads go to the primary.
+PRIMARY_COOKIE = "crud_primary_until"
 
-def get_session():
-    session = Session(engine)
+
+SettingsDep = Annotated[Settings, Depends(get_settings)]
+
+
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    """
+    Return the factory used to open sessions on the primary database.
+    """
+    return database.session_factory
+
+
+SessionFactoryDep = Annotated[
+    async_sessionmaker[AsyncSession], Depends(get_session_factory)
+]
+
+
+def get_read_session_factory(
+    factory: SessionFactoryDep,
+) -> async_sessionmaker[AsyncSession]:
+    """
+    Return the factory used to open read-only sessions: on the replica when one
+    is configured, otherwise on the primary.
+    """
+    return database.read_session_factory or factory
+
+
+ReadSessionFactoryDep = Annotated[
+    async_sessionmaker[AsyncSession], Depends(get_read_session_factory)
+]
+
+
+def wrote_recently(request: Request, now: float | None = None) -> bool:
+    """
+    Whether the client wrote within the read-your-writes window, according to
+    the cookie set on its last write.
+    """
     try:
-        yield session
-    finally:
-        session.close()
+        primary_until = float(request.cookies.get(PRIMARY_COOKIE, ""))
+    except ValueError:
+        return False
+    return (time.time() if now is None else now) < primary_until
+
+
+def get_routed_session_factory(
+    request: Request,
+    response: Response,
+    factory: SessionFactoryDep,
+    read_factory: ReadSessionFactoryDep,
+    settings: SettingsDep,
+) -> async_sessionmaker[AsyncSession]:
+    """
+    Pick the database a request runs against.
+
+    Writes go to the primary and make the client's reads follow them there for
+    ``read_your_writes_seconds``, so it never reads a replica that has not caught
+    up with its own write yet. Other reads go to the replica. Endpoints that
+    stream their response open their own session from this factory, since
+    request-scoped dependencies are closed before the body is sent.
+    """
+    if request.method not in READ_METHODS:
+        # Set before the endpoint runs: headers added afterwards are not sent.
+        window = settings.read_your_writes_seconds
+        response.set_cookie(
+            PRIMARY_COOKIE,
+            str(time.time() + window),
+            max_age=max(1, round(window)),
+            httponly=True,
+            samesite="lax",
+        )
+        return factory
+    if wrote_recently(request):
+        return factory
+    return read_factory
+
+
+RoutedSessionFactoryDep = Annotated[
+    async_sessionmaker[AsyncSession], Depends(get_routed_session_factory)
+]
+
+
+async def get_session(factory: RoutedSessionFactoryDep):
+    """
+    Open the request's session as a unit of work.
+
+    CRUD functions only flush their writes; the request commits them once, after
+    the endpoint returns, or rolls them all back if it raised.
+    """
+    async with factory() as session:
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+        else:
+            await session.commit()
 
 
-SessionDep = Annotated[Session, Depends(get_session)]
+SessionDep = Annotated[AsyncSession, Depends(get_session)]
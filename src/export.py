@@ -0,0 +1,51 @@
+import csv
+import io
+import json
+from collections.abc import AsyncIterator, Sequence
+from enum import Enum
+
+
+class DataFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+    @property
+    def media_type(self) -> str:
+        return "application/x-ndjson" if self is DataFormat.NDJSON else "text/csv"
+
+
+async def encode_rows(
+    partitions: AsyncIterator[Sequence[tuple]],
+    columns: Sequence[str],
+    export_format: DataFormat,
+) -> AsyncIterator[bytes]:
+    """
+    Encode batches of rows as NDJSON or CSV, yielding one chunk per batch so only
+    a single batch is ever held in memory.
+
+    Args:
+        partitions (AsyncIterator[Sequence[tuple]]): Batches of rows, each row
+            holding the values of ``columns`` in order.
+        columns (Sequence[str]): The column names, used as JSON keys / CSV header.
+        export_format (DataFormat): The output format.
+
+    Yields:
+        bytes: The encoded rows of one batch.
+    """
+    if export_format is DataFormat.CSV:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(columns)
+        async for rows in partitions:
+            writer.writerows(rows)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+        return
+
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    async for rows in partitions:
+        lines = [dumps(dict(zip(columns, row))) for row in rows]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
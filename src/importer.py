@@ -0,0 +1,193 @@
+import codecs
+import csv
+import json
+import logging
+from collections import Counter
+from collections.abc import AsyncIterator, Awaitable, Callable
+
+from pydantic import ValidationError
+from sqlmodel import SQLModel
+
+from src.export import DataFormat
+from src.models.bulk import (
+    BulkItemResult,
+    BulkItemStatus,
+    ImportChunk,
+    ImportReport,
+    ImportRowError,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ImportFormatError(Exception):
+    """
+    Exception raised when an upload cannot be parsed at all (e.g. a CSV without
+    a header line).
+    """
+
+
+async def iter_records(
+    chunks: AsyncIterator[bytes], data_format: DataFormat
+) -> AsyncIterator[tuple[int, str]]:
+    """
+    Split an uploaded body into records as the bytes arrive.
+
+    Only the current partial line is buffered. For CSV, a line break inside a
+    quoted field does not end the record: the record continues until its
+    double quotes are balanced.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The request body, chunk by chunk.
+        data_format (DataFormat): The format of the body.
+
+    Yields:
+        tuple[int, str]: The line number a record starts on and the record text.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending, record, record_line, line_number = "", "", 0, 0
+
+    def complete_lines(lines: list[str]):
+        nonlocal record, record_line, line_number
+        for line in lines:
+            line_number += 1
+            line = line.removesuffix("\r")
+            if not record:
+                record_line = line_number
+                record = line
+            else:
+                record += "\n" + line
+            if data_format is DataFormat.CSV and record.count('"') % 2:
+                continue
+            if record.strip():
+                yield record_line, record
+            record = ""
+
+    async for chunk in chunks:
+        *lines, pending = (pending + decoder.decode(chunk)).split("\n")
+        for item in complete_lines(lines):
+            yield item
+    for item in complete_lines([pending + decoder.decode(b"", final=True)]):
+        yield item
+    if record.strip():
+        yield record_line, record
+
+
+def parse_record(text: str, data_format: DataFormat, header: list[str] | None) -> dict:
+    """
+    Turn one NDJSON line or CSV record into a dict of fields. Empty CSV cells
+    become None.
+    """
+    if data_format is DataFormat.CSV:
+        values = next(csv.reader([text]))
+        if len(values) != len(header):
+            raise ValueError(f"Expected {len(header)} columns, got {len(values)}")
+        return {key: value or None for key, value in zip(header, values)}
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise TypeError("Each line must be a JSON object")
+    return data
+
+
+def describe_validation_error(error: ValidationError) -> list[str]:
+    return [
+        f"{'.'.join(str(part) for part in detail['loc']) or 'row'}: {detail['msg']}"
+        for detail in error.errors(include_url=False)
+    ]
+
+
+async def import_records(
+    chunks: AsyncIterator[bytes],
+    *,
+    data_format: DataFormat,
+    schema: type[SQLModel],
+    write_chunk: Callable[[list], Awaitable[list[BulkItemResult]]],
+    chunk_size: int = 1000,
+    max_errors: int = 100,
+) -> ImportReport:
+    """
+    Validate an NDJSON/CSV upload against ``schema`` and write it chunk by chunk.
+
+    Records are parsed as the body arrives. Every ``chunk_size`` valid rows are
+    handed to ``write_chunk``, which commits them in their own transaction, so
+    neither the file nor the ORM objects are ever held in memory as a whole.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The request body, chunk by chunk.
+        data_format (DataFormat): The format of the body.
+        schema (type[SQLModel]): The model each row is validated against.
+        write_chunk: Writes a list of validated rows and returns one result per row.
+        chunk_size (int, optional): Rows committed per transaction. Defaults to 1000.
+        max_errors (int, optional): Row errors kept in the report; later ones are
+            only counted. Defaults to 100.
+
+    Raises:
+        ImportFormatError: If a CSV upload has no header line.
+
+    Returns:
+        ImportReport: Totals, per-chunk progress and per-row errors.
+    """
+    report = ImportReport()
+    header = None
+    batch, batch_lines = [], []
+
+    def add_error(line: int, errors: list[str]):
+        report.failed += 1
+        if len(report.errors) < max_errors:
+            report.errors.append(ImportRowError(line=line, errors=errors))
+        else:
+            report.errors_truncated = True
+
+    async def flush():
+        progress = ImportChunk(
+            chunk=len(report.chunks) + 1,
+            first_line=batch_lines[0],
+            last_line=batch_lines[-1],
+        )
+        results = await write_chunk(batch)
+        counts = Counter(result.status for result in results)
+        progress.created = counts[BulkItemStatus.CREATED]
+        progress.updated = counts[BulkItemStatus.UPDATED]
+        progress.skipped = counts[BulkItemStatus.SKIPPED]
+        progress.failed = counts[BulkItemStatus.FAILED]
+        for result in results:
+            if result.status is BulkItemStatus.FAILED:
+                add_error(batch_lines[result.index], [result.detail])
+        report.created += progress.created
+        report.updated += progress.updated
+        report.skipped += progress.skipped
+        report.chunks.append(progress)
+        logger.info(
+            "Import chunk %d committed (lines %d-%d): %d created, %d updated, %d failed",
+            progress.chunk,
+            progress.first_line,
+            progress.last_line,
+            progress.created,
+            progress.updated,
+            progress.failed,
+        )
+        batch.clear()
+        batch_lines.clear()
+
+    async for line, text in iter_records(chunks, data_format):
+        if data_format is DataFormat.CSV and header is None:
+            header = next(csv.reader([text]))
+            continue
+        report.rows_read += 1
+        try:
+            row = schema.model_validate(parse_record(text, data_format, header))
+        except ValidationError as e:
+            add_error(line, describe_validation_error(e))
+            continue
+        except (ValueError, TypeError, csv.Error) as e:
+            add_error(line, [str(e)])
+            continue
+        batch.append(row)
+        batch_lines.append(line)
+        if len(batch) >= chunk_size:
+            await flush()
+    if batch:
+        await flush()
+    if data_format is DataFormat.CSV and header is None:
+        raise ImportFormatError("CSV upload must start with a header line")
+    return report
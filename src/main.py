@@ -1,11 +1,29 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 
 from src.database import lifespan
-from src.routers import heroes, teams
+from src.metrics import MetricsMiddleware
+from src.querylog import QueryLogMiddleware
+from src.routers import heroes, internal, metrics, search, stats, teams, users
+from src.security.basic import get_current_username
+from src.settings import get_settings
 
 # Create FastAPI app:
 app = FastAPI(lifespan=lifespan)
+settings = get_settings()
+if settings.query_log_enabled:
+    # Attributes slow queries and repeated statements to the route that ran them.
+    app.add_middleware(QueryLogMiddleware)
+if settings.metrics_enabled:
+    # Per-route latency, SQL and serialization time, on /metrics and Server-Timing.
+    app.add_middleware(MetricsMiddleware)
 
+# Every endpoint requires HTTP Basic credentials of a user in the user table.
+authenticated = [Depends(get_current_username)]
 
-app.include_router(heroes.router)
-app.include_router(teams.router)
+app.include_router(heroes.router, dependencies=authenticated)
+app.include_router(teams.router, dependencies=authenticated)
+app.include_router(search.router, dependencies=authenticated)
+app.include_router(stats.router, dependencies=authenticated)
+app.include_router(internal.router, dependencies=authenticated)
+app.include_router(metrics.router, dependencies=authenticated)
+app.include_router(users.router)
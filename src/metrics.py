@@ -0,0 +1,294 @@
+import asyncio
+import functools
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi import Response
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# Label of requests that matched no route, so unknown paths do not add series.
+UNMATCHED_ROUTE = "unmatched"
+QUERY_START_TIMES_KEY = "query_start_times"
+
+
+class RequestTiming:
+    """
+    Where the time of one request went: SQL (statements and their duration) and
+    the encoding of the endpoint's return value into the response body.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.route: str | None = None
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.serialization_seconds = 0.0
+        # When the endpoint returned a value for FastAPI to encode, and the SQL
+        # time spent by then.
+        self.endpoint_returned: tuple[float, float] | None = None
+
+    def server_timing(self, total_seconds: float) -> str:
+        """
+        Render the timing as a ``Server-Timing`` header value, in milliseconds.
+        """
+        return (
+            f'db;dur={self.query_seconds * 1000:.2f};desc="{self.queries} queries", '
+            f"serialize;dur={self.serialization_seconds * 1000:.2f}, "
+            f"total;dur={total_seconds * 1000:.2f}"
+        )
+
+
+current_timing: ContextVar[RequestTiming | None] = ContextVar(
+    "current_timing", default=None
+)
+
+
+@contextmanager
+def timed_serialization() -> Iterator[None]:
+    """
+    Count the time spent in the block as serialization of the current request,
+    for endpoints that encode their response body themselves.
+    """
+    timing = current_timing.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timing is not None:
+            timing.serialization_seconds += time.perf_counter() - started
+
+
+# Registered on every engine; outside a request there is no timing to update.
+@event.listens_for(Engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if current_timing.get() is not None:
+        conn.info.setdefault(QUERY_START_TIMES_KEY, []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    timing = current_timing.get()
+    started = conn.info.get(QUERY_START_TIMES_KEY)
+    if timing is not None and started:
+        timing.queries += 1
+        timing.query_seconds += time.perf_counter() - started.pop()
+
+
+class Histogram:
+    """
+    A Prometheus histogram: per label set, the count of observations at or below
+    each bucket bound, their sum and their count.
+    """
+
+    def __init__(
+        self, name: str, help: str, label_names: Sequence[str], buckets: Sequence[float]
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts..., sum, count]
+        self._series: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, labels: tuple[str, ...], value: float) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        """
+        Render the histogram in the Prometheus text exposition format.
+        """
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for labels, values in series:
+            pairs = [
+                f'{name}="{_escape(value)}"'
+                for name, value in zip(self.label_names, labels)
+            ]
+            for bound, count in zip(self.buckets, values):
+                bucket_labels = ",".join([*pairs, f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {count}")
+            bucket_labels = ",".join([*pairs, 'le="+Inf"'])
+            lines.append(f"{self.name}_bucket{{{bucket_labels}}} {values[-1]}")
+            lines.append(f"{self.name}_sum{{{','.join(pairs)}}} {values[-2]}")
+            lines.append(f"{self.name}_count{{{','.join(pairs)}}} {values[-1]}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+class RequestMetrics:
+    """
+    Per-route histograms of request latency, SQL statements and time, and
+    serialization time.
+    """
+
+    def __init__(self) -> None:
+        self.latency = Histogram(
+            "http_request_duration_seconds",
+            "Time from receiving a request to sending the end of its response.",
+            ("method", "route", "status"),
+            LATENCY_BUCKETS,
+        )
+        self.queries = Histogram(
+            "http_request_queries",
+            "SQL statements executed per request.",
+            ("method", "route"),
+            QUERY_COUNT_BUCKETS,
+        )
+        self.query_time = Histogram(
+            "http_request_query_duration_seconds",
+            "Time spent executing SQL statements per request.",
+            ("method", "route"),
+            LATENCY_BUCKETS,
+        )
+        self.serialization_time = Histogram(
+            "http_request_serialization_duration_seconds",
+            "Time spent encoding the response body per request.",
+            ("method", "route"),
+            LATENCY_BUCKETS,
+        )
+
+    def observe(
+        self, method: str, status: int, timing: RequestTiming, seconds: float
+    ) -> None:
+        route = timing.route or UNMATCHED_ROUTE
+        self.latency.observe((method, route, str(status)), seconds)
+        self.queries.observe((method, route), timing.queries)
+        self.query_time.observe((method, route), timing.query_seconds)
+        self.serialization_time.observe((method, route), timing.serialization_seconds)
+
+    def render(self) -> str:
+        """
+        Render every histogram in the Prometheus text exposition format.
+        """
+        lines = []
+        for histogram in (
+            self.latency,
+            self.queries,
+            self.query_time,
+            self.serialization_time,
+        ):
+            lines.extend(histogram.render())
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request: it records the request in
+    ``metrics`` and adds a ``Server-Timing`` header to its response.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                total = time.perf_counter() - timing.started
+                headers.append("Server-Timing", timing.server_timing(total))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_timing.reset(token)
+            seconds = time.perf_counter() - timing.started
+            self.metrics.observe(scope["method"], status, timing, seconds)
+
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    """
+    Wrap ``endpoint`` so that, when it returns a value for FastAPI to encode, it
+    notes when it returned and how much SQL time had been spent by then. A
+    ``Response`` is sent as is: endpoints that encode their own body time it with
+    ``timed_serialization``.
+    """
+
+    def note_return(result):
+        timing = current_timing.get()
+        if timing is not None and not isinstance(result, Response):
+            timing.endpoint_returned = (time.perf_counter(), timing.query_seconds)
+        return result
+
+    if asyncio.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def timed(**values):
+            return note_return(await endpoint(**values))
+
+    else:
+
+        @functools.wraps(endpoint)
+        def timed(**values):
+            return note_return(endpoint(**values))
+
+    return timed
+
+
+class TimedRoute(APIRoute):
+    """
+    Route recording its path template and serialization time in the request's
+    ``RequestTiming``.
+
+    When FastAPI encodes the endpoint's return value, serialization is the time
+    between the endpoint returning and the response being built, less any SQL
+    run meanwhile (lazy loads, the commit). It adds to what the endpoint timed
+    itself with ``timed_serialization``.
+    """
+
+    def get_route_handler(self) -> Callable:
+        self.dependant.call = _timed_endpoint(self.dependant.call)
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            timing = current_timing.get()
+            if timing is None:
+                return await handler(request)
+            timing.route = self.path
+            response = await handler(request)
+            if timing.endpoint_returned is not None:
+                returned, query_seconds = timing.endpoint_returned
+                timing.serialization_seconds += max(
+                    0.0,
+                    time.perf_counter()
+                    - returned
+                    - (timing.query_seconds - query_seconds),
+                )
+            return response
+
+        return timed_handler
@@ -0,0 +1,338 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Callable, Sequence
+from contextlib import asynccontextmanager
+
+from pydantic import BaseModel
+from sqlalchemy import Table
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlmodel import SQLModel, text
+
+from src.models.hero import Hero
+from src.models.search import search_table_name
+from src.models.stats import HERO_TRIGGERS, TEAM_TRIGGERS, TeamStats
+from src.models.team import Team
+from src.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+class MigrationProgress(BaseModel):
+    version: int
+    migration: str
+    step: str
+    # Ids covered so far by a batched step; 1 of 1 for a single statement.
+    done: int
+    total: int
+
+
+ProgressCallback = Callable[[MigrationProgress], None]
+
+
+def log_progress(progress: MigrationProgress) -> None:
+    logger.info(
+        "Migration %d (%s): %s, %d/%d",
+        progress.version,
+        progress.migration,
+        progress.step,
+        progress.done,
+        progress.total,
+    )
+
+
+async def get_schema_version(connection: AsyncConnection) -> int:
+    """
+    Return the schema version stored in the database, 0 if it was never set.
+    """
+    result = await connection.exec_driver_sql("PRAGMA user_version")
+    return result.scalar_one()
+
+
+class MigrationRunner:
+    """
+    Applies migrations to one database, reporting the progress of every step.
+
+    Each step commits on its own and holds the write lock for one statement or
+    one batch only, pausing ``pause_seconds`` between batches so that requests
+    waiting to write get the lock. Readers are never blocked (WAL).
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        *,
+        batch_size: int = 5000,
+        pause_seconds: float = 0.01,
+        progress: ProgressCallback = log_progress,
+    ) -> None:
+        self.engine = engine
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.progress = progress
+
+    @asynccontextmanager
+    async def write_transaction(self) -> AsyncIterator[AsyncConnection]:
+        """
+        Open a transaction that takes the write lock as it begins, so that what
+        it reads cannot change before it writes.
+
+        Yields:
+            AsyncConnection: The connection; the transaction commits on exit, or
+                rolls back if the block raised.
+        """
+        async with self.engine.connect() as connection:
+            await connection.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                await connection.rollback()
+                raise
+            await connection.commit()
+
+    async def migrate(
+        self, migrations: Sequence["Migration"] | None = None
+    ) -> list[int]:
+        """
+        Apply the migrations newer than the schema version of the database, in
+        order, storing the version after each one.
+
+        Args:
+            migrations (Sequence[Migration], optional): Defaults to ``MIGRATIONS``.
+
+        Returns:
+            list[int]: The versions applied.
+        """
+        applied = []
+        for migration in MIGRATIONS if migrations is None else migrations:
+            async with self.engine.connect() as connection:
+                if await get_schema_version(connection) >= migration.version:
+                    continue
+            for step in migration.steps:
+
+                def report(
+                    done: int,
+                    total: int,
+                    migration: Migration = migration,
+                    step: Step = step,
+                ) -> None:
+                    self.progress(
+                        MigrationProgress(
+                            version=migration.version,
+                            migration=migration.name,
+                            step=step.description,
+                            done=done,
+                            total=total,
+                        )
+                    )
+
+                await step.run(self, report)
+            async with self.write_transaction() as connection:
+                # Another worker may have finished the same migration meanwhile.
+                if await get_schema_version(connection) < migration.version:
+                    await connection.exec_driver_sql(
+                        f"PRAGMA user_version={migration.version}"
+                    )
+            applied.append(migration.version)
+        return applied
+
+
+class Step(ABC):
+    """
+    One change of a migration. Steps check whether their change is already in
+    place, so that a migration interrupted by a crash, or run by several
+    workers at once, can simply run again.
+    """
+
+    description: str
+
+    @abstractmethod
+    async def run(
+        self, runner: MigrationRunner, report: Callable[[int, int], None]
+    ) -> None:
+        """
+        Apply the change, calling ``report(done, total)`` as it progresses.
+        """
+
+
+class AddColumn(Step):
+    """
+    Add a column unless the table has it. This only rewrites the schema, so it
+    takes constant time however many rows the table has: existing rows read
+    the column's ``DEFAULT``.
+    """
+
+    def __init__(self, table: str, column: str, definition: str) -> None:
+        self.table = table
+        self.column = column
+        self.definition = definition
+        self.description = f"add column {table}.{column}"
+
+    async def run(self, runner, report):
+        async with runner.write_transaction() as connection:
+            columns = await connection.exec_driver_sql(
+                f"PRAGMA table_info({self.table})"
+            )
+            if self.column not in {row[1] for row in columns}:
+                await connection.exec_driver_sql(
+                    f"ALTER TABLE {self.table} ADD COLUMN {self.column} {self.definition}"
+                )
+        report(1, 1)
+
+
+class CreateIndex(Step):
+    """
+    Create an index unless it exists.
+
+    SQLite builds an index in a single statement: writers wait until it is built
+    (one sort of the indexed columns), while readers carry on.
+    """
+
+    def __init__(self, name: str, table: str, *columns: str) -> None:
+        self.name = name
+        self.table = table
+        self.columns = columns
+        self.description = f"create index {name}"
+
+    async def run(self, runner, report):
+        async with runner.write_transaction() as connection:
+            await connection.exec_driver_sql(
+                f"CREATE INDEX IF NOT EXISTS {self.name} "
+                f"ON {self.table} ({', '.join(self.columns)})"
+            )
+        report(1, 1)
+
+
+class CreateTables(Step):
+    """
+    Create the tables missing among ``tables``, with their indexes.
+    """
+
+    def __init__(self, *tables: Table) -> None:
+        self.tables = tables
+        self.description = f"create tables {', '.join(t.name for t in tables)}"
+
+    async def run(self, runner, report):
+        async with runner.write_transaction() as connection:
+            await connection.run_sync(
+                SQLModel.metadata.create_all, tables=list(self.tables)
+            )
+        report(1, 1)
+
+
+class CreateObjects(Step):
+    """
+    Run ``statements`` in one transaction, unless the schema object ``name``
+    (the first one they create) exists.
+    """
+
+    def __init__(self, description: str, name: str, statements: list[str]) -> None:
+        self.description = description
+        self.name = name
+        self.statements = statements
+
+    async def run(self, runner, report):
+        async with runner.write_transaction() as connection:
+            exists = await connection.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE name = ?", (self.name,)
+            )
+            if exists.first() is None:
+                for statement in self.statements:
+                    await connection.exec_driver_sql(statement)
+        report(1, 1)
+
+
+class Backfill(Step):
+    """
+    Run ``statement`` over ``table`` in batches of ids, one transaction each: the
+    statement gets the bounds of its batch as ``:first`` and ``:last``.
+
+    The statement must compute its values from the rows rather than increment
+    them, since a batch may be run again after a crash. Writes made between
+    batches are not lost: they happen under the same write lock, and batches not
+    yet run read them.
+    """
+
+    def __init__(self, description: str, table: str, statement: str) -> None:
+        self.description = description
+        self.table = table
+        self.statement = text(statement)
+
+    async def run(self, runner, report):
+        async with runner.engine.connect() as connection:
+            bounds = await connection.exec_driver_sql(
+                f"SELECT min(id), max(id) FROM {self.table}"
+            )
+            first, last = bounds.one()
+        if first is None:
+            report(0, 0)
+            return
+        total = last - first + 1
+        for start in range(first, last + 1, runner.batch_size):
+            end = min(start + runner.batch_size - 1, last)
+            async with runner.write_transaction() as connection:
+                await connection.execute(self.statement, {"first": start, "last": end})
+            report(end - first + 1, total)
+            await asyncio.sleep(runner.pause_seconds)
+
+
+class Migration:
+    """
+    A numbered change of the schema, made of steps run in order.
+    """
+
+    def __init__(self, version: int, name: str, steps: list[Step]) -> None:
+        self.version = version
+        self.name = name
+        self.steps = steps
+
+
+def _full_text_index(table: Table) -> CreateObjects:
+    index = search_table_name(table)
+    return CreateObjects(
+        f"create and fill the full-text index {index}",
+        index,
+        # An external-content index is filled from its table in one statement:
+        # filled in batches, its triggers would delete rows it does not hold.
+        [
+            *table.info["full_text_index"],
+            f"INSERT INTO {index} ({index}) VALUES ('rebuild')",
+        ],
+    )
+
+
+# Append new migrations with the next version; never edit released ones.
+MIGRATIONS = [
+    Migration(
+        1,
+        "bring databases created before schema versioning up to date",
+        [
+            AddColumn("hero", "version", "INTEGER NOT NULL DEFAULT 1"),
+            AddColumn("team", "version", "INTEGER NOT NULL DEFAULT 1"),
+            CreateIndex("ix_hero_team_id", "hero", "team_id"),
+            CreateIndex("ix_team_headquarters", "team", "headquarters"),
+            CreateTables(User.__table__, TeamStats.__table__),
+            # Triggers first: a team the backfill has not reached yet has no
+            # counters for them to update, and gets its counters computed later.
+            CreateObjects(
+                "create the team counter triggers",
+                "team_stats_team_insert",
+                TEAM_TRIGGERS + HERO_TRIGGERS,
+            ),
+            Backfill(
+                "compute the team counters",
+                "team",
+                "INSERT OR REPLACE INTO team_stats "
+                "(team_id, hero_count, age_count, age_sum) "
+                "SELECT team.id, count(hero.id), count(hero.age), "
+                "coalesce(sum(hero.age), 0) "
+                "FROM team LEFT JOIN hero ON hero.team_id = team.id "
+                "WHERE team.id BETWEEN :first AND :last GROUP BY team.id",
+            ),
+            _full_text_index(Hero.__table__),
+            _full_text_index(Team.__table__),
+        ],
+    ),
+]
+# The version of a database created from the current models.
+SCHEMA_VERSION = MIGRATIONS[-1].version
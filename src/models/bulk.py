@@ -0,0 +1,43 @@
+from enum import Enum
+
+from sqlmodel import SQLModel
+
+
+class BulkItemStatus(str, Enum):
+    CREATED = "created"
+    UPDATED = "updated"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+
+
+class BulkItemResult(SQLModel):
+    index: int
+    status: BulkItemStatus
+    id: int | None = None
+    detail: str | None = None
+
+
+class ImportRowError(SQLModel):
+    line: int
+    errors: list[str]
+
+
+class ImportChunk(SQLModel):
+    chunk: int
+    first_line: int
+    last_line: int
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    failed: int = 0
+
+
+class ImportReport(SQLModel):
+    rows_read: int = 0
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    failed: int = 0
+    chunks: list[ImportChunk] = []
+    errors: list[ImportRowError] = []
+    errors_truncated: bool = False
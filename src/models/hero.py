@@ -1,7 +1,10 @@
 from typing import TYPE_CHECKING, Optional
 
+from sqlalchemy.orm import declared_attr
 from sqlmodel import SQLModel, Field, Relationship
 
+from src.models.search import full_text_index
+
 if TYPE_CHECKING:
     from src.models.team import Team  # pragma: no cover
 
@@ -11,16 +14,40 @@ class HeroBase(SQLModel):
     secret_name: str
     age: int | None = Field(default=None, index=True)
 
-    team_id: int | None = Field(default=None, foreign_key="team.id", ondelete="CASCADE")
+    team_id: int | None = Field(
+        default=None, foreign_key="team.id", ondelete="CASCADE", index=True
+    )
 
 
 class Hero(HeroBase, table=True):
     id: int | None = Field(default=None, primary_key=True)
     secret_name: str = Field(default=None, max_length=50)
     hashed_password: str | None = Field(default=None)
+    # Bumped on every update; drives the ETag and optimistic concurrency.
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
 
     team: Optional["Team"] = Relationship(back_populates="heroes")
 
+    @declared_attr
+    def __mapper_args__(cls):
+        # eager_defaults: generated columns come back through INSERT/UPDATE ...
+        # RETURNING when the session flushes, instead of a SELECT per refresh.
+        return {"version_id_col": cls.__table__.c.version, "eager_defaults": True}
+
+
+full_text_index(Hero.__table__, "name", "secret_name")
+
+
+class HeroFilter(SQLModel):
+    """
+    Filters of the hero list; each one is answered with an index range search.
+    """
+
+    name_prefix: str | None = Field(default=None, min_length=1)
+    min_age: int | None = None
+    max_age: int | None = None
+    team_id: int | None = None
+
 
 class HeroCreate(HeroBase):
     password: str | None = None
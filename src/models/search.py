@@ -0,0 +1,79 @@
+from enum import Enum
+
+from sqlalchemy import DDL, Table, event
+from sqlmodel import SQLModel
+
+
+class SearchKind(str, Enum):
+    HERO = "hero"
+    TEAM = "team"
+
+
+class SearchResult(SQLModel):
+    kind: SearchKind
+    id: int
+    name: str
+    score: float
+
+
+def search_table_name(table: Table) -> str:
+    """
+    Return the name of the full-text index of ``table``.
+    """
+    return f"{table.name}_search"
+
+
+def full_text_index(table: Table, *columns: str) -> None:
+    """
+    Declare an FTS5 index over ``columns`` of ``table``, created and dropped with it.
+
+    The index is an external-content table: it stores only the inverted index and
+    reads the column values back from ``table`` by rowid. Triggers keep it in sync
+    with every write, including the Core statements of the bulk writes and the
+    rows removed by ``ON DELETE CASCADE``.
+
+    The statements are also kept in ``table.info["full_text_index"]``, so that a
+    migration can add the index to an existing table.
+
+    Args:
+        table (Table): The indexed table; its integer primary key is the rowid.
+        *columns (str): The text columns to index.
+    """
+    index = search_table_name(table)
+    names = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    insert = f"INSERT INTO {index} (rowid, {names}) VALUES (new.id, {new_values});"
+    delete = (
+        f"INSERT INTO {index} ({index}, rowid, {names}) "
+        f"VALUES ('delete', old.id, {old_values});"
+    )
+    statements = [
+        # unicode61 folds case and diacritics; the prefix indexes make the
+        # search-as-you-type prefix queries of two and three characters cheap.
+        (
+            f"CREATE VIRTUAL TABLE {index} USING fts5({names}, "
+            f"content='{table.name}', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        ),
+        (
+            f"CREATE TRIGGER {index}_insert AFTER INSERT ON {table.name} "
+            f"BEGIN {insert} END"
+        ),
+        (
+            f"CREATE TRIGGER {index}_delete AFTER DELETE ON {table.name} "
+            f"BEGIN {delete} END"
+        ),
+        (
+            f"CREATE TRIGGER {index}_update AFTER UPDATE OF {names} ON {table.name} "
+            f"BEGIN {delete} {insert} END"
+        ),
+    ]
+    table.info["full_text_index"] = statements
+    for statement in statements:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    event.listen(
+        table,
+        "before_drop",
+        DDL(f"DROP TABLE IF EXISTS {index}").execute_if(dialect="sqlite"),
+    )
@@ -0,0 +1,100 @@
+from sqlalchemy import DDL, event
+from sqlmodel import Field, SQLModel
+
+from src.models.hero import Hero
+from src.models.team import Team
+
+
+class TeamStats(SQLModel, table=True):
+    """
+    Hero counters of a team, kept up to date by triggers on every hero write, so
+    reading them costs one primary key lookup however large the team is.
+    """
+
+    __tablename__ = "team_stats"
+
+    team_id: int = Field(primary_key=True, foreign_key="team.id", ondelete="CASCADE")
+    hero_count: int = Field(
+        default=0, index=True, sa_column_kwargs={"server_default": "0"}
+    )
+    # Heroes with a known age, and the sum of their ages.
+    age_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    age_sum: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+
+
+class AgeBucket(SQLModel):
+    min_age: int
+    max_age: int
+    count: int
+
+
+class TeamStatsPublic(SQLModel):
+    team_id: int
+    hero_count: int
+    average_age: float | None
+    age_histogram: list[AgeBucket]
+
+
+class TeamHeroCount(SQLModel):
+    team_id: int
+    name: str
+    hero_count: int
+    average_age: float | None
+
+
+class StatsPublic(SQLModel):
+    team_count: int
+    hero_count: int
+    heroes_without_team: int
+    average_age: float | None
+    age_histogram: list[AgeBucket]
+    teams: list[TeamHeroCount]
+
+
+def _counter_update(sign: str, row: str) -> str:
+    """
+    Render the statement adding (``+``) or removing (``-``) the hero ``row``
+    (``new`` or ``old``) to the counters of its team.
+    """
+    return (
+        f"UPDATE team_stats SET hero_count = hero_count {sign} 1, "
+        f"age_count = age_count {sign} ({row}.age IS NOT NULL), "
+        f"age_sum = age_sum {sign} coalesce({row}.age, 0) "
+        f"WHERE team_id = {row}.team_id;"
+    )
+
+
+# Every team starts with zeroed counters. They are removed with the team by a
+# trigger too, so that a reused team id never finds stale counters, even on a
+# connection without foreign key enforcement.
+TEAM_TRIGGERS = [
+    (
+        "CREATE TRIGGER team_stats_team_insert AFTER INSERT ON team "
+        "BEGIN INSERT INTO team_stats (team_id) VALUES (new.id); END"
+    ),
+    (
+        "CREATE TRIGGER team_stats_team_delete AFTER DELETE ON team "
+        "BEGIN DELETE FROM team_stats WHERE team_id = old.id; END"
+    ),
+]
+# The hero triggers also fire for the Core bulk writes and ON DELETE CASCADE.
+HERO_TRIGGERS = [
+    (
+        "CREATE TRIGGER team_stats_hero_insert AFTER INSERT ON hero "
+        f"BEGIN {_counter_update('+', 'new')} END"
+    ),
+    (
+        "CREATE TRIGGER team_stats_hero_delete AFTER DELETE ON hero "
+        f"BEGIN {_counter_update('-', 'old')} END"
+    ),
+    (
+        "CREATE TRIGGER team_stats_hero_update AFTER UPDATE OF team_id, age ON hero "
+        f"BEGIN {_counter_update('-', 'old')} {_counter_update('+', 'new')} END"
+    ),
+]
+for table, statements in (
+    (Team.__table__, TEAM_TRIGGERS),
+    (Hero.__table__, HERO_TRIGGERS),
+):
+    for statement in statements:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
@@ -1,6 +1,9 @@
+from sqlalchemy.orm import declared_attr
 from sqlmodel import SQLModel, Field, Relationship
 from typing import TYPE_CHECKING
 
+from src.models.search import full_text_index
+
 
 if TYPE_CHECKING:
     from src.models.hero import Hero  # pragma: no cover
@@ -8,14 +11,34 @@ if TYPE_CHECKING:
 
 class TeamBase(SQLModel):
     name: str = Field(index=True)
-    headquarters: str | None = Field(default=None)
+    headquarters: str | None = Field(default=None, index=True)
 
 
 class Team(TeamBase, table=True):
     id: int | None = Field(default=None, primary_key=True)
+    # Bumped on every update; drives the ETag and optimistic concurrency.
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
 
     heroes: list["Hero"] = Relationship(back_populates="team", passive_deletes="all")
 
+    @declared_attr
+    def __mapper_args__(cls):
+        # eager_defaults: generated columns come back through INSERT/UPDATE ...
+        # RETURNING when the session flushes, instead of a SELECT per refresh.
+        return {"version_id_col": cls.__table__.c.version, "eager_defaults": True}
+
+
+full_text_index(Team.__table__, "name", "headquarters")
+
+
+class TeamFilter(SQLModel):
+    """
+    Filters of the team list; each one is answered with an index search.
+    """
+
+    name_prefix: str | None = Field(default=None, min_length=1)
+    headquarters: str | None = None
+
 
 class TeamCreate(TeamBase):
     pass
@@ -0,0 +1,18 @@
+from sqlmodel import Field, SQLModel
+
+
+class User(SQLModel, table=True):
+    id: int | None = Field(default=None, primary_key=True)
+    username: str = Field(index=True, unique=True)
+    # A KDF hash (see src.security.passwords); the password itself is never stored.
+    hashed_password: str
+
+
+class UserCreate(SQLModel):
+    username: str = Field(min_length=1)
+    password: str = Field(min_length=1)
+
+
+class UserPublic(SQLModel):
+    id: int
+    username: str
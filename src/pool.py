@@ -0,0 +1,204 @@
+import threading
+import time
+from typing import Any, Literal
+
+from pydantic import BaseModel
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, StaticPool
+
+from src.settings import Settings
+
+
+class PoolStats(BaseModel):
+    pool_class: str
+    size: int
+    max_overflow: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    waits: int
+    wait_seconds: float
+    max_wait_seconds: float
+    timeouts: int
+
+
+class PoolMonitor:
+    """
+    Counters of the checkouts of one pool: how many connections are out, and
+    how often and how long a checkout had to wait for one to be returned.
+    """
+
+    def __init__(self) -> None:
+        # Engines may be used from more than one event loop thread.
+        self._lock = threading.Lock()
+        self.checked_out = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+
+    def record_checkout(self, waited: bool, seconds: float) -> None:
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+                self.wait_seconds += seconds
+                self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def record_timeout(self, seconds: float) -> None:
+        with self._lock:
+            self.waits += 1
+            self.timeouts += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def record_checkin(self) -> None:
+        with self._lock:
+            self.checked_out -= 1
+
+
+class MonitoredPool(Pool):
+    """
+    Mixin recording every checkout and checkin of a pool in a ``PoolMonitor``,
+    which survives the pool being recreated by ``engine.dispose()``.
+    """
+
+    monitor: PoolMonitor
+
+    def __init__(self, *args: Any, monitor: PoolMonitor | None = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.monitor = monitor or PoolMonitor()
+
+    def _must_wait(self) -> bool:
+        """Whether a checkout would block until a connection is returned."""
+        return False
+
+    def connect(self):
+        waited = self._must_wait()
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.monitor.record_timeout(time.perf_counter() - started)
+            raise
+        self.monitor.record_checkout(waited, time.perf_counter() - started)
+        return connection
+
+    def _do_return_conn(self, record) -> None:
+        self.monitor.record_checkin()
+        super()._do_return_conn(record)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.monitor = self.monitor
+        return pool
+
+
+class MonitoredQueuePool(MonitoredPool, AsyncAdaptedQueuePool):
+    """A bounded pool of ``pool_size`` connections plus ``max_overflow`` extra ones."""
+
+    def _must_wait(self) -> bool:
+        # Every pooled connection is out and no overflow connection may be opened.
+        return (
+            self._max_overflow > -1
+            and self._overflow >= self._max_overflow
+            and self.checkedin() == 0
+        )
+
+
+class MonitoredStaticPool(MonitoredPool, StaticPool):
+    """One connection shared by every checkout, e.g. for ``sqlite://`` in memory."""
+
+
+class PoolConfig(BaseModel):
+    """
+    How an engine pools its connections.
+
+    ``queue`` keeps up to ``size`` connections open and opens at most
+    ``max_overflow`` more under load; a checkout beyond that waits up to
+    ``timeout`` seconds. ``static`` shares a single connection, which only suits
+    an in-memory database or a single-worker tool.
+    """
+
+    kind: Literal["queue", "static"] = "queue"
+    size: int = 5
+    max_overflow: int = 10
+    timeout: float = 30.0
+    pre_ping: bool = False
+    recycle: int = -1
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "PoolConfig":
+        """
+        Read the pool configuration from the ``pool_*`` settings.
+
+        Args:
+            settings (Settings): The application settings.
+
+        Returns:
+            PoolConfig: The configured pool.
+        """
+        return cls(
+            kind=settings.pool_class,
+            size=settings.pool_size,
+            max_overflow=settings.pool_max_overflow,
+            timeout=settings.pool_timeout_seconds,
+            pre_ping=settings.pool_pre_ping,
+            recycle=settings.pool_recycle_seconds,
+        )
+
+    def engine_options(self) -> dict[str, Any]:
+        """
+        Render the configuration as ``create_async_engine`` keyword arguments.
+
+        Returns:
+            dict[str, Any]: The pool class and its options.
+        """
+        options = {"pool_pre_ping": self.pre_ping, "pool_recycle": self.recycle}
+        if self.kind == "static":
+            return {"poolclass": MonitoredStaticPool, **options}
+        return {
+            "poolclass": MonitoredQueuePool,
+            "pool_size": self.size,
+            "max_overflow": self.max_overflow,
+            "pool_timeout": self.timeout,
+            **options,
+        }
+
+
+def pool_stats(engine: AsyncEngine) -> PoolStats:
+    """
+    Report the live state of an engine's pool.
+
+    Pools not created from a ``PoolConfig`` (e.g. a ``NullPool``) only report
+    their class; their counters stay at zero.
+
+    Args:
+        engine (AsyncEngine): The engine to inspect.
+
+    Returns:
+        PoolStats: The pool size, connections out and checkout waits.
+    """
+    pool = engine.sync_engine.pool
+    size = max_overflow = overflow = 0
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        size, max_overflow = pool.size(), pool._max_overflow
+        overflow = max(pool.overflow(), 0)
+    elif isinstance(pool, StaticPool):
+        size = 1
+    monitor = getattr(pool, "monitor", None) or PoolMonitor()
+    return PoolStats(
+        pool_class=type(pool).__name__,
+        size=size,
+        max_overflow=max_overflow,
+        checked_out=monitor.checked_out,
+        overflow=overflow,
+        checkouts=monitor.checkouts,
+        waits=monitor.waits,
+        wait_seconds=round(monitor.wait_seconds, 6),
+        max_wait_seconds=round(monitor.max_wait_seconds, 6),
+        timeouts=monitor.timeouts,
+    )
@@ -0,0 +1,275 @@
+import sqlite3
+import threading
+import time
+from collections import Counter, deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.settings import Settings, get_settings
+
+QUERY_START_TIMES_KEY = "query_log_start_times"
+# Statements worth explaining; BEGIN, PRAGMA, COMMIT and the like are not.
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+class SlowQuery(BaseModel):
+    route: str | None
+    statement: str
+    parameters: str
+    duration_ms: float
+    plan: list[str]
+
+
+class RepeatedStatement(BaseModel):
+    route: str | None
+    statement: str
+    count: int
+
+
+class QueryLogReport(BaseModel):
+    enabled: bool
+    slow_query_ms: float
+    repeated_statement_threshold: int
+    slow_queries: list[SlowQuery]
+    repeated_statements: list[RepeatedStatement]
+
+
+def parameters_shape(parameters: Any, executemany: bool = False) -> str:
+    """
+    Describe the parameters of a statement by their types only, so that the log
+    never holds values such as password hashes.
+
+    Args:
+        parameters: The DBAPI parameters (a sequence, a mapping, or for
+            ``executemany`` a list of either).
+        executemany (bool, optional): Whether ``parameters`` holds several sets.
+
+    Returns:
+        str: e.g. ``(int, str)``, ``{name: str}`` or ``3 x (int, str)``.
+    """
+    if executemany:
+        sets = list(parameters)
+        first = parameters_shape(sets[0]) if sets else "()"
+        return f"{len(sets)} x {first}"
+    if isinstance(parameters, dict):
+        fields = ", ".join(
+            f"{name}: {type(value).__name__}" for name, value in parameters.items()
+        )
+        return f"{{{fields}}}"
+    return f"({', '.join(type(value).__name__ for value in parameters or ())})"
+
+
+class QueryScope:
+    """
+    The statements run within one request (or one ``QueryLog.track`` block),
+    counted by their SQL text.
+    """
+
+    def __init__(self, route: str | None = None, asgi_scope: Scope | None = None):
+        self._route = route
+        self._asgi_scope = asgi_scope
+        self.statements: Counter[str] = Counter()
+
+    @property
+    def route(self) -> str | None:
+        """The route template of the request, once it has been routed."""
+        if self._route is None and self._asgi_scope is not None:
+            route = self._asgi_scope.get("route")
+            return getattr(route, "path", None)
+        return self._route
+
+
+class QueryLog:
+    """
+    Records statements slower than ``slow_query_ms`` with their query plan, and
+    flags requests that run one statement more than ``repeated_statement_threshold``
+    times: usually a relationship loaded row by row (N+1) instead of in bulk.
+
+    Only engines passed to ``attach`` are watched. The newest ``max_entries``
+    findings of each kind are kept.
+    """
+
+    def __init__(
+        self,
+        *,
+        slow_query_ms: float = 100.0,
+        repeated_statement_threshold: int = 10,
+        max_entries: int = 100,
+    ) -> None:
+        self.slow_query_ms = slow_query_ms
+        self.repeated_statement_threshold = repeated_statement_threshold
+        self._lock = threading.Lock()
+        self._slow_queries: deque[SlowQuery] = deque(maxlen=max_entries)
+        self._repeated: deque[RepeatedStatement] = deque(maxlen=max_entries)
+        self._engines: list[AsyncEngine] = []
+        # Per log, so that two logs watching one engine count separately.
+        self._scope: ContextVar[QueryScope | None] = ContextVar(
+            "query_scope", default=None
+        )
+
+    def attach(self, engine: AsyncEngine) -> None:
+        """
+        Start watching the statements of ``engine``.
+
+        Args:
+            engine (AsyncEngine): The engine to watch.
+        """
+        sync_engine = engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", self._before_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_execute)
+        self._engines.append(engine)
+
+    def detach(self, engine: AsyncEngine) -> None:
+        """
+        Stop watching the statements of ``engine``.
+
+        Args:
+            engine (AsyncEngine): An engine previously passed to ``attach``.
+        """
+        sync_engine = engine.sync_engine
+        event.remove(sync_engine, "before_cursor_execute", self._before_execute)
+        event.remove(sync_engine, "after_cursor_execute", self._after_execute)
+        self._engines.remove(engine)
+
+    def _before_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        conn.info.setdefault(QUERY_START_TIMES_KEY, []).append(time.perf_counter())
+
+    def _after_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        started = conn.info.get(QUERY_START_TIMES_KEY)
+        if not started:
+            return
+        duration_ms = (time.perf_counter() - started.pop()) * 1000
+        scope = self._scope.get()
+        if scope is not None:
+            scope.statements[statement] += 1
+        if duration_ms < self.slow_query_ms:
+            return
+        if executemany:
+            parameters = list(parameters)
+        slow_query = SlowQuery(
+            route=scope.route if scope is not None else None,
+            statement=statement,
+            parameters=parameters_shape(parameters, executemany),
+            duration_ms=round(duration_ms, 3),
+            plan=self._explain(
+                conn, statement, parameters[0] if executemany else parameters
+            ),
+        )
+        with self._lock:
+            self._slow_queries.append(slow_query)
+
+    def _explain(self, conn, statement: str, parameters: Any) -> list[str]:
+        if conn.dialect.name != "sqlite":
+            return []
+        if not statement.lstrip().upper().startswith(EXPLAINABLE):
+            return []
+        # A raw DBAPI cursor: statements run on it do not re-enter these events.
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            return [row[3] for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            return [f"EXPLAIN failed: {e}"]
+        finally:
+            cursor.close()
+
+    @contextmanager
+    def track(
+        self, route: str | None = None, asgi_scope: Scope | None = None
+    ) -> Iterator[QueryScope]:
+        """
+        Count the statements run inside the block, and record those run more
+        than ``repeated_statement_threshold`` times once it ends.
+
+        Args:
+            route (str, optional): Label of the findings of this block.
+            asgi_scope (Scope, optional): The request being served; its route
+                template labels the findings once the request is routed.
+
+        Yields:
+            QueryScope: The statements counted so far.
+        """
+        scope = QueryScope(route, asgi_scope)
+        token = self._scope.set(scope)
+        try:
+            yield scope
+        finally:
+            self._scope.reset(token)
+            repeated = [
+                RepeatedStatement(route=scope.route, statement=statement, count=count)
+                for statement, count in scope.statements.items()
+                if count > self.repeated_statement_threshold
+            ]
+            if repeated:
+                with self._lock:
+                    self._repeated.extend(repeated)
+
+    def report(self) -> QueryLogReport:
+        """
+        Return the slow queries and repeated statements recorded so far.
+        """
+        with self._lock:
+            return QueryLogReport(
+                enabled=bool(self._engines),
+                slow_query_ms=self.slow_query_ms,
+                repeated_statement_threshold=self.repeated_statement_threshold,
+                slow_queries=list(self._slow_queries),
+                repeated_statements=list(self._repeated),
+            )
+
+    def clear(self) -> None:
+        """
+        Forget every finding.
+        """
+        with self._lock:
+            self._slow_queries.clear()
+            self._repeated.clear()
+
+
+class QueryLogMiddleware:
+    """
+    ASGI middleware running every HTTP request inside ``QueryLog.track``, so
+    slow queries and repeated statements are attributed to its route.
+    """
+
+    def __init__(self, app: ASGIApp, log: QueryLog | None = None):
+        self.app = app
+        self.log = log or query_log
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with self.log.track(asgi_scope=scope):
+            await self.app(scope, receive, send)
+
+
+def create_query_log(settings: Settings) -> QueryLog:
+    """
+    Build the query log configured by ``settings``.
+
+    Args:
+        settings (Settings): The application settings.
+
+    Returns:
+        QueryLog: The configured query log, not yet attached to any engine.
+    """
+    return QueryLog(
+        slow_query_ms=settings.slow_query_ms,
+        repeated_statement_threshold=settings.repeated_statement_threshold,
+        max_entries=settings.query_log_max_entries,
+    )
+
+
+query_log = create_query_log(get_settings())
@@ -1,59 +1,331 @@
 from typing import Annotated
 
-from fastapi import Query, HTTPException, APIRouter
+from fastapi import (
+    Body,
+    Depends,
+    Header,
+    Query,
+    HTTPException,
+    APIRouter,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
 from starlette import status
 
+from src.cache import cache, hero_tag, team_tag
+from src.conditional import (
+    PreconditionFailedError,
+    if_none_match,
+    pack_entity,
+    unpack_entity,
+)
 from src.crud.hero import (
+    HERO_EXPORT_COLUMNS,
+    HERO_FIELDS,
+    HeroOrderBy,
     create_hero,
+    create_heroes_bulk,
     get_heroes,
+    get_hero_rows,
+    stream_heroes,
     get_hero_by_id,
+    get_hero_row,
+    get_hero_etag,
+    hero_etag,
+    hero_row_etag,
     HeroNotFoundError,
     update_hero,
     delete_hero,
 )
-from src.dependencies import SessionDep
-from src.models.hero import HeroCreate, HeroUpdate, Hero
+from src.crud.bulk import MAX_BULK_ITEMS
+from src.crud.team import TeamNotFoundError
+from src.crud.loading import LoadStrategy
+from src.crud.pagination import InvalidCursorError, next_cursor
+from src.dependencies import RoutedSessionFactoryDep, SessionDep, SettingsDep
+from src.export import DataFormat, encode_rows
+from src.importer import ImportFormatError, import_records
+from src.metrics import TimedRoute, timed_serialization
+from src.models.bulk import BulkItemResult, ImportReport
+from src.models.hero import HeroCreate, HeroFilter, HeroUpdate, Hero
 from src.models.public import HeroPublicWithTeam, HeroPublic
+from src.security.passwords import HasherBusyError
+from src.serialization import (
+    InvalidFieldsError,
+    hero_to_json,
+    heroes_to_json,
+    parse_fields,
+)
+
+router = APIRouter(prefix="/heroes", tags=["Heroes"], route_class=TimedRoute)
+
+FIELDS_DESCRIPTION = (
+    f"Comma-separated fields to return, out of: {', '.join(HERO_FIELDS)}. "
+    "Only the matching columns are read; the team is only joined if requested."
+)
+
+
+def hasher_busy(error: HasherBusyError) -> HTTPException:
+    # The queue drains within a few hash durations; ask the client to back off.
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(error),
+        headers={"Retry-After": "1"},
+    )
+
 
-router = APIRouter(prefix="/heroes", tags=["Heroes"])
+def unknown_team(error: TeamNotFoundError) -> HTTPException:
+    # The hero is fine; the team it references is not there.
+    return HTTPException(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(error)
+    )
+
+
+def hero_filters(
+    name_prefix: Annotated[str | None, Query(min_length=1)] = None,
+    min_age: int | None = None,
+    max_age: int | None = None,
+    team_id: int | None = None,
+) -> HeroFilter:
+    return HeroFilter(
+        name_prefix=name_prefix, min_age=min_age, max_age=max_age, team_id=team_id
+    )
 
 
 @router.post(path="/", status_code=status.HTTP_201_CREATED, response_model=HeroPublic)
 async def create(hero: HeroCreate, session: SessionDep) -> Hero:
-    return create_hero(hero=hero, session=session)
+    try:
+        return await create_hero(hero=hero, session=session)
+    except TeamNotFoundError as e:
+        raise unknown_team(e)
+    except HasherBusyError as e:
+        raise hasher_busy(e)
+
+
+@router.post(path="/bulk", response_model=list[BulkItemResult])
+async def create_bulk(
+    heroes: Annotated[list[HeroCreate], Body(max_length=MAX_BULK_ITEMS)],
+    session: SessionDep,
+    upsert: bool = False,
+) -> list[BulkItemResult]:
+    try:
+        return await create_heroes_bulk(heroes=heroes, upsert=upsert, session=session)
+    except HasherBusyError as e:
+        raise hasher_busy(e)
+
+
+@router.post(path="/import", response_model=ImportReport)
+async def import_heroes(
+    request: Request,
+    session: SessionDep,
+    format: DataFormat = DataFormat.NDJSON,
+    chunk_size: Annotated[int, Query(ge=1, le=MAX_BULK_ITEMS)] = 1000,
+    upsert: bool = False,
+) -> ImportReport:
+    # Unlike other writes, each chunk commits on its own, so that a long import
+    # neither holds the write lock throughout nor loses the chunks already written.
+    async def write_chunk(heroes: list[HeroCreate]) -> list[BulkItemResult]:
+        results = await create_heroes_bulk(
+            heroes=heroes, upsert=upsert, session=session
+        )
+        await session.commit()
+        return results
+
+    try:
+        return await import_records(
+            request.stream(),
+            data_format=format,
+            schema=HeroCreate,
+            write_chunk=write_chunk,
+            chunk_size=chunk_size,
+        )
+    except ImportFormatError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except HasherBusyError as e:
+        raise hasher_busy(e)
 
 
 @router.get(path="/", response_model=list[HeroPublicWithTeam])
 async def list_heroes(
     session: SessionDep,
+    settings: SettingsDep,
+    response: Response,
+    filters: Annotated[HeroFilter, Depends(hero_filters)],
     offset: Annotated[int, Query(ge=0)] = 0,
     limit: Annotated[int, Query(le=100)] = 100,
-) -> list[Hero]:
-    return get_heroes(session=session, offset=offset, limit=limit)
+    order_by: HeroOrderBy = "id",
+    cursor: str | None = None,
+    fields: Annotated[str | None, Query(description=FIELDS_DESCRIPTION)] = None,
+) -> list[Hero] | Response:
+    if cursor is not None and offset:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either offset or cursor pagination, not both",
+        )
+    # A projection is always served from plain rows.
+    use_rows = settings.fast_serialization or fields is not None
+    try:
+        selected = parse_fields(fields, HERO_FIELDS)
+        if use_rows:
+            heroes = await get_hero_rows(
+                session=session,
+                offset=offset,
+                limit=limit,
+                order_by=order_by,
+                cursor=cursor,
+                filters=filters,
+                fields=selected,
+            )
+        else:
+            heroes = await get_heroes(
+                session=session,
+                offset=offset,
+                limit=limit,
+                load=LoadStrategy.JOINED,
+                order_by=order_by,
+                cursor=cursor,
+                filters=filters,
+            )
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    cursor_of_next_page = next_cursor(heroes, key=order_by, limit=limit)
+    if cursor_of_next_page is not None:
+        response.headers["X-Next-Cursor"] = cursor_of_next_page
+    if use_rows:
+        with timed_serialization():
+            content = heroes_to_json(heroes, selected)
+        return Response(
+            content=content,
+            media_type="application/json",
+            headers=response.headers,
+        )
+    return heroes
 
 
-@router.get(path="/{hero_id}", response_model=HeroPublicWithTeam)
+@router.get(path="/export", response_class=StreamingResponse)
+async def export_heroes(
+    session_factory: RoutedSessionFactoryDep,
+    format: DataFormat = DataFormat.NDJSON,
+) -> StreamingResponse:
+    async def body():
+        async with session_factory() as session:
+            async for chunk in encode_rows(
+                stream_heroes(session), HERO_EXPORT_COLUMNS, format
+            ):
+                yield chunk
+
+    return StreamingResponse(
+        body(),
+        media_type=format.media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="heroes.{format.value}"'
+        },
+    )
+
+
+@router.get(
+    path="/{hero_id}",
+    response_model=HeroPublicWithTeam,
+    responses={status.HTTP_304_NOT_MODIFIED: {"description": "Not Modified"}},
+)
 async def get_hero(
     hero_id: int,
     session: SessionDep,
-) -> Hero:
+    if_none_match_header: Annotated[str | None, Header(alias="If-None-Match")] = None,
+    fields: Annotated[str | None, Query(description=FIELDS_DESCRIPTION)] = None,
+) -> Response:
+    async def load() -> tuple[bytes, list[str]]:
+        hero = await get_hero_by_id(
+            hero_id=hero_id, load=LoadStrategy.JOINED, session=session
+        )
+        tags = [hero_tag(hero.id)]
+        if hero.team_id is not None:
+            tags.append(team_tag(hero.team_id))
+        with timed_serialization():
+            body = HeroPublicWithTeam.model_validate(hero).model_dump_json().encode()
+        return pack_entity(hero_etag(hero), body), tags
+
+    async def load_fields() -> tuple[bytes, list[str]]:
+        row = await get_hero_row(hero_id=hero_id, session=session, fields=selected)
+        # Deleting the team cascades to the hero, so the team's tag is kept
+        # even when the team is not part of the projection.
+        tags = [hero_tag(row.id)]
+        if row.team_id is not None:
+            tags.append(team_tag(row.team_id))
+        with timed_serialization():
+            body = hero_to_json(row, selected)
+        return pack_entity(hero_row_etag(row, selected), body), tags
+
     try:
-        return get_hero_by_id(hero_id=hero_id, session=session)
+        if fields is None:
+            selected = None
+            key = f"hero:{hero_id}"
+        else:
+            selected = parse_fields(fields, HERO_FIELDS)
+            key = f"hero:{hero_id}?fields={','.join(selected)}"
+        entity = None
+        if if_none_match_header is not None:
+            # On a miss, compare the versions first: the body is only built for
+            # a client whose copy is out of date.
+            entity = await cache.get(key)
+            if entity is None:
+                etag = await get_hero_etag(
+                    hero_id=hero_id, fields=selected, session=session
+                )
+                if if_none_match(if_none_match_header, etag):
+                    return Response(
+                        status_code=status.HTTP_304_NOT_MODIFIED,
+                        headers={"ETag": etag},
+                    )
+        if entity is None:
+            entity = await cache.read_through(
+                key, load if selected is None else load_fields
+            )
+    except InvalidFieldsError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except HeroNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=e.message)
+    etag, content = unpack_entity(entity)
+    headers = {"ETag": etag}
+    if if_none_match(if_none_match_header, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=content, media_type="application/json", headers=headers)
 
 
 @router.patch(path="/{hero_id}", response_model=HeroPublic)
-async def update(hero_id: int, hero: HeroUpdate, session: SessionDep) -> Hero:
+async def update(
+    hero_id: int,
+    hero: HeroUpdate,
+    session: SessionDep,
+    if_match: Annotated[str | None, Header(alias="If-Match")] = None,
+) -> Hero:
     try:
-        return update_hero(hero_id=hero_id, hero=hero, session=session)
+        return await update_hero(
+            hero_id=hero_id, hero=hero, session=session, if_match=if_match
+        )
     except HeroNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=e.message)
+    except TeamNotFoundError as e:
+        raise unknown_team(e)
+    except PreconditionFailedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e)
+        )
+    except HasherBusyError as e:
+        raise hasher_busy(e)
 
 
 @router.delete("/{hero_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete(hero_id: int, session: SessionDep):
+async def delete(
+    hero_id: int,
+    session: SessionDep,
+    if_match: Annotated[str | None, Header(alias="If-Match")] = None,
+):
     try:
-        delete_hero(hero_id=hero_id, session=session)
+        await delete_hero(hero_id=hero_id, session=session, if_match=if_match)
     except HeroNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=e.message)
+    except PreconditionFailedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e)
+        )
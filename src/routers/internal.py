@@ -0,0 +1,33 @@
+from fastapi import APIRouter
+
+from src.cache import CacheStats, cache
+from src.database import database
+from src.metrics import TimedRoute
+from src.pool import PoolStats, pool_stats
+from src.querylog import QueryLogReport, query_log
+from src.security.passwords import HasherStats, hasher
+
+router = APIRouter(prefix="/internal", tags=["Internal"], route_class=TimedRoute)
+
+
+@router.get(path="/cache", response_model=CacheStats)
+async def cache_stats() -> CacheStats:
+    return await cache.stats()
+
+
+@router.get(path="/password-hasher", response_model=HasherStats)
+async def password_hasher_stats() -> HasherStats:
+    return hasher.stats()
+
+
+@router.get(path="/pool", response_model=dict[str, PoolStats])
+async def connection_pool_stats() -> dict[str, PoolStats]:
+    pools = {"primary": pool_stats(database.engine)}
+    if database.replica_engine is not None:
+        pools["replica"] = pool_stats(database.replica_engine)
+    return pools
+
+
+@router.get(path="/queries", response_model=QueryLogReport)
+async def query_log_report() -> QueryLogReport:
+    return query_log.report()
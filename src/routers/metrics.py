@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.metrics import TimedRoute, request_metrics
+
+# Version 0.0.4 of the Prometheus text exposition format.
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+router = APIRouter(tags=["Metrics"], route_class=TimedRoute)
+
+
+@router.get(path="/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(request_metrics.render(), media_type=PROMETHEUS_MEDIA_TYPE)
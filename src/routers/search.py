@@ -0,0 +1,31 @@
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, Query
+from starlette import status
+
+from src.crud.search import InvalidSearchError, search
+from src.dependencies import SessionDep
+from src.metrics import TimedRoute
+from src.models.search import SearchKind, SearchResult
+
+router = APIRouter(prefix="/search", tags=["Search"], route_class=TimedRoute)
+
+
+@router.get(path="/", response_model=list[SearchResult])
+async def search_heroes_and_teams(
+    session: SessionDep,
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    kind: Annotated[list[SearchKind] | None, Query()] = None,
+    offset: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+) -> list[SearchResult]:
+    try:
+        return await search(
+            query=q,
+            kinds=kind or tuple(SearchKind),
+            offset=offset,
+            limit=limit,
+            session=session,
+        )
+    except InvalidSearchError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
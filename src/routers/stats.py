@@ -0,0 +1,19 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Query
+
+from src.crud.stats import get_stats
+from src.dependencies import SessionDep
+from src.metrics import TimedRoute
+from src.models.stats import StatsPublic
+
+router = APIRouter(prefix="/stats", tags=["Stats"], route_class=TimedRoute)
+
+
+@router.get(path="/", response_model=StatsPublic)
+async def stats(
+    session: SessionDep,
+    bucket_size: Annotated[int, Query(ge=1, le=100)] = 10,
+    limit: Annotated[int, Query(ge=0, le=1000)] = 100,
+) -> StatsPublic:
+    return await get_stats(bucket_size=bucket_size, limit=limit, session=session)
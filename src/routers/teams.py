@@ -1,60 +1,309 @@
 from typing import Annotated
 
-from fastapi import Query, HTTPException, APIRouter
+from fastapi import (
+    Body,
+    Depends,
+    Header,
+    Query,
+    HTTPException,
+    APIRouter,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
 from starlette import status
 
+from src.cache import cache, hero_tag, members_tag, team_tag
+from src.conditional import (
+    PreconditionFailedError,
+    if_none_match,
+    pack_entity,
+    unpack_entity,
+)
 from src.crud.team import (
+    TEAM_EXPORT_COLUMNS,
+    TEAM_FIELDS,
+    TeamOrderBy,
     create_team,
+    create_teams_bulk,
     get_teams,
+    get_team_rows,
+    stream_teams,
     get_team_by_id,
+    get_team_row,
+    get_team_etag,
+    team_etag,
+    team_row_etag,
     TeamNotFoundError,
     update_team as update_repo,
     delete_team,
 )
-from src.dependencies import SessionDep
-from src.models.team import TeamCreate, TeamUpdate, Team
+from src.crud.bulk import MAX_BULK_ITEMS
+from src.crud.loading import LoadStrategy
+from src.crud.pagination import InvalidCursorError, next_cursor
+from src.crud.stats import get_team_stats
+from src.dependencies import RoutedSessionFactoryDep, SessionDep, SettingsDep
+from src.export import DataFormat, encode_rows
+from src.importer import ImportFormatError, import_records
+from src.metrics import TimedRoute, timed_serialization
+from src.models.bulk import BulkItemResult, ImportReport
+from src.models.team import TeamCreate, TeamFilter, TeamUpdate, Team
 from src.models.public import TeamPublicWithHeroes, TeamPublic
+from src.models.stats import TeamStatsPublic
+from src.serialization import (
+    InvalidFieldsError,
+    parse_fields,
+    team_to_json,
+    teams_to_json,
+)
 
 
-router = APIRouter(prefix="/teams", tags=["Teams"])
+router = APIRouter(prefix="/teams", tags=["Teams"], route_class=TimedRoute)
+
+FIELDS_DESCRIPTION = (
+    f"Comma-separated fields to return, out of: {', '.join(TEAM_FIELDS)}. "
+    "Only the matching columns are read; the heroes are only read if requested."
+)
+
+
+def team_filters(
+    name_prefix: Annotated[str | None, Query(min_length=1)] = None,
+    headquarters: str | None = None,
+) -> TeamFilter:
+    return TeamFilter(name_prefix=name_prefix, headquarters=headquarters)
 
 
 @router.post(path="/", status_code=status.HTTP_201_CREATED, response_model=TeamPublic)
 async def create(team: TeamCreate, session: SessionDep) -> Team:
-    return create_team(team=team, session=session)
+    return await create_team(team=team, session=session)
+
+
+@router.post(path="/bulk", response_model=list[BulkItemResult])
+async def create_bulk(
+    teams: Annotated[list[TeamCreate], Body(max_length=MAX_BULK_ITEMS)],
+    session: SessionDep,
+    upsert: bool = False,
+) -> list[BulkItemResult]:
+    return await create_teams_bulk(teams=teams, upsert=upsert, session=session)
+
+
+@router.post(path="/import", response_model=ImportReport)
+async def import_teams(
+    request: Request,
+    session: SessionDep,
+    format: DataFormat = DataFormat.NDJSON,
+    chunk_size: Annotated[int, Query(ge=1, le=MAX_BULK_ITEMS)] = 1000,
+    upsert: bool = False,
+) -> ImportReport:
+    # Unlike other writes, each chunk commits on its own, so that a long import
+    # neither holds the write lock throughout nor loses the chunks already written.
+    async def write_chunk(teams: list[TeamCreate]) -> list[BulkItemResult]:
+        results = await create_teams_bulk(teams=teams, upsert=upsert, session=session)
+        await session.commit()
+        return results
+
+    try:
+        return await import_records(
+            request.stream(),
+            data_format=format,
+            schema=TeamCreate,
+            write_chunk=write_chunk,
+            chunk_size=chunk_size,
+        )
+    except ImportFormatError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
 @router.get(path="/", response_model=list[TeamPublicWithHeroes])
 async def list_teams(
     session: SessionDep,
+    settings: SettingsDep,
+    response: Response,
+    filters: Annotated[TeamFilter, Depends(team_filters)],
     offset: Annotated[int, Query(ge=0)] = 0,
     limit: Annotated[int, Query(le=100)] = 100,
-) -> list[Team]:
-    return get_teams(session=session, offset=offset, limit=limit)
+    order_by: TeamOrderBy = "id",
+    cursor: str | None = None,
+    fields: Annotated[str | None, Query(description=FIELDS_DESCRIPTION)] = None,
+) -> list[Team] | Response:
+    if cursor is not None and offset:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either offset or cursor pagination, not both",
+        )
+    # A projection is always served from plain rows.
+    use_rows = settings.fast_serialization or fields is not None
+    try:
+        selected = parse_fields(fields, TEAM_FIELDS)
+        if use_rows:
+            rows = await get_team_rows(
+                offset=offset,
+                limit=limit,
+                order_by=order_by,
+                cursor=cursor,
+                filters=filters,
+                fields=selected,
+                session=session,
+            )
+            teams = [team for team, _ in rows]
+        else:
+            teams = await get_teams(
+                session=session,
+                offset=offset,
+                limit=limit,
+                load=LoadStrategy.SELECTIN,
+                order_by=order_by,
+                cursor=cursor,
+                filters=filters,
+            )
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    cursor_of_next_page = next_cursor(teams, key=order_by, limit=limit)
+    if cursor_of_next_page is not None:
+        response.headers["X-Next-Cursor"] = cursor_of_next_page
+    if use_rows:
+        with timed_serialization():
+            content = teams_to_json(rows, selected)
+        return Response(
+            content=content,
+            media_type="application/json",
+            headers=response.headers,
+        )
+    return teams
+
+
+@router.get(path="/export", response_class=StreamingResponse)
+async def export_teams(
+    session_factory: RoutedSessionFactoryDep,
+    format: DataFormat = DataFormat.NDJSON,
+) -> StreamingResponse:
+    async def body():
+        async with session_factory() as session:
+            async for chunk in encode_rows(
+                stream_teams(session=session), TEAM_EXPORT_COLUMNS, format
+            ):
+                yield chunk
 
+    return StreamingResponse(
+        body(),
+        media_type=format.media_type,
+        headers={"Content-Disposition": f'attachment; filename="teams.{format.value}"'},
+    )
 
-@router.get(path="/{team_id}", response_model=TeamPublicWithHeroes)
+
+@router.get(
+    path="/{team_id}",
+    response_model=TeamPublicWithHeroes,
+    responses={status.HTTP_304_NOT_MODIFIED: {"description": "Not Modified"}},
+)
 async def get_team(
     team_id: int,
     session: SessionDep,
-) -> Team:
+    if_none_match_header: Annotated[str | None, Header(alias="If-None-Match")] = None,
+    fields: Annotated[str | None, Query(description=FIELDS_DESCRIPTION)] = None,
+) -> Response:
+    async def load() -> tuple[bytes, list[str]]:
+        team = await get_team_by_id(
+            team_id=team_id, load=LoadStrategy.SELECTIN, session=session
+        )
+        tags = [team_tag(team.id), members_tag(team.id)]
+        tags.extend(hero_tag(hero.id) for hero in team.heroes)
+        with timed_serialization():
+            content = TeamPublicWithHeroes.model_validate(team).model_dump_json()
+        return pack_entity(team_etag(team), content.encode()), tags
+
+    async def load_fields() -> tuple[bytes, list[str]]:
+        team, heroes = await get_team_row(
+            team_id=team_id, fields=selected, session=session
+        )
+        tags = [team_tag(team.id)]
+        if "heroes" in selected:
+            tags.append(members_tag(team.id))
+            tags.extend(hero_tag(hero.id) for hero in heroes)
+        with timed_serialization():
+            content = team_to_json(team, heroes, selected)
+        return pack_entity(team_row_etag(team, heroes, selected), content), tags
+
     try:
-        return get_team_by_id(team_id=team_id, session=session)
+        if fields is None:
+            selected = None
+            key = f"team:{team_id}"
+        else:
+            selected = parse_fields(fields, TEAM_FIELDS)
+            key = f"team:{team_id}?fields={','.join(selected)}"
+        entity = None
+        if if_none_match_header is not None:
+            # On a miss, compare the versions first: the body is only built for
+            # a client whose copy is out of date.
+            entity = await cache.get(key)
+            if entity is None:
+                etag = await get_team_etag(
+                    team_id=team_id, fields=selected, session=session
+                )
+                if if_none_match(if_none_match_header, etag):
+                    return Response(
+                        status_code=status.HTTP_304_NOT_MODIFIED,
+                        headers={"ETag": etag},
+                    )
+        if entity is None:
+            entity = await cache.read_through(
+                key, load if selected is None else load_fields
+            )
+    except InvalidFieldsError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except TeamNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    etag, content = unpack_entity(entity)
+    headers = {"ETag": etag}
+    if if_none_match(if_none_match_header, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+@router.get(path="/{team_id}/stats", response_model=TeamStatsPublic)
+async def get_team_statistics(
+    team_id: int,
+    session: SessionDep,
+    bucket_size: Annotated[int, Query(ge=1, le=100)] = 10,
+) -> TeamStatsPublic:
+    try:
+        return await get_team_stats(
+            team_id=team_id, bucket_size=bucket_size, session=session
+        )
     except TeamNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
 @router.patch(path="/{team_id}", response_model=TeamPublic)
-async def update(team_id: int, team: TeamUpdate, session: SessionDep) -> Team:
+async def update(
+    team_id: int,
+    team: TeamUpdate,
+    session: SessionDep,
+    if_match: Annotated[str | None, Header(alias="If-Match")] = None,
+) -> Team:
     try:
-        return update_repo(team_id=team_id, team=team, session=session)
+        return await update_repo(
+            team_id=team_id, team=team, if_match=if_match, session=session
+        )
     except TeamNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except PreconditionFailedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e)
+        )
 
 
 @router.delete("/{team_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete(team_id: int, session: SessionDep):
+async def delete(
+    team_id: int,
+    session: SessionDep,
+    if_match: Annotated[str | None, Header(alias="If-Match")] = None,
+):
     try:
-        delete_team(team_id=team_id, session=session)
+        await delete_team(team_id=team_id, if_match=if_match, session=session)
     except TeamNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except PreconditionFailedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e)
+        )
@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+
+from src.metrics import TimedRoute
+from src.security.basic import CurrentUsernameDep
+
+router = APIRouter(prefix="/users", tags=["Users"], route_class=TimedRoute)
+
+
+@router.get("/me")
+async def read_current_user(username: CurrentUsernameDep) -> str:
+    return username
@@ -1,45 +1,141 @@
+import hashlib
+import hmac
 import secrets
+import threading
+import time
+from collections import OrderedDict
 from typing import Annotated
 
-from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
-from pydantic import BaseModel
-
-app = FastAPI()
 
+from src.crud.user import get_user_by_username
+from src.dependencies import SessionFactoryDep
+from src.security.passwords import HasherBusyError, InvalidPasswordHashError, hasher
+from src.settings import get_settings
 
 security = HTTPBasic()
 
 
-class User(BaseModel):
-    username: str
-    password: str
+class CredentialCache:
+    """
+    Remembers, for a short time, credentials that passed the KDF check, so that a
+    client sending the same Basic credentials on every request pays for the KDF
+    once per ``ttl_seconds`` instead of on each request.
+
+    Neither the password nor a plain hash of it is kept: entries are keyed by an
+    HMAC-SHA256 of the credentials under a random key that only lives in this
+    process's memory. Only successful checks are cached, so wrong passwords
+    always go through the KDF.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: float = 60.0,
+        max_entries: int = 1024,
+        clock=time.monotonic,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._key = secrets.token_bytes(32)
+        # digest -> expiry, least recently used first.
+        self._entries: OrderedDict[bytes, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _digest(self, username: str, password: str) -> bytes:
+        # Length-prefixed, so that no two (username, password) pairs collide.
+        user = username.encode("utf-8")
+        message = len(user).to_bytes(4, "big") + user + password.encode("utf-8")
+        return hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def verified(self, username: str, password: str) -> bool:
+        """
+        Return whether these credentials were verified less than ``ttl_seconds`` ago.
+        """
+        digest = self._digest(username, password)
+        with self._lock:
+            expires_at = self._entries.get(digest)
+            if expires_at is None:
+                return False
+            if expires_at <= self._clock():
+                del self._entries[digest]
+                return False
+            self._entries.move_to_end(digest)
+            return True
+
+    def add(self, username: str, password: str) -> None:
+        """
+        Record credentials that were just verified.
+        """
+        digest = self._digest(username, password)
+        with self._lock:
+            self._entries[digest] = self._clock() + self.ttl_seconds
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Forget every verified credential.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+settings = get_settings()
+credential_cache = CredentialCache(
+    ttl_seconds=settings.credential_cache_ttl_seconds,
+    max_entries=settings.credential_cache_max_entries,
+)
 
 
 async def get_current_username(
     credentials: Annotated[HTTPBasicCredentials, Depends(security)],
+    factory: SessionFactoryDep,
 ) -> str:
-    """Get the current user's username."""
-    current_user = User(username="saber", password="password")  # noqa: S106
-    user = User(username=credentials.username, password=credentials.password)
-    current_username, current_password = (
-        current_user.username.encode("utf-8"),
-        current_user.password.encode("utf-8"),
-    )
-    username, password = user.username.encode("utf-8"), user.password.encode("utf-8")
-    is_correct_username = secrets.compare_digest(current_username, username)
-    is_correct_password = secrets.compare_digest(current_password, password)
-    if not all((is_correct_username, is_correct_password)):
+    """
+    Authenticate the request's Basic credentials against the user table.
+
+    Args:
+        credentials (HTTPBasicCredentials): The credentials sent by the client.
+        factory (async_sessionmaker): Opens the session the user is loaded with.
+
+    Raises:
+        HTTPException: 401 if the credentials are wrong or the user's stored
+            hash is unreadable, 503 if the password hashing pool is saturated.
+
+    Returns:
+        str: The authenticated username.
+    """
+    username, password = credentials.username, credentials.password
+    if credential_cache.verified(username, password):
+        return username
+    # Closed before the KDF runs, so that no connection is held while hashing.
+    async with factory() as session:
+        user = await get_user_by_username(username, session)
+    # Unknown users cost one KDF run as well, so timing does not reveal them.
+    hashed = user.hashed_password if user is not None else hasher.decoy_hash()
+    try:
+        is_valid = await hasher.verify(password, hashed)
+    except HasherBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
+    except InvalidPasswordHashError:
+        # A stored hash this scheme cannot read matches no password.
+        is_valid = False
+    if user is None or not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Basic"},
         )
-    return current_user.username
+    credential_cache.add(username, password)
+    return user.username
 
 
-@app.get("/users/me")
-async def read_current_user(
-    username: Annotated[str, Depends(get_current_username)],
-) -> str:
-    return username
+CurrentUsernameDep = Annotated[str, Depends(get_current_username)]
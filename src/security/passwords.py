@@ -0,0 +1,247 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import secrets
+import threading
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+
+from pydantic import BaseModel
+
+from src.settings import Settings, get_settings
+
+SCHEME = "scrypt"
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+class HasherBusyError(Exception):
+    """
+    Exception raised when the password hashing pool already has as many jobs
+    running or waiting as it accepts.
+    """
+
+
+class InvalidPasswordHashError(Exception):
+    """
+    Exception raised when a stored password hash cannot be parsed.
+    """
+
+
+class HasherStats(BaseModel):
+    workers: int
+    max_pending: int
+    pending: int
+    rejected: int
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # scrypt needs 128 * n * r bytes; allow twice that instead of the 32 MiB default.
+    return hashlib.scrypt(
+        password.encode("utf-8"),
+        salt=salt,
+        n=n,
+        r=r,
+        p=p,
+        maxmem=2 * 128 * n * r + 1024 * 1024,
+        dklen=KEY_BYTES,
+    )
+
+
+def hash_password(password: str, n: int = 2**14, r: int = 8, p: int = 1) -> str:
+    """
+    Derive a salted scrypt hash of ``password``. This blocks for as long as the
+    cost parameters make it; call ``PasswordHasher.hash`` from async code.
+
+    The result embeds the parameters and the salt, as
+    ``scrypt$<n>$<r>$<p>$<salt>$<key>``, so hashes made with an older cost still
+    verify after the cost is raised.
+
+    Args:
+        password (str): The plain text password to hash.
+        n (int, optional): CPU/memory cost, a power of two. Defaults to 2**14.
+        r (int, optional): Block size. Defaults to 8.
+        p (int, optional): Parallelization. Defaults to 1.
+
+    Returns:
+        str: The encoded hash.
+    """
+    salt = secrets.token_bytes(SALT_BYTES)
+    key = _scrypt(password, salt, n, r, p)
+    return f"{SCHEME}${n}${r}${p}${_b64encode(salt)}${_b64encode(key)}"
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    """
+    Check ``password`` against a hash produced by ``hash_password``, in constant
+    time. Blocks like ``hash_password``.
+
+    Args:
+        password (str): The plain text password to check.
+        hashed (str): The stored hash.
+
+    Raises:
+        InvalidPasswordHashError: If ``hashed`` is not a hash of this scheme.
+
+    Returns:
+        bool: Whether the password matches.
+    """
+    try:
+        scheme, n, r, p, salt, key = hashed.split("$")
+        if scheme != SCHEME:
+            raise ValueError(scheme)
+        expected = _b64decode(key)
+        derived = _scrypt(password, _b64decode(salt), int(n), int(r), int(p))
+    except ValueError as e:
+        raise InvalidPasswordHashError("Unsupported password hash") from e
+    return hmac.compare_digest(derived, expected)
+
+
+class PasswordHasher:
+    """
+    Runs password hashing on a bounded thread pool, off the event loop.
+
+    ``hashlib.scrypt`` releases the GIL, so the hashes run in parallel with the
+    event loop. At most ``max_pending`` jobs may be running or queued; beyond
+    that, callers get ``HasherBusyError`` right away instead of queueing behind
+    work they would time out waiting for.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int = 1,
+        max_pending: int = 64,
+        n: int = 2**14,
+        r: int = 8,
+        p: int = 1,
+    ) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self.cost = {"n": n, "r": r, "p": p}
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hasher"
+        )
+        # Not an asyncio.Semaphore: the hasher is shared across event loops.
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._rejected = 0
+
+    async def _run(self, function, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise HasherBusyError("Too many password hashing requests, retry later")
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._executor.submit(function, *args)
+        except BaseException:
+            self._release()
+            raise
+        # Release the slot when the hash is done, even if the caller is cancelled
+        # while waiting: the thread keeps working until then.
+        future.add_done_callback(lambda _: self._release())
+        return await asyncio.wrap_future(future)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash ``password`` on the pool with the configured cost.
+
+        Raises:
+            HasherBusyError: If the pool is saturated.
+        """
+        return await self._run(
+            hash_password, password, self.cost["n"], self.cost["r"], self.cost["p"]
+        )
+
+    async def hash_many(self, passwords: Iterable[str | None]) -> list[str | None]:
+        """
+        Hash several passwords, ``workers`` at a time so that one large batch does
+        not fill the whole queue. None entries are passed through.
+
+        Raises:
+            HasherBusyError: If the pool is saturated.
+        """
+        passwords = list(passwords)
+        hashed = []
+        for start in range(0, len(passwords), self.workers):
+            batch = passwords[start : start + self.workers]
+            hashed.extend(
+                await asyncio.gather(
+                    *(self._passthrough(password) for password in batch)
+                )
+            )
+        return hashed
+
+    async def _passthrough(self, password: str | None) -> str | None:
+        return None if password is None else await self.hash(password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        """
+        Check ``password`` against ``hashed`` on the pool.
+
+        Raises:
+            HasherBusyError: If the pool is saturated.
+            InvalidPasswordHashError: If ``hashed`` cannot be parsed.
+        """
+        return await self._run(verify_password, password, hashed)
+
+    def decoy_hash(self) -> str:
+        """
+        Return a well-formed hash, with the configured cost, that no password
+        matches. Verifying against it takes as long as against a real hash, which
+        hides whether an account exists.
+        """
+        n, r, p = self.cost["n"], self.cost["r"], self.cost["p"]
+        salt, key = secrets.token_bytes(SALT_BYTES), secrets.token_bytes(KEY_BYTES)
+        return f"{SCHEME}${n}${r}${p}${_b64encode(salt)}${_b64encode(key)}"
+
+    def stats(self) -> HasherStats:
+        """
+        Return the pool size, the jobs in flight and the requests turned away.
+        """
+        with self._lock:
+            return HasherStats(
+                workers=self.workers,
+                max_pending=self.max_pending,
+                pending=self._pending,
+                rejected=self._rejected,
+            )
+
+
+def create_hasher(settings: Settings) -> PasswordHasher:
+    """
+    Build the password hasher configured by ``settings``.
+
+    Args:
+        settings (Settings): The application settings.
+
+    Returns:
+        PasswordHasher: The configured hasher.
+    """
+    return PasswordHasher(
+        workers=settings.password_hash_workers,
+        max_pending=settings.password_hash_max_pending,
+        n=settings.password_hash_n,
+        r=settings.password_hash_r,
+        p=settings.password_hash_p,
+    )
+
+
+hasher = create_hasher(get_settings())
@@ -0,0 +1,152 @@
+import json
+from collections.abc import Sequence
+
+from sqlalchemy import Row
+
+from src.crud.hero import HERO_EXPORT_COLUMNS, HERO_FIELDS
+from src.crud.team import MEMBER_COLUMNS, TEAM_EXPORT_COLUMNS, TEAM_FIELDS
+
+# Same options as Starlette's JSONResponse, so both paths produce the same bytes.
+_encoder = json.JSONEncoder(
+    ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+)
+
+
+class InvalidFieldsError(Exception):
+    """
+    Exception raised when a ``fields`` parameter names an unknown field.
+    """
+
+
+def parse_fields(value: str | None, allowed: Sequence[str]) -> tuple[str, ...]:
+    """
+    Parse a comma-separated ``fields`` parameter.
+
+    Args:
+        value (str | None): The parameter, e.g. ``"id,name"``; None means all fields.
+        allowed (Sequence[str]): The fields that can be requested, in output order.
+
+    Raises:
+        InvalidFieldsError: If a field is unknown or none is given.
+
+    Returns:
+        tuple[str, ...]: The requested fields, in the order of ``allowed``.
+    """
+    if value is None:
+        return tuple(allowed)
+    requested = {field.strip() for field in value.split(",")} - {""}
+    unknown = requested.difference(allowed)
+    if unknown or not requested:
+        raise InvalidFieldsError(
+            f"Unknown fields: {', '.join(sorted(unknown)) or '(none given)'}; "
+            f"choose from {', '.join(allowed)}"
+        )
+    return tuple(field for field in allowed if field in requested)
+
+
+def encode_json(content) -> bytes:
+    """
+    Encode plain Python data (dicts, lists, str, int, None) as compact JSON.
+
+    Args:
+        content: The data to encode.
+
+    Returns:
+        bytes: The UTF-8 encoded JSON document.
+    """
+    return _encoder.encode(content).encode("utf-8")
+
+
+def _hero_to_dict(row: Row, names: Sequence[str], with_team: bool) -> dict:
+    hero = dict(zip(names, row))
+    if with_team:
+        team = row[len(names) : len(names) + len(TEAM_EXPORT_COLUMNS)]
+        # The team's id is None when the outer join found no team.
+        hero["team"] = (
+            dict(zip(TEAM_EXPORT_COLUMNS, team)) if team[-1] is not None else None
+        )
+    return hero
+
+
+def heroes_to_json(rows: Sequence[Row], fields: Sequence[str] = HERO_FIELDS) -> bytes:
+    """
+    Encode rows from ``get_hero_rows`` exactly as a ``list[HeroPublicWithTeam]``
+    response restricted to ``fields``, without building ORM objects or
+    validating pydantic models.
+
+    Args:
+        rows (Sequence[Row]): The rows, selected with ``hero_projection(fields)``.
+        fields (Sequence[str], optional): The requested fields. Defaults to HERO_FIELDS.
+
+    Returns:
+        bytes: The JSON array.
+    """
+    names = [column for column in HERO_EXPORT_COLUMNS if column in fields]
+    with_team = "team" in fields
+    return encode_json([_hero_to_dict(row, names, with_team) for row in rows])
+
+
+def hero_to_json(row: Row, fields: Sequence[str] = HERO_FIELDS) -> bytes:
+    """
+    Encode a row from ``get_hero_row`` as a ``HeroPublicWithTeam`` restricted to
+    ``fields``.
+
+    Args:
+        row (Row): The row, selected with ``hero_projection(fields)``.
+        fields (Sequence[str], optional): The requested fields. Defaults to HERO_FIELDS.
+
+    Returns:
+        bytes: The JSON object.
+    """
+    names = [column for column in HERO_EXPORT_COLUMNS if column in fields]
+    return encode_json(_hero_to_dict(row, names, "team" in fields))
+
+
+def _team_to_dict(
+    team: Row, heroes: Sequence[Row], names: Sequence[str], with_heroes: bool
+) -> dict:
+    result = dict(zip(names, team))
+    if with_heroes:
+        result["heroes"] = [dict(zip(MEMBER_COLUMNS, hero)) for hero in heroes]
+    return result
+
+
+def teams_to_json(
+    teams: Sequence[tuple[Row, Sequence[Row]]], fields: Sequence[str] = TEAM_FIELDS
+) -> bytes:
+    """
+    Encode rows from ``get_team_rows`` exactly as a ``list[TeamPublicWithHeroes]``
+    response restricted to ``fields``, without building ORM objects or
+    validating pydantic models.
+
+    Args:
+        teams (Sequence[tuple[Row, Sequence[Row]]]): Each team row with its heroes.
+        fields (Sequence[str], optional): The requested fields. Defaults to TEAM_FIELDS.
+
+    Returns:
+        bytes: The JSON array.
+    """
+    names = [column for column in TEAM_EXPORT_COLUMNS if column in fields]
+    with_heroes = "heroes" in fields
+    return encode_json(
+        [_team_to_dict(team, heroes, names, with_heroes) for team, heroes in teams]
+    )
+
+
+def team_to_json(
+    team: Row, heroes: Sequence[Row], fields: Sequence[str] = TEAM_FIELDS
+) -> bytes:
+    """
+    Encode rows from ``get_team_row`` as a ``TeamPublicWithHeroes`` restricted to
+    ``fields``.
+
+    Args:
+        team (Row): The team row, selected with ``team_projection(fields)``.
+        heroes (Sequence[Row]): The rows of its heroes.
+        fields (Sequence[str], optional): The requested fields. Defaults to TEAM_FIELDS.
+
+    Returns:
+        bytes: The JSON object.
+    """
+    names = [column for column in TEAM_EXPORT_COLUMNS if column in fields]
+    return encode_json(_team_to_dict(team, heroes, names, "heroes" in fields))
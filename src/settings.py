@@ -0,0 +1,68 @@
+import os
+from functools import lru_cache
+from typing import Literal
+
+from pydantic import BaseModel
+
+ENV_PREFIX = "CRUD_"
+
+
+class Settings(BaseModel):
+    """
+    Application settings. Every field can be overridden with an environment
+    variable named ``CRUD_<FIELD_NAME>`` (e.g. ``CRUD_ECHO_SQL=true``).
+    """
+
+    database_name: str = "crud"
+    # Sample heroes, teams and the "saber" user, written when the schema is created.
+    seed_sample_data: bool = False
+    # Created on startup unless a user with this name exists; never updated.
+    bootstrap_username: str | None = None
+    bootstrap_password: str | None = None
+    migration_batch_size: int = 5000
+    migration_pause_ms: float = 10.0
+    echo_sql: bool = False
+    sqlite_profile: Literal["default", "production"] = "production"
+    fast_serialization: bool = False
+    cache_backend: Literal["memory", "sqlite"] = "memory"
+    cache_path: str = "crud_cache.db"
+    cache_max_entries: int = 10_000
+    cache_ttl_seconds: float = 30.0
+    # Hashing is CPU-bound: leave a core to the event loop.
+    password_hash_workers: int = max(1, (os.cpu_count() or 1) - 1)
+    password_hash_max_pending: int = 64
+    password_hash_n: int = 2**14
+    password_hash_r: int = 8
+    password_hash_p: int = 1
+    credential_cache_ttl_seconds: float = 60.0
+    credential_cache_max_entries: int = 1024
+    pool_class: Literal["queue", "static"] = "queue"
+    pool_size: int = 5
+    pool_max_overflow: int = 10
+    pool_timeout_seconds: float = 30.0
+    pool_pre_ping: bool = False
+    pool_recycle_seconds: int = -1
+    # e.g. "sqlite+aiosqlite:///file:crud.db?mode=ro&uri=true"; None reads the primary.
+    replica_database_url: str | None = None
+    read_your_writes_seconds: float = 5.0
+    metrics_enabled: bool = True
+    query_log_enabled: bool = False
+    slow_query_ms: float = 100.0
+    repeated_statement_threshold: int = 10
+    query_log_max_entries: int = 100
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """
+    Build the settings from the environment once and cache them.
+
+    Returns:
+        Settings: The application settings.
+    """
+    overrides = {
+        name: os.environ[f"{ENV_PREFIX}{name.upper()}"]
+        for name in Settings.model_fields
+        if f"{ENV_PREFIX}{name.upper()}" in os.environ
+    }
+    return Settings(**overrides)
@@ -1,34 +1,100 @@
+from contextlib import contextmanager
+
 import pytest
-from sqlalchemy import create_engine
-from sqlmodel import SQLModel, Session
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 from starlette.testclient import TestClient
 
+from src.cache import cache
 from src.crud.hero import create_hero
 from src.crud.team import create_team
-from src.dependencies import get_session
+from src.dependencies import get_session_factory
 from src.main import app
+from src.querylog import QueryLog, QueryLogMiddleware
+from src.security.basic import get_current_username
 
 from src.models.hero import Hero
 from src.models.team import Team, TeamCreate
 
 
-@pytest.fixture(name="session", scope="module")
-def session_fixture():
-    test_db_url = "testing.db"
-    # Create an in-memory SQLite database
-    engine = create_engine(
-        f"sqlite:///{test_db_url}", connect_args={"check_same_thread": False}
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-slow",
+        action="store_true",
+        default=False,
+        help="run slow tests that use large data volumes",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-slow"):
+        return
+    skip_slow = pytest.mark.skip(reason="needs --run-slow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
+
+
+@pytest.fixture(name="engine", scope="module")
+async def engine_fixture(tmp_path_factory):
+    test_db_url = tmp_path_factory.mktemp("db") / "testing.db"
+    # NullPool: the TestClient runs the app on its own event loop, so
+    # connections must not be shared between loops through a pool.
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{test_db_url}", poolclass=NullPool
     )
-    SQLModel.metadata.create_all(engine)
-    with Session(engine) as session:
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    yield engine
+
+    # Clean up the database after tests
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.drop_all)
+    await engine.dispose()
+
+
+@pytest.fixture(name="session", scope="module")
+async def session_fixture(engine):
+    async with AsyncSession(engine, expire_on_commit=False) as session:
         yield session
 
-        # Clean up the memory database after tests
-        SQLModel.metadata.drop_all(engine)
+
+@pytest.fixture
+def count_queries(engine):
+    """Collect the SQL statements the test engine executes inside the block."""
+
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(
+                engine.sync_engine, "before_cursor_execute", before_cursor_execute
+            )
+
+    return counter
+
+
+@pytest.fixture
+def query_log(engine):
+    """Record the slow queries and repeated statements of the test engine."""
+    log = QueryLog()
+    log.attach(engine)
+    yield log
+    log.detach(engine)
 
 
 @pytest.fixture(name="client")
-def client_fixture(session):
+async def client_fixture(engine, session):
     # Heroes
     hero_batman = Hero(name="Batman", secret_name="Bruce Wayne", age=35)
     hero_superman = Hero(name="Superman", secret_name="Clark Kent", age=30)
@@ -49,29 +115,41 @@ def client_fixture(session):
     team_humanity.heroes = [hero_cyborg, hero_flash]
     session.add(team_justice_league)
     session.add(team_humanity)
-    session.commit()
-    session.refresh(team_justice_league)
-    session.refresh(team_humanity)
-
-    def override_get_session():
-        return session
+    await session.commit()
+    await session.refresh(team_justice_league)
+    await session.refresh(team_humanity)
 
-    app.dependency_overrides[get_session] = override_get_session
+    app.dependency_overrides[get_session_factory] = lambda: async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+    app.dependency_overrides[get_current_username] = lambda: "tester"
+    await cache.clear()
     client = TestClient(app)
     yield client
     app.dependency_overrides.clear()
+    await cache.clear()
+
+
+@pytest.fixture
+def query_log_client(client, query_log):
+    """The test client, attributing the statements of each request to its route."""
+    return TestClient(QueryLogMiddleware(app, query_log))
 
 
 @pytest.fixture
-def batman_is_here(session):
+async def batman_is_here(session):
     hero_batman = Hero(name="Batman", secret_name="Bruce Wayne", age=35)
-    return create_hero(hero_batman, session)
+    hero = await create_hero(hero_batman, session)
+    await session.commit()
+    return hero
 
 
 @pytest.fixture
-def team_avengers_is_here(session):
+async def team_avengers_is_here(session):
     team = TeamCreate(
         name="Avengers",
         headquarters="LA",
     )
-    return create_team(team, session)
+    db_team = await create_team(team, session)
+    await session.commit()
+    return db_team
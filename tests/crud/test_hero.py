@@ -1,18 +1,34 @@
+import asyncio
+
 import pytest
-from src.models.hero import HeroCreate, HeroUpdate, Hero
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.crud.loading import LoadStrategy
+from src.crud.pagination import (
+    Cursor,
+    InvalidCursorError,
+    encode_cursor,
+    next_cursor,
+)
+from src.models.hero import HeroCreate, HeroFilter, HeroUpdate, Hero
+from src.models.public import HeroPublicWithTeam
+from src.models.team import Team
 
 from src.crud.hero import (
     get_heroes,
     get_hero_by_id,
     create_hero,
+    create_heroes_bulk,
     update_hero,
     delete_hero,
     HeroNotFoundError,
-    hash_password,
 )
+from src.crud.team import TeamNotFoundError
+from src.security.passwords import verify_password
 
 
-def test_create_hero(session):
+async def test_create_hero(session, team_avengers_is_here):
     # Arrange
     password = "password"
     hero = HeroCreate(
@@ -20,21 +36,30 @@ def test_create_hero(session):
         secret_name="Miles Morales",
         age=25,
         password=password,
-        team_id=1,
+        team_id=team_avengers_is_here.id,
     )
 
     # Act
-    created_hero = create_hero(hero=hero, session=session)
+    created_hero = await create_hero(hero=hero, session=session)
 
     # Assert
     assert created_hero.id is not None
     assert created_hero.name == "Spiderman 3"
     assert created_hero.secret_name == "Miles Morales"
     assert created_hero.age == 25
-    assert created_hero.hashed_password == hash_password(password=password)
+    assert verify_password(password, created_hero.hashed_password)
+
+
+async def test_create_hero_with_unknown_team(session):
+    # Arrange
+    hero = HeroCreate(name="Spiderman 4", secret_name="Ben Reilly", team_id=999)
+
+    # Act / Assert
+    with pytest.raises(TeamNotFoundError, match="Team with id 999 not found"):
+        await create_hero(hero=hero, session=session)
 
 
-def test_list(session):
+async def test_list(session):
     # Arrange
     # Heroes
     hero_batman = Hero(name="Batman", secret_name="Bruce Wayne", age=35)
@@ -43,10 +68,10 @@ def test_list(session):
     hero_cyborg = Hero(name="Cyborg", secret_name="Victor Stone", age=25)
     heroes = [hero_batman, hero_superman, hero_flash, hero_cyborg]
     for hero in heroes:
-        create_hero(hero, session)
+        await create_hero(hero, session)
 
     # Act
-    heroes = get_heroes(session=session, offset=0, limit=100)
+    heroes = await get_heroes(session=session, offset=0, limit=100)
 
     # Assert
     assert len(heroes) == 5
@@ -56,12 +81,12 @@ def test_list(session):
     assert heroes[3].id == 4
 
 
-def test_get_existing_hero_by_id(session, batman_is_here):
+async def test_get_existing_hero_by_id(session, batman_is_here):
     # Arrange
     hero_id = batman_is_here.id
 
     # Act
-    hero = get_hero_by_id(hero_id=hero_id, session=session)
+    hero = await get_hero_by_id(hero_id=hero_id, session=session)
 
     # Assert
     assert hero.id == hero_id
@@ -70,24 +95,23 @@ def test_get_existing_hero_by_id(session, batman_is_here):
     assert hero.age == 35
 
 
-def test_get_unexisting_hero_by_id(session):
+async def test_get_unexisting_hero_by_id(session):
     # Arrange
     hero_id = 0
 
     # Act & Assert
     with pytest.raises(HeroNotFoundError, match=f"Hero with id {hero_id} not found"):
-        get_hero_by_id(hero_id=hero_id, session=session)
+        await get_hero_by_id(hero_id=hero_id, session=session)
 
 
-def test_update_hero(session, batman_is_here):
+async def test_update_hero(session, batman_is_here):
     # Arrange
     new_password = "newpassword"
-    hashed_new_password = hash_password(password=new_password)
     hero_batman = batman_is_here
     updated_hero = HeroUpdate(name="Spiderman 3", age=31, password=new_password)
 
     # Act
-    updated_hero = update_hero(
+    updated_hero = await update_hero(
         hero_id=hero_batman.id, hero=updated_hero, session=session
     )
 
@@ -95,19 +119,235 @@ def test_update_hero(session, batman_is_here):
     assert updated_hero.id == hero_batman.id
     assert updated_hero.name == "Spiderman 3"
     assert updated_hero.age == 31
-    assert updated_hero.hashed_password == hashed_new_password
+    assert verify_password(new_password, updated_hero.hashed_password)
 
 
-def test_delete_hero(session, batman_is_here):
+async def test_delete_hero(session, batman_is_here):
     # Arrange
     hero_id = batman_is_here.id
 
     # Act
-    deleted = delete_hero(hero_id=hero_id, session=session)
+    deleted = await delete_hero(hero_id=hero_id, session=session)
 
     # Assert
     assert deleted
 
     # Verify the hero is deleted
     with pytest.raises(HeroNotFoundError, match=f"Hero with id {hero_id} not found"):
-        get_hero_by_id(hero_id=hero_id, session=session)
+        await get_hero_by_id(hero_id=hero_id, session=session)
+
+
+async def test_concurrent_reads_use_separate_sessions(engine, batman_is_here):
+    # Arrange
+    hero_id = batman_is_here.id
+
+    async def read_hero() -> Hero:
+        async with AsyncSession(engine, expire_on_commit=False) as other_session:
+            return await get_hero_by_id(hero_id=hero_id, session=other_session)
+
+    # Act
+    heroes = await asyncio.gather(*(read_hero() for _ in range(10)))
+
+    # Assert
+    assert {hero.id for hero in heroes} == {hero_id}
+
+
+@pytest.mark.parametrize("load", [LoadStrategy.SELECTIN, LoadStrategy.JOINED])
+async def test_list_heroes_with_team_query_count_is_bounded(
+    engine, session, count_queries, load
+):
+    # Arrange
+    for i in range(20):
+        session.add(
+            Team(
+                name=f"Team {load.value} {i}",
+                heroes=[Hero(name=f"Hero {load.value} {i}", secret_name="Secret")],
+            )
+        )
+    await session.commit()
+
+    # Act
+    async with AsyncSession(engine, expire_on_commit=False) as other_session:
+        with count_queries() as statements:
+            heroes = await get_heroes(
+                session=other_session, offset=0, limit=100, load=load
+            )
+            payload = [HeroPublicWithTeam.model_validate(hero) for hero in heroes]
+
+    # Assert
+    assert len(payload) > 20
+    expected = 1 if load is LoadStrategy.JOINED else 2
+    assert len(statements) == expected
+
+
+async def test_get_hero_without_relationship_does_not_load_team(engine, batman_is_here):
+    # Arrange
+    hero_id = batman_is_here.id
+
+    # Act
+    async with AsyncSession(engine, expire_on_commit=False) as other_session:
+        hero = await get_hero_by_id(
+            hero_id=hero_id, session=other_session, load=LoadStrategy.NONE
+        )
+
+        # Assert
+        with pytest.raises(InvalidRequestError):
+            _ = hero.team
+
+
+@pytest.mark.parametrize("order_by", ["id", "name", "age", "-id", "-name", "-age"])
+async def test_cursor_pagination_matches_offset_pagination(session, order_by):
+    # Arrange
+    for age in (None, 40, 20, None, 20):
+        await create_hero(HeroCreate(name="Keyset", secret_name="K", age=age), session)
+    expected = await get_heroes(session=session, limit=1000, order_by=order_by)
+
+    # Act
+    paged, cursor = [], None
+    while True:
+        page = await get_heroes(
+            session=session, limit=3, order_by=order_by, cursor=cursor
+        )
+        paged.extend(page)
+        cursor = next_cursor(page, key=order_by, limit=3)
+        if cursor is None:
+            break
+
+    # Assert
+    assert [hero.id for hero in paged] == [hero.id for hero in expected]
+
+
+async def test_get_heroes_descending(session):
+    # Arrange
+    for age in (None, 41, 43):
+        await create_hero(
+            HeroCreate(name="Descending", secret_name="D", age=age), session
+        )
+
+    # Act
+    heroes = await get_heroes(session=session, limit=1000, order_by="-age")
+
+    # Assert
+    ages = [hero.age for hero in heroes if hero.age is not None]
+    assert ages == sorted(ages, reverse=True)
+    assert heroes[-1].age is None
+
+
+async def test_get_heroes_with_filters(session, team_avengers_is_here):
+    # Arrange
+    for name, age in (("Filter Alpha", 51), ("Filter Beta", 52), ("Filtered", 70)):
+        await create_hero(
+            HeroCreate(
+                name=name, secret_name="F", age=age, team_id=team_avengers_is_here.id
+            ),
+            session,
+        )
+    filters = HeroFilter(
+        name_prefix="Filter ", max_age=60, team_id=team_avengers_is_here.id
+    )
+
+    # Act
+    heroes = await get_heroes(session=session, filters=filters)
+
+    # Assert
+    assert [hero.name for hero in heroes] == ["Filter Alpha", "Filter Beta"]
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        HeroFilter(name_prefix="Bat"),
+        HeroFilter(min_age=30),
+        HeroFilter(max_age=30),
+        HeroFilter(min_age=20, max_age=30),
+        HeroFilter(team_id=1),
+    ],
+)
+@pytest.mark.parametrize("order_by", ["id", "-name"])
+async def test_hero_filters_are_answered_by_an_index(
+    engine, session, filters, order_by
+):
+    # Arrange
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        executed.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        await get_heroes(
+            session=session,
+            load=LoadStrategy.NONE,
+            order_by=order_by,
+            filters=filters,
+        )
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    statement, parameters = executed[0]
+
+    # Act
+    connection = await session.connection()
+    plan = await connection.exec_driver_sql(
+        f"EXPLAIN QUERY PLAN {statement}", parameters
+    )
+
+    # Assert
+    details = [row[3] for row in plan]
+    assert not any(detail.startswith("SCAN") for detail in details), details
+
+
+async def test_cursor_for_another_ordering_is_rejected(session, batman_is_here):
+    # Arrange
+    cursor = encode_cursor(Cursor(key="name", value="Batman", id=batman_is_here.id))
+
+    # Act & Assert
+    with pytest.raises(InvalidCursorError):
+        await get_heroes(session=session, order_by="age", cursor=cursor)
+    with pytest.raises(InvalidCursorError):
+        await get_heroes(session=session, cursor="not-a-cursor")
+
+
+async def test_create_heroes_bulk(session, team_avengers_is_here):
+    # Arrange
+    heroes = [
+        HeroCreate(name="Bulk Hero 1", secret_name="B1", age=20, password="secret"),
+        HeroCreate(
+            name="Bulk Hero 2", secret_name="B2", team_id=team_avengers_is_here.id
+        ),
+        HeroCreate(name="Bulk Hero 3", secret_name="B3", team_id=999_999),
+    ]
+
+    # Act
+    results = await create_heroes_bulk(heroes=heroes, session=session)
+
+    # Assert
+    assert [result.status for result in results] == ["created", "created", "failed"]
+    assert results[2].detail == "Team with id 999999 not found"
+    first = await get_hero_by_id(hero_id=results[0].id, session=session)
+    second = await get_hero_by_id(hero_id=results[1].id, session=session)
+    assert (first.name, first.age) == ("Bulk Hero 1", 20)
+    assert verify_password("secret", first.hashed_password)
+    assert second.team_id == team_avengers_is_here.id
+
+
+async def test_upsert_heroes_bulk_updates_by_name(session):
+    # Arrange
+    created = await create_heroes_bulk(
+        heroes=[HeroCreate(name="Upsert Hero", secret_name="Before", age=40)],
+        session=session,
+    )
+    heroes = [
+        HeroCreate(name="Upsert Hero", secret_name="Ignored"),
+        HeroCreate(name="Upsert Hero", secret_name="After"),
+        HeroCreate(name="Upsert Newcomer", secret_name="New"),
+    ]
+
+    # Act
+    results = await create_heroes_bulk(heroes=heroes, session=session, upsert=True)
+
+    # Assert
+    assert [result.status for result in results] == ["skipped", "updated", "created"]
+    assert results[1].id == created[0].id
+    updated = await get_hero_by_id(hero_id=created[0].id, session=session)
+    await session.refresh(updated)
+    assert (updated.secret_name, updated.age) == ("After", 40)
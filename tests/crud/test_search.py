@@ -0,0 +1,111 @@
+import pytest
+
+from src.crud.hero import create_hero, create_heroes_bulk, delete_hero, update_hero
+from src.crud.search import InvalidSearchError, match_expression, search
+from src.crud.team import create_team, delete_team
+from src.models.hero import HeroCreate, HeroUpdate
+from src.models.search import SearchKind
+from src.models.team import TeamCreate
+
+
+async def search_ids(session, query, kind=SearchKind.HERO):
+    results = await search(query=query, kinds=[kind], limit=100, session=session)
+    return {result.id for result in results}
+
+
+def test_match_expression_quotes_terms():
+    # Act
+    expression = match_expression(' wonder  "wo-man ')
+
+    # Assert
+    assert expression == '"wonder" """wo-man"*'
+
+
+def test_match_expression_drops_terms_without_tokens():
+    # Act
+    expression = match_expression("bat - ...")
+
+    # Assert
+    assert expression == '"bat"*'
+
+
+@pytest.mark.parametrize("query", ["   ", " - ", '"" *'])
+def test_match_expression_rejects_query_without_terms(query):
+    # Act & Assert
+    with pytest.raises(InvalidSearchError):
+        match_expression(query)
+
+
+async def test_search_ignores_a_trailing_operator(session):
+    # Arrange
+    hero = await create_hero(
+        HeroCreate(name="Batwoman", secret_name="Kate Kane"), session
+    )
+
+    # Act
+    found = await search_ids(session, "batw -")
+
+    # Assert
+    assert hero.id in found
+
+
+async def test_search_follows_hero_writes(session):
+    # Arrange
+    hero = await create_hero(
+        HeroCreate(name="Zatanna Zatara", secret_name="Zee"), session
+    )
+    found_when_created = await search_ids(session, "zatan")
+
+    # Act
+    await update_hero(
+        hero_id=hero.id,
+        hero=HeroUpdate(secret_name="Mistress Of Magic"),
+        session=session,
+    )
+    by_new_secret_name = await search_ids(session, "mistress magic")
+    by_old_secret_name = await search_ids(session, "zee")
+    await delete_hero(hero_id=hero.id, session=session)
+    found_when_deleted = await search_ids(session, "zatanna")
+
+    # Assert
+    assert hero.id in found_when_created
+    assert hero.id in by_new_secret_name
+    assert hero.id not in by_old_secret_name
+    assert hero.id not in found_when_deleted
+
+
+async def test_search_follows_bulk_writes_and_team_deletes(session):
+    # Arrange
+    team = await create_team(
+        TeamCreate(name="Doom Patrol", headquarters="Kansas"), session
+    )
+    results = await create_heroes_bulk(
+        heroes=[
+            HeroCreate(name="Robotman", secret_name="Cliff Steele", team_id=team.id)
+        ],
+        session=session,
+    )
+    found_when_created = await search_ids(session, "cliff steele")
+
+    # Act
+    await delete_team(team_id=team.id, session=session)
+
+    # Assert
+    assert results[0].id in found_when_created
+    assert await search_ids(session, "kansas", kind=SearchKind.TEAM) == set()
+
+
+async def test_search_ranks_name_matches_first(session):
+    # Arrange
+    by_secret_name = await create_hero(
+        HeroCreate(name="Sidekick", secret_name="Quasar Quill"), session
+    )
+    by_name = await create_hero(HeroCreate(name="Quasar", secret_name="Wendy"), session)
+
+    # Act
+    results = await search(query="quasar", session=session)
+
+    # Assert
+    ids = [result.id for result in results if result.kind == SearchKind.HERO]
+    assert ids.index(by_name.id) < ids.index(by_secret_name.id)
+    assert results == sorted(results, key=lambda result: -result.score)
@@ -0,0 +1,107 @@
+import pytest
+from sqlalchemy import func, select
+
+from src.crud.hero import create_hero, create_heroes_bulk, delete_hero, update_hero
+from src.crud.stats import get_stats, get_team_stats
+from src.crud.team import TeamNotFoundError, create_team
+from src.models.hero import Hero, HeroCreate, HeroUpdate
+from src.models.team import TeamCreate
+
+
+async def counted(session, team_id):
+    """Hero count and ages of a team, computed from the hero table."""
+    count, ages, total = (
+        await session.exec(
+            select(func.count(), func.count(Hero.age), func.sum(Hero.age)).where(
+                Hero.team_id == team_id
+            )
+        )
+    ).one()
+    return count, (total / ages if ages else None)
+
+
+async def test_team_counters_follow_hero_writes(session):
+    # Arrange
+    first = await create_team(TeamCreate(name="Counted A"), session)
+    second = await create_team(TeamCreate(name="Counted B"), session)
+    hero = await create_hero(
+        HeroCreate(name="Mover", secret_name="M", age=30, team_id=first.id), session
+    )
+    await create_heroes_bulk(
+        heroes=[
+            HeroCreate(name="Bulk A", secret_name="A", age=20, team_id=first.id),
+            HeroCreate(name="Bulk B", secret_name="B", team_id=second.id),
+        ],
+        session=session,
+    )
+    await create_heroes_bulk(
+        heroes=[HeroCreate(name="Bulk A", secret_name="A", age=40, team_id=first.id)],
+        upsert=True,
+        session=session,
+    )
+
+    # Act
+    await update_hero(
+        hero_id=hero.id, hero=HeroUpdate(team_id=second.id, age=50), session=session
+    )
+    moved = await get_team_stats(team_id=second.id, session=session)
+    await delete_hero(hero_id=hero.id, session=session)
+    first_stats = await get_team_stats(team_id=first.id, session=session)
+    second_stats = await get_team_stats(team_id=second.id, session=session)
+
+    # Assert
+    assert (moved.hero_count, moved.average_age) == (2, 50)
+    assert (first_stats.hero_count, first_stats.average_age) == (1, 40)
+    assert (second_stats.hero_count, second_stats.average_age) == (1, None)
+    for stats in (first_stats, second_stats):
+        assert (stats.hero_count, stats.average_age) == await counted(
+            session, stats.team_id
+        )
+
+
+async def test_team_age_histogram(session):
+    # Arrange
+    team = await create_team(TeamCreate(name="Histogram"), session)
+    for age in (21, 29, 35, None):
+        await create_hero(
+            HeroCreate(name="Aged", secret_name="A", age=age, team_id=team.id), session
+        )
+
+    # Act
+    stats = await get_team_stats(team_id=team.id, bucket_size=10, session=session)
+
+    # Assert
+    assert stats.hero_count == 4
+    assert [bucket.model_dump() for bucket in stats.age_histogram] == [
+        {"min_age": 20, "max_age": 29, "count": 2},
+        {"min_age": 30, "max_age": 39, "count": 1},
+    ]
+
+
+async def test_get_team_stats_of_unexisting_team(session):
+    # Act & Assert
+    with pytest.raises(TeamNotFoundError):
+        await get_team_stats(team_id=999_999, session=session)
+
+
+async def test_stats_totals_match_the_hero_table(session):
+    # Arrange
+    await create_hero(HeroCreate(name="Loner", secret_name="L", age=33), session)
+    count, ages, total = (
+        await session.exec(
+            select(func.count(), func.count(Hero.age), func.sum(Hero.age))
+        )
+    ).one()
+
+    # Act
+    stats = await get_stats(limit=1000, session=session)
+
+    # Assert
+    assert stats.hero_count == count
+    assert stats.average_age == pytest.approx(total / ages)
+    assert sum(bucket.count for bucket in stats.age_histogram) == ages
+    assert stats.heroes_without_team >= 1
+    assert len(stats.teams) == stats.team_count
+    counts = [team.hero_count for team in stats.teams]
+    assert counts == sorted(counts, reverse=True)
+    assert sum(counts) + stats.heroes_without_team == count
@@ -1,8 +1,15 @@
 import pytest
-from src.models.team import Team, TeamCreate, TeamUpdate
+from sqlalchemy import event
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.crud.loading import LoadStrategy
+from src.models.hero import Hero
+from src.models.public import TeamPublicWithHeroes
+from src.models.team import Team, TeamCreate, TeamFilter, TeamUpdate
 
 from src.crud.team import (
     create_team,
+    create_teams_bulk,
     get_teams,
     get_team_by_id,
     TeamNotFoundError,
@@ -11,7 +18,7 @@ from src.crud.team import (
 )
 
 
-def test_create_team(session):
+async def test_create_team(session):
     # Arrange
     team = TeamCreate(
         name="Avengers",
@@ -19,64 +26,172 @@ def test_create_team(session):
     )
 
     # Act
-    gotten = create_team(team, session)
+    gotten = await create_team(team, session)
 
     # Assert
     gotten.name = team.name
     gotten.headquarters = team.headquarters
 
 
-def test_get_teams(session, team_avengers_is_here):
+async def test_get_teams(session, team_avengers_is_here):
     # Act
-    teams = get_teams(offset=0, limit=1, session=session)
+    teams = await get_teams(offset=0, limit=1, session=session)
 
     # Assert
     assert len(teams) == 1
     assert isinstance(teams, list)
 
 
-def test_get_existing_team_by_id(session, team_avengers_is_here):
+async def test_get_teams_with_filters(session):
+    # Arrange
+    for name, headquarters in (
+        ("Filter League", "Metropolis"),
+        ("Filter Squad", "Gotham"),
+        ("Filtered League", "Metropolis"),
+    ):
+        await create_team(TeamCreate(name=name, headquarters=headquarters), session)
+
+    # Act
+    teams = await get_teams(
+        filters=TeamFilter(name_prefix="Filter ", headquarters="Metropolis"),
+        order_by="-name",
+        session=session,
+    )
+
+    # Assert
+    assert [team.name for team in teams] == ["Filter League"]
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        TeamFilter(name_prefix="Aven"),
+        TeamFilter(headquarters="LA"),
+        TeamFilter(name_prefix="Aven", headquarters="LA"),
+    ],
+)
+@pytest.mark.parametrize("order_by", ["id", "-name"])
+async def test_team_filters_are_answered_by_an_index(
+    engine, session, filters, order_by
+):
+    # Arrange
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        executed.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        await get_teams(
+            session=session,
+            load=LoadStrategy.NONE,
+            order_by=order_by,
+            filters=filters,
+        )
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    statement, parameters = executed[0]
+
+    # Act
+    connection = await session.connection()
+    plan = await connection.exec_driver_sql(
+        f"EXPLAIN QUERY PLAN {statement}", parameters
+    )
+
+    # Assert
+    details = [row[3] for row in plan]
+    assert not any(detail.startswith("SCAN") for detail in details), details
+
+
+async def test_get_existing_team_by_id(session, team_avengers_is_here):
     # Arrange
     team_id = 1
 
     # Act
-    gotten_team = get_team_by_id(team_id=1, session=session)
+    gotten_team = await get_team_by_id(team_id=1, session=session)
 
     # Assert
     assert gotten_team.id == team_id
     assert isinstance(gotten_team, Team)
 
 
-def test_get_unexisting_team_by_id(session):
+async def test_get_unexisting_team_by_id(session):
     # Arrange
     team_id = 0
 
     # Act & Assert
     with pytest.raises(TeamNotFoundError):
-        get_team_by_id(team_id=team_id, session=session)
+        await get_team_by_id(team_id=team_id, session=session)
 
 
-def test_update_team(session, team_avengers_is_here):
+async def test_update_team(session, team_avengers_is_here):
     # Arrange
     team_id = team_avengers_is_here.id
     team = TeamUpdate(name="Homeless", headquarters=None)
 
     # Act
-    gotten_team = update_team(team_id=team_id, team=team, session=session)
+    gotten_team = await update_team(team_id=team_id, team=team, session=session)
 
     # Assert
     assert gotten_team.name == "Homeless"
     assert gotten_team.headquarters is None
 
 
-def test_delete_team(session, team_avengers_is_here):
+async def test_delete_team(session, team_avengers_is_here):
     # Arrange
     team_id = team_avengers_is_here.id
 
     # Act
-    deleted = delete_team(team_id=team_id, session=session)
+    deleted = await delete_team(team_id=team_id, session=session)
 
     # Assert
     assert deleted
     with pytest.raises(TeamNotFoundError):
-        get_team_by_id(team_id=team_id, session=session)
+        await get_team_by_id(team_id=team_id, session=session)
+
+
+@pytest.mark.parametrize("load", [LoadStrategy.SELECTIN, LoadStrategy.JOINED])
+async def test_list_teams_with_heroes_query_count_is_bounded(
+    engine, session, count_queries, load
+):
+    # Arrange
+    for i in range(20):
+        session.add(
+            Team(
+                name=f"Team {load.value} {i}",
+                heroes=[
+                    Hero(name=f"Hero {load.value} {i}.{j}", secret_name="Secret")
+                    for j in range(3)
+                ],
+            )
+        )
+    await session.commit()
+
+    # Act
+    async with AsyncSession(engine, expire_on_commit=False) as other_session:
+        with count_queries() as statements:
+            teams = await get_teams(
+                offset=0, limit=100, load=load, session=other_session
+            )
+            payload = [TeamPublicWithHeroes.model_validate(team) for team in teams]
+
+    # Assert
+    assert len(payload) >= 20
+    expected = 1 if load is LoadStrategy.JOINED else 2
+    assert len(statements) == expected
+
+
+async def test_create_teams_bulk_with_upsert(session, team_avengers_is_here):
+    # Arrange
+    teams = [
+        TeamCreate(name="Avengers", headquarters="New York"),
+        TeamCreate(name="X-Men", headquarters="Westchester"),
+    ]
+
+    # Act
+    results = await create_teams_bulk(teams=teams, upsert=True, session=session)
+
+    # Assert
+    assert [result.status for result in results] == ["updated", "created"]
+    x_men = await get_team_by_id(team_id=results[1].id, session=session)
+    assert x_men.name == "X-Men"
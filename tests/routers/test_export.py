@@ -0,0 +1,105 @@
+import asyncio
+import os
+import sqlite3
+from pathlib import Path
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.dependencies import get_session_factory
+from src.main import app
+from src.security.basic import get_current_username
+
+# Growth allowed while exporting: well below the size of the exported body
+# (~80 MB for a million heroes), so buffering the response would fail.
+RSS_CEILING_BYTES = 48 * 1024 * 1024
+
+
+def current_rss() -> int:
+    pages = Path("/proc/self/statm").read_text().split()[1]
+    return int(pages) * os.sysconf("SC_PAGE_SIZE")
+
+
+async def stream_response(path: str, query: bytes) -> tuple[int, int, int]:
+    """
+    Call the ASGI app directly and discard the body as it arrives.
+
+    TestClient and httpx's ASGITransport collect the whole body, which would
+    measure the client rather than the server.
+    """
+    status, lines, peak = 0, 0, current_rss()
+    disconnected = asyncio.Event()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query,
+        "headers": [(b"host", b"test")],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, lines, peak
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            lines += message.get("body", b"").count(b"\n")
+            peak = max(peak, current_rss())
+
+    await app(scope, receive, send)
+    disconnected.set()
+    return status, lines, peak
+
+
+@pytest.mark.skipif(
+    not Path("/proc/self/statm").exists(), reason="needs /proc to read RSS"
+)
+@pytest.mark.parametrize(
+    "rows", [50_000, pytest.param(1_000_000, marks=pytest.mark.slow)]
+)
+async def test_export_memory_stays_flat(tmp_path, rows):
+    # Arrange
+    database = tmp_path / "export.db"
+    engine = create_async_engine(f"sqlite+aiosqlite:///{database}")
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    # Seed from a generator so seeding itself does not inflate the baseline RSS.
+    with sqlite3.connect(database) as connection:
+        connection.executemany(
+            "INSERT INTO hero (name, secret_name, age) VALUES (?, ?, ?)",
+            ((f"Hero {i}", f"Secret {i}", i % 90) for i in range(rows)),
+        )
+    app.dependency_overrides[get_session_factory] = lambda: async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+    app.dependency_overrides[get_current_username] = lambda: "tester"
+    baseline = current_rss()
+
+    # Act
+    try:
+        status, lines, peak = await stream_response("/heroes/export", b"format=ndjson")
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+    # Assert
+    assert status == 200
+    assert lines == rows
+    assert peak - baseline < RSS_CEILING_BYTES
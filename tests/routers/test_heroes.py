@@ -1,3 +1,15 @@
+import csv
+import io
+import json
+
+import src.crud.hero
+import src.routers.heroes
+from src.cache import cache
+from src.main import app
+from src.security.passwords import PasswordHasher
+from src.settings import Settings, get_settings
+
+
 def test_create_hero(client):
     # Arrange
     hero_data = {"name": "Deadpool", "secret_name": "Dive Wilson"}
@@ -16,6 +28,107 @@ def test_create_hero(client):
     assert "hashed_password" not in result
 
 
+def test_create_hero_with_unknown_team(client):
+    # Act
+    response = client.post(
+        url="/heroes/", json={"name": "Deadpool", "secret_name": "W", "team_id": 999}
+    )
+
+    # Assert
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Team with id 999 not found"
+
+
+def test_create_hero_when_password_hashing_is_saturated(client, monkeypatch):
+    # Arrange
+    monkeypatch.setattr(src.crud.hero, "hasher", PasswordHasher(max_pending=0))
+    hero_data = {"name": "Queued", "secret_name": "Q", "password": "secret"}
+
+    # Act
+    response = client.post(url="/heroes/", json=hero_data)
+    bulk_response = client.post(url="/heroes/bulk", json=[hero_data])
+    without_password = client.post(
+        url="/heroes/", json={"name": "Q", "secret_name": "Q"}
+    )
+
+    # Assert
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert bulk_response.status_code == 503
+    assert without_password.status_code == 201
+
+
+def test_create_heroes_bulk(client):
+    # Arrange
+    heroes_data = [
+        {"name": f"Bulk {i}", "secret_name": f"Secret {i}", "team_id": 1}
+        for i in range(50)
+    ]
+
+    # Act
+    response = client.post(url="/heroes/bulk", json=heroes_data)
+    results = response.json()
+
+    # Assert
+    assert response.status_code == 200
+    assert len(results) == 50
+    assert all(result["status"] == "created" for result in results)
+    assert [result["index"] for result in results] == list(range(50))
+    hero = client.get(f"/heroes/{results[0]['id']}").json()
+    assert hero["name"] == "Bulk 0"
+    assert hero["team"]["id"] == 1
+
+
+def test_upsert_heroes_bulk(client):
+    # Arrange
+    hero_data = [{"name": "Cyborg", "secret_name": "Vic Stone"}]
+
+    # Act
+    response = client.post(url="/heroes/bulk", json=hero_data, params={"upsert": True})
+    result = response.json()[0]
+
+    # Assert
+    assert response.status_code == 200
+    assert result["status"] == "updated"
+    hero = client.get(f"/heroes/{result['id']}").json()
+    assert hero["secret_name"] == "Vic Stone"
+    assert hero["age"] is not None
+
+
+def test_import_heroes_from_csv(client):
+    # Arrange
+    body = (
+        "name,secret_name,age,team_id\n"
+        "Imported 1,Secret 1,40,1\n"
+        "Imported 2,Secret 2,,\n"
+        "Imported 3,Secret 3,not-a-number,\n"
+        "Imported 4,Secret 4,20,999999\n"
+    )
+
+    # Act
+    response = client.post(
+        url="/heroes/import",
+        content=body,
+        params={"format": "csv", "chunk_size": 2},
+        headers={"Content-Type": "text/csv"},
+    )
+    report = response.json()
+
+    # Assert
+    assert response.status_code == 200
+    assert (report["rows_read"], report["created"], report["failed"]) == (4, 2, 2)
+    assert [error["line"] for error in report["errors"]] == [4, 5]
+    assert len(report["chunks"]) == 2
+
+
+def test_import_heroes_csv_without_header(client):
+    # Act
+    response = client.post(url="/heroes/import", content=b"", params={"format": "csv"})
+
+    # Assert
+    assert response.status_code == 400
+
+
 def test_list_heroes(client):
     # Arrange:
     offset = 0
@@ -40,6 +153,178 @@ def test_list_heroes(client):
     assert gotten_data == expected_data
 
 
+def test_list_heroes_with_cursor(client):
+    # Arrange:
+    first_page = client.get("/heroes/", params={"limit": 2, "order_by": "name"})
+    cursor = first_page.headers["X-Next-Cursor"]
+
+    # Act:
+    response = client.get(
+        "/heroes/", params={"limit": 2, "order_by": "name", "cursor": cursor}
+    )
+
+    # Assert
+    assert first_page.status_code == 200
+    assert response.status_code == 200
+    names = [hero["name"] for hero in first_page.json() + response.json()]
+    assert names == sorted(names)
+    assert len({hero["id"] for hero in first_page.json() + response.json()}) == 4
+
+
+def test_list_heroes_descending_with_cursor(client):
+    # Arrange:
+    query = {"limit": 2, "order_by": "-name"}
+    first_page = client.get("/heroes/", params=query)
+    cursor = first_page.headers["X-Next-Cursor"]
+
+    # Act:
+    response = client.get("/heroes/", params={**query, "cursor": cursor})
+
+    # Assert
+    assert response.status_code == 200
+    names = [hero["name"] for hero in first_page.json() + response.json()]
+    assert names == sorted(names, reverse=True)
+
+
+def test_list_heroes_with_filters(client):
+    # Arrange:
+    team_id = client.get("/heroes/", params={"name_prefix": "Cyborg"}).json()[0][
+        "team_id"
+    ]
+
+    # Act:
+    by_age = client.get("/heroes/", params={"min_age": 28, "max_age": 30})
+    by_team = client.get("/heroes/", params={"team_id": team_id, "fields": "name"})
+    by_prefix = client.get("/heroes/", params={"name_prefix": "Bat"})
+    empty_prefix = client.get("/heroes/", params={"name_prefix": ""})
+
+    # Assert
+    assert {hero["name"] for hero in by_age.json()} >= {"Flash", "Superman"}
+    assert all(28 <= hero["age"] <= 30 for hero in by_age.json())
+    assert {hero["name"] for hero in by_team.json()} == {"Cyborg", "Flash"}
+    assert all(hero["name"].startswith("Bat") for hero in by_prefix.json())
+    assert empty_prefix.status_code == 422
+
+
+def test_list_heroes_with_invalid_cursor(client):
+    # Act:
+    bad_cursor = client.get("/heroes/", params={"cursor": "garbage"})
+    with_offset = client.get("/heroes/", params={"cursor": "garbage", "offset": 1})
+
+    # Assert
+    assert bad_cursor.status_code == 400
+    assert with_offset.status_code == 400
+
+
+def test_list_heroes_query_count_does_not_grow_with_page(client, count_queries):
+    # Act:
+    with count_queries() as statements:
+        response = client.get("/heroes/", params={"offset": 0, "limit": 100})
+
+    # Assert
+    assert response.status_code == 200
+    assert len(response.json()) >= 4
+    assert len(statements) == 1
+
+
+def test_list_heroes_fast_serialization_is_byte_identical(client):
+    # Arrange
+    client.post(url="/heroes/", json={"name": "Żółw Ninja", "secret_name": "Zoë"})
+    client.post(url="/heroes/", json={"name": "Aquaman", "secret_name": "Arthur"})
+    query = {"order_by": "name", "limit": 3}
+    default = client.get("/heroes/", params=query)
+
+    # Act
+    app.dependency_overrides[get_settings] = lambda: Settings(fast_serialization=True)
+    fast = client.get("/heroes/", params=query)
+    next_page = client.get(
+        "/heroes/",
+        params={**query, "cursor": fast.headers["X-Next-Cursor"], "limit": 100},
+    )
+    del app.dependency_overrides[get_settings]
+    default_next_page = client.get(
+        "/heroes/",
+        params={**query, "cursor": default.headers["X-Next-Cursor"], "limit": 100},
+    )
+
+    # Assert
+    assert fast.status_code == 200
+    assert fast.content == default.content
+    assert fast.headers["X-Next-Cursor"] == default.headers["X-Next-Cursor"]
+    assert fast.headers["content-type"] == default.headers["content-type"]
+    assert next_page.content == default_next_page.content
+
+
+def test_list_heroes_with_fields_selects_only_those_columns(client, count_queries):
+    # Act
+    with count_queries() as statements:
+        response = client.get("/heroes/", params={"fields": "id,name", "limit": 5})
+
+    # Assert
+    assert response.status_code == 200
+    assert [list(hero) for hero in response.json()] == [["name", "id"]] * 5
+    assert len(statements) == 1
+    assert "secret_name" not in statements[0]
+    assert "hashed_password" not in statements[0]
+    assert "JOIN" not in statements[0]
+
+
+def test_list_heroes_with_fields_and_team_pages_by_cursor(client):
+    # Arrange
+    query = {"fields": "name,team", "order_by": "age", "limit": 2}
+    full = client.get("/heroes/", params={"order_by": "age", "limit": 4}).json()
+
+    # Act
+    first = client.get("/heroes/", params=query)
+    second = client.get(
+        "/heroes/", params={**query, "cursor": first.headers["X-Next-Cursor"]}
+    )
+
+    # Assert
+    assert first.json() + second.json() == [
+        {"name": hero["name"], "team": hero["team"]} for hero in full
+    ]
+
+
+def test_list_heroes_with_unknown_field(client):
+    # Act
+    response = client.get("/heroes/", params={"fields": "name,hashed_password"})
+
+    # Assert
+    assert response.status_code == 400
+    assert "hashed_password" in response.json()["detail"]
+
+
+def test_export_heroes_as_ndjson(client):
+    # Act:
+    response = client.get("/heroes/export")
+    lines = response.text.splitlines()
+
+    # Assert
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert json.loads(lines[0]) == {
+        "name": "Batman",
+        "secret_name": "Bruce Wayne",
+        "age": 35,
+        "team_id": 1,
+        "id": 1,
+    }
+    assert all("hashed_password" not in line for line in lines)
+
+
+def test_export_heroes_as_csv(client):
+    # Act:
+    response = client.get("/heroes/export", params={"format": "csv"})
+    rows = list(csv.reader(io.StringIO(response.text)))
+
+    # Assert
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert rows[0] == ["name", "secret_name", "age", "team_id", "id"]
+    assert rows[1] == ["Batman", "Bruce Wayne", "35", "1", "1"]
+
+
 def test_get_existing_hero_by_id(client):
     # Arrange:
     hero_id = 1
@@ -62,6 +347,147 @@ def test_get_unexisting_hero_by_id(client):
     assert response.status_code == 404
 
 
+def test_get_hero_by_id_is_served_from_cache(client, count_queries):
+    # Arrange
+    hero_id = client.post(
+        url="/heroes/", json={"name": "Raven", "secret_name": "Rachel Roth"}
+    ).json()["id"]
+    first = client.get(f"/heroes/{hero_id}")
+
+    # Act
+    with count_queries() as statements:
+        second = client.get(f"/heroes/{hero_id}")
+
+    # Assert
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert statements == []
+    assert client.get("/internal/cache").json()["hits"] >= 1
+
+
+def test_update_hero_invalidates_cached_hero_and_teams(client):
+    # Arrange
+    hero_data = {"name": "Starfire", "secret_name": "Koriand'r", "team_id": 1}
+    hero_id = client.post(url="/heroes/", json=hero_data).json()["id"]
+    client.get(f"/heroes/{hero_id}")
+    client.get("/teams/1")
+    client.get("/teams/2")
+
+    # Act
+    client.patch(url=f"/heroes/{hero_id}", json={"age": 22, "team_id": 2})
+    hero = client.get(f"/heroes/{hero_id}").json()
+    old_team = client.get("/teams/1").json()
+    new_team = client.get("/teams/2").json()
+
+    # Assert
+    assert hero["age"] == 22
+    assert hero["team"]["id"] == 2
+    assert hero_id not in [member["id"] for member in old_team["heroes"]]
+    assert hero_id in [member["id"] for member in new_team["heroes"]]
+
+
+def test_get_hero_with_current_etag_is_not_modified(client):
+    # Arrange
+    hero_data = {"name": "Cyclops", "secret_name": "Scott Summers"}
+    hero_id = client.post(url="/heroes/", json=hero_data).json()["id"]
+    etag = client.get(f"/heroes/{hero_id}").headers["ETag"]
+
+    # Act
+    response = client.get(f"/heroes/{hero_id}", headers={"If-None-Match": etag})
+
+    # Assert
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+
+async def test_not_modified_hero_is_answered_without_building_the_body(
+    client, monkeypatch
+):
+    # Arrange
+    hero_data = {"name": "Beast", "secret_name": "Hank McCoy", "team_id": 1}
+    hero_id = client.post(url="/heroes/", json=hero_data).json()["id"]
+    etag = client.get(f"/heroes/{hero_id}").headers["ETag"]
+    projection = {"fields": "name,team"}
+    fields_etag = client.get(f"/heroes/{hero_id}", params=projection).headers["ETag"]
+    await cache.clear()
+    built = []
+    monkeypatch.setattr(src.routers.heroes, "pack_entity", lambda *a: built.append(a))
+
+    # Act
+    response = client.get(f"/heroes/{hero_id}", headers={"If-None-Match": etag})
+    fields_response = client.get(
+        f"/heroes/{hero_id}", params=projection, headers={"If-None-Match": fields_etag}
+    )
+
+    # Assert
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert fields_response.status_code == 304
+    assert fields_response.headers["ETag"] == fields_etag
+    assert built == []
+
+
+def test_update_hero_changes_etag_and_honours_if_match(client):
+    # Arrange
+    hero_data = {"name": "Storm", "secret_name": "Ororo Munroe", "team_id": 1}
+    hero_id = client.post(url="/heroes/", json=hero_data).json()["id"]
+    etag = client.get(f"/heroes/{hero_id}").headers["ETag"]
+
+    # Act
+    updated = client.patch(
+        url=f"/heroes/{hero_id}", json={"age": 30}, headers={"If-Match": etag}
+    )
+    stale = client.patch(
+        url=f"/heroes/{hero_id}", json={"age": 31}, headers={"If-Match": etag}
+    )
+    refreshed = client.get(f"/heroes/{hero_id}", headers={"If-None-Match": etag})
+    delete_stale = client.delete(url=f"/heroes/{hero_id}", headers={"If-Match": etag})
+
+    # Assert
+    assert updated.status_code == 200
+    assert stale.status_code == 412
+    assert refreshed.status_code == 200
+    assert refreshed.headers["ETag"] != etag
+    assert refreshed.json()["age"] == 30
+    assert delete_stale.status_code == 412
+
+
+def test_hero_etag_changes_when_its_team_changes(client):
+    # Arrange
+    hero_data = {"name": "Rogue", "secret_name": "Anna Marie", "team_id": 2}
+    hero_id = client.post(url="/heroes/", json=hero_data).json()["id"]
+    etag = client.get(f"/heroes/{hero_id}").headers["ETag"]
+
+    # Act
+    client.patch(url="/teams/2", json={"headquarters": "Westchester"})
+    response = client.get(f"/heroes/{hero_id}", headers={"If-None-Match": etag})
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json()["team"]["headquarters"] == "Westchester"
+
+
+def test_get_hero_with_fields(client):
+    # Arrange
+    hero_data = {"name": "Nightwing", "secret_name": "Dick Grayson", "team_id": 1}
+    hero_id = client.post(url="/heroes/", json=hero_data).json()["id"]
+
+    # Act
+    response = client.get(f"/heroes/{hero_id}", params={"fields": "name,team"})
+    not_modified = client.get(
+        f"/heroes/{hero_id}",
+        params={"fields": "team,name"},
+        headers={"If-None-Match": response.headers["ETag"]},
+    )
+    full = client.get(f"/heroes/{hero_id}")
+
+    # Assert
+    assert response.json() == {"name": "Nightwing", "team": full.json()["team"]}
+    assert response.headers["ETag"] != full.headers["ETag"]
+    assert not_modified.status_code == 304
+
+
 def test_update_existing_hero(client):
     # Arrange
     hero_id = 1
@@ -87,6 +513,16 @@ def test_update_unexisting_hero(client):
     assert response.status_code == 404
 
 
+def test_update_hero_with_unknown_team(client):
+    # Act
+    response = client.patch(url="/heroes/1", json={"team_id": 999})
+
+    # Assert
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Team with id 999 not found"
+    assert client.get("/heroes/1").json()["team_id"] != 999
+
+
 def test_delete_existing_hero(client):
     # Arrange
     hero_id = 1
@@ -0,0 +1,38 @@
+def test_search_heroes_and_teams(client):
+    # Act:
+    response = client.get("/search/", params={"q": "justice"})
+    heroes = client.get("/search/", params={"q": "bruce", "kind": "hero"})
+
+    # Assert
+    assert response.status_code == 200
+    assert {"kind": "team", "name": "Justice League"} in [
+        {"kind": result["kind"], "name": result["name"]} for result in response.json()
+    ]
+    assert heroes.json()
+    assert all(result["kind"] == "hero" for result in heroes.json())
+
+
+def test_search_is_paginated(client):
+    # Arrange:
+    everything = client.get("/search/", params={"q": "a", "limit": 100}).json()
+
+    # Act:
+    pages = [
+        client.get("/search/", params={"q": "a", "offset": offset, "limit": 2}).json()
+        for offset in range(0, len(everything), 2)
+    ]
+
+    # Assert
+    assert [result for page in pages for result in page] == everything
+
+
+def test_search_with_operators_or_blank_query(client):
+    # Act:
+    operators = client.get("/search/", params={"q": 'NEAR( "bat'})
+    blank = client.get("/search/", params={"q": "  "})
+    missing = client.get("/search/")
+
+    # Assert
+    assert operators.status_code == 200
+    assert blank.status_code == 400
+    assert missing.status_code == 422
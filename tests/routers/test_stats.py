@@ -0,0 +1,35 @@
+def test_get_stats(client):
+    # Act:
+    response = client.get("/stats/", params={"bucket_size": 5, "limit": 1})
+
+    # Assert
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["hero_count"] >= 4
+    assert len(stats["teams"]) == 1
+    assert all(
+        bucket["max_age"] - bucket["min_age"] == 4 for bucket in stats["age_histogram"]
+    )
+
+
+def test_get_team_stats(client):
+    # Arrange:
+    team = client.get("/teams/", params={"name_prefix": "Humanity"}).json()[-1]
+
+    # Act:
+    response = client.get(f"/teams/{team['id']}/stats")
+
+    # Assert
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["hero_count"] == len(team["heroes"])
+    ages = [hero["age"] for hero in team["heroes"] if hero["age"] is not None]
+    assert stats["average_age"] == sum(ages) / len(ages)
+
+
+def test_get_stats_of_unexisting_team(client):
+    # Act:
+    response = client.get("/teams/999999/stats")
+
+    # Assert
+    assert response.status_code == 404
@@ -1,3 +1,11 @@
+import json
+
+import src.routers.teams
+from src.cache import cache
+from src.main import app
+from src.settings import Settings, get_settings
+
+
 def test_create_team(client):
     # Arrange
     team_data = {"name": "Avengers", "headquarters": "Earth"}
@@ -13,6 +21,32 @@ def test_create_team(client):
     assert data["id"] is not None
 
 
+def test_create_teams_bulk(client):
+    # Arrange
+    teams_data = [{"name": "Bulk Team A"}, {"name": "Bulk Team B", "headquarters": "Z"}]
+
+    # Act
+    response = client.post(url="/teams/bulk", json=teams_data)
+
+    # Assert
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json()] == ["created", "created"]
+
+
+def test_import_teams_from_ndjson(client):
+    # Arrange
+    body = b'{"name": "Imported Team", "headquarters": "Here"}\n{"headquarters": "X"}\n'
+
+    # Act
+    response = client.post(url="/teams/import", content=body)
+    report = response.json()
+
+    # Assert
+    assert response.status_code == 200
+    assert (report["created"], report["failed"]) == (1, 1)
+    assert report["errors"] == [{"line": 2, "errors": ["name: Field required"]}]
+
+
 def test_list_teams(client):
     # Arrange:
     offset = 0
@@ -25,6 +59,111 @@ def test_list_teams(client):
     assert response.status_code == 200
 
 
+def test_list_teams_with_cursor(client):
+    # Arrange:
+    first_page = client.get("/teams/", params={"limit": 1})
+    cursor = first_page.headers["X-Next-Cursor"]
+
+    # Act:
+    response = client.get("/teams/", params={"limit": 1, "cursor": cursor})
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json()[0]["id"] > first_page.json()[0]["id"]
+
+
+def test_list_teams_with_filters(client):
+    # Act:
+    by_headquarters = client.get("/teams/", params={"headquarters": "Earth"})
+    by_prefix = client.get(
+        "/teams/", params={"name_prefix": "Justice", "fields": "name"}
+    )
+
+    # Assert
+    assert by_headquarters.status_code == 200
+    assert "Humanity" in {team["name"] for team in by_headquarters.json()}
+    assert all(team["headquarters"] == "Earth" for team in by_headquarters.json())
+    assert all(team["name"].startswith("Justice") for team in by_prefix.json())
+    assert by_prefix.json()
+
+
+def test_list_teams_query_count_does_not_grow_with_page(client, count_queries):
+    # Act:
+    with count_queries() as statements:
+        response = client.get("/teams/", params={"offset": 0, "limit": 100})
+
+    # Assert
+    assert response.status_code == 200
+    assert len(response.json()) >= 2
+    assert len(statements) <= 2
+
+
+def test_list_teams_fast_serialization_is_byte_identical(client):
+    # Arrange
+    team_id = client.post(
+        url="/teams/", json={"name": "Équipe Été", "headquarters": None}
+    ).json()["id"]
+    client.post(
+        url="/heroes/",
+        json={"name": "Ünïcode", "secret_name": "Ω", "team_id": team_id},
+    )
+    default = client.get("/teams/", params={"limit": 100})
+
+    # Act
+    app.dependency_overrides[get_settings] = lambda: Settings(fast_serialization=True)
+    fast = client.get("/teams/", params={"limit": 100})
+    del app.dependency_overrides[get_settings]
+
+    # Assert
+    assert fast.status_code == 200
+    assert fast.content == default.content
+    assert fast.headers.get("X-Next-Cursor") == default.headers.get("X-Next-Cursor")
+
+
+def test_list_teams_with_fields_skips_heroes(client, count_queries):
+    # Act
+    with count_queries() as statements:
+        response = client.get("/teams/", params={"fields": "name", "limit": 3})
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json() == [{"name": team["name"]} for team in response.json()]
+    assert len(response.json()) == 3
+    assert len(statements) == 1
+    assert "headquarters" not in statements[0]
+
+
+def test_list_teams_with_fields_and_heroes(client):
+    # Arrange
+    full = client.get("/teams/", params={"limit": 3}).json()
+
+    # Act
+    response = client.get("/teams/", params={"fields": "id,heroes", "limit": 3})
+
+    # Assert
+    assert response.json() == [
+        {"id": team["id"], "heroes": team["heroes"]} for team in full
+    ]
+
+
+def test_export_teams(client):
+    # Act:
+    ndjson = client.get("/teams/export")
+    csv_export = client.get("/teams/export", params={"format": "csv"})
+
+    # Assert
+    assert ndjson.status_code == 200
+    assert json.loads(ndjson.text.splitlines()[0]) == {
+        "name": "Justice League",
+        "headquarters": "Gotham",
+        "id": 1,
+    }
+    assert csv_export.text.splitlines()[:2] == [
+        "name,headquarters,id",
+        "Justice League,Gotham,1",
+    ]
+
+
 def test_get_existing_team_by_id(client):
     # Arrange:
     team_id = 1
@@ -47,6 +186,114 @@ def test_get_unexisting_team_by_id(client):
     assert response.status_code == 404
 
 
+def test_update_team_invalidates_cached_team_and_heroes(client):
+    # Arrange
+    team_id = client.post(
+        url="/teams/", json={"name": "Titans", "headquarters": "Jump City"}
+    ).json()["id"]
+    hero_data = {
+        "name": "Beast Boy",
+        "secret_name": "Garfield Logan",
+        "team_id": team_id,
+    }
+    hero_id = client.post(url="/heroes/", json=hero_data).json()["id"]
+    client.get(f"/teams/{team_id}")
+    client.get(f"/heroes/{hero_id}")
+
+    # Act
+    client.patch(url=f"/teams/{team_id}", json={"headquarters": "Titans Tower"})
+    team = client.get(f"/teams/{team_id}").json()
+    hero = client.get(f"/heroes/{hero_id}").json()
+
+    # Assert
+    assert team["headquarters"] == "Titans Tower"
+    assert hero["team"]["headquarters"] == "Titans Tower"
+
+
+async def test_not_modified_team_is_answered_without_building_the_body(
+    client, monkeypatch
+):
+    # Arrange
+    team_data = {"name": "Fantastic Four", "headquarters": "Baxter Building"}
+    team_id = client.post(url="/teams/", json=team_data).json()["id"]
+    hero_data = {"name": "Thing", "secret_name": "Ben Grimm", "team_id": team_id}
+    client.post(url="/heroes/", json=hero_data)
+    etag = client.get(f"/teams/{team_id}").headers["ETag"]
+    projection = {"fields": "name,heroes"}
+    fields_etag = client.get(f"/teams/{team_id}", params=projection).headers["ETag"]
+    await cache.clear()
+    built = []
+    monkeypatch.setattr(src.routers.teams, "pack_entity", lambda *a: built.append(a))
+
+    # Act
+    response = client.get(f"/teams/{team_id}", headers={"If-None-Match": etag})
+    fields_response = client.get(
+        f"/teams/{team_id}", params=projection, headers={"If-None-Match": fields_etag}
+    )
+
+    # Assert
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert fields_response.status_code == 304
+    assert fields_response.headers["ETag"] == fields_etag
+    assert built == []
+
+
+def test_team_etag_changes_when_a_member_changes(client):
+    # Arrange
+    team_data = {"name": "X-Men", "headquarters": "Westchester"}
+    team_id = client.post(url="/teams/", json=team_data).json()["id"]
+    hero_data = {"name": "Wolverine", "secret_name": "Logan", "team_id": team_id}
+    hero_id = client.post(url="/heroes/", json=hero_data).json()["id"]
+    etag = client.get(f"/teams/{team_id}").headers["ETag"]
+    not_modified = client.get(f"/teams/{team_id}", headers={"If-None-Match": etag})
+
+    # Act
+    client.patch(url=f"/heroes/{hero_id}", json={"age": 150})
+    response = client.get(f"/teams/{team_id}", headers={"If-None-Match": etag})
+
+    # Assert
+    assert not_modified.status_code == 304
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["heroes"][0]["age"] == 150
+
+
+def test_delete_team_with_stale_if_match_is_rejected(client):
+    # Arrange
+    team_data = {"name": "Outsiders", "headquarters": "Markovia"}
+    team_id = client.post(url="/teams/", json=team_data).json()["id"]
+    etag = client.get(f"/teams/{team_id}").headers["ETag"]
+    client.patch(url=f"/teams/{team_id}", json={"headquarters": "Gotham"})
+
+    # Act
+    stale = client.delete(url=f"/teams/{team_id}", headers={"If-Match": etag})
+    current = client.delete(
+        url=f"/teams/{team_id}",
+        headers={"If-Match": client.get(f"/teams/{team_id}").headers["ETag"]},
+    )
+
+    # Assert
+    assert stale.status_code == 412
+    assert current.status_code == 204
+
+
+def test_get_team_with_fields_is_invalidated_by_team_update(client):
+    # Arrange
+    team_data = {"name": "Doom Patrol", "headquarters": "Doom Manor"}
+    team_id = client.post(url="/teams/", json=team_data).json()["id"]
+    before = client.get(f"/teams/{team_id}", params={"fields": "headquarters"})
+
+    # Act
+    client.patch(url=f"/teams/{team_id}", json={"headquarters": "Danny"})
+    after = client.get(f"/teams/{team_id}", params={"fields": "headquarters"})
+
+    # Assert
+    assert before.json() == {"headquarters": "Doom Manor"}
+    assert after.json() == {"headquarters": "Danny"}
+    assert after.headers["ETag"] != before.headers["ETag"]
+
+
 def test_update_existing_team(client):
     # Arrange
     team_id = 1
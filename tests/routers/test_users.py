@@ -0,0 +1,92 @@
+from uuid import uuid4
+
+import pytest
+from sqlmodel import select
+
+import src.security.basic
+from src.crud.user import create_user
+from src.main import app
+from src.models.user import User, UserCreate
+from src.security.basic import credential_cache, get_current_username
+from src.security.passwords import PasswordHasher
+
+
+@pytest.fixture
+async def authenticated_client(client, session):
+    """The test client with authentication enforced, and a user to log in as."""
+    user = await create_user(
+        UserCreate(username=f"user-{uuid4().hex}", password="s3cret"),
+        session,
+    )
+    await session.commit()
+    app.dependency_overrides.pop(get_current_username)
+    credential_cache.clear()
+    yield client, user.username
+    credential_cache.clear()
+
+
+def test_requests_without_valid_credentials_are_rejected(authenticated_client):
+    # Arrange
+    client, username = authenticated_client
+
+    # Act
+    anonymous = client.get("/heroes/")
+    wrong_password = client.get("/heroes/", auth=(username, "wrong"))
+    unknown_user = client.get("/heroes/", auth=("nobody", "s3cret"))
+
+    # Assert
+    assert anonymous.status_code == 401
+    assert wrong_password.status_code == 401
+    assert wrong_password.headers["WWW-Authenticate"] == "Basic"
+    assert unknown_user.status_code == 401
+
+
+def test_repeated_requests_skip_the_kdf(authenticated_client, monkeypatch):
+    # Arrange
+    client, username = authenticated_client
+    verifications = []
+    verify = src.security.basic.hasher.verify
+
+    async def counting_verify(password, hashed):
+        verifications.append(hashed)
+        return await verify(password, hashed)
+
+    monkeypatch.setattr(src.security.basic.hasher, "verify", counting_verify)
+
+    # Act
+    responses = [client.get("/users/me", auth=(username, "s3cret")) for _ in range(3)]
+    stats = client.get("/stats/", auth=(username, "s3cret"))
+
+    # Assert
+    assert [response.json() for response in responses] == [username] * 3
+    assert stats.status_code == 200
+    assert len(verifications) == 1
+
+
+def test_login_when_password_hashing_is_saturated(authenticated_client, monkeypatch):
+    # Arrange
+    client, username = authenticated_client
+    monkeypatch.setattr(src.security.basic, "hasher", PasswordHasher(max_pending=0))
+
+    # Act
+    response = client.get("/users/me", auth=(username, "s3cret"))
+
+    # Assert
+    assert response.status_code == 503
+
+
+async def test_user_with_an_unreadable_password_hash_is_rejected(
+    authenticated_client, session
+):
+    # Arrange
+    client, username = authenticated_client
+    user = (await session.exec(select(User).where(User.username == username))).one()
+    user.hashed_password = "md5$not-a-supported-hash"
+    session.add(user)
+    await session.commit()
+
+    # Act
+    response = client.get("/users/me", auth=(username, "s3cret"))
+
+    # Assert
+    assert response.status_code == 401
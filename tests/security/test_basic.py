@@ -0,0 +1,65 @@
+from src.security.basic import CredentialCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_credential_cache_remembers_verified_credentials_until_they_expire():
+    # Arrange
+    clock = FakeClock()
+    cache = CredentialCache(ttl_seconds=10, clock=clock)
+    cache.add("saber", "password")
+
+    # Act
+    fresh = cache.verified("saber", "password")
+    wrong_password = cache.verified("saber", "Password")
+    clock.now = 10
+    expired = cache.verified("saber", "password")
+
+    # Assert
+    assert fresh is True
+    assert wrong_password is False
+    assert expired is False
+
+
+def test_credential_cache_does_not_confuse_username_and_password_bytes():
+    # Arrange
+    cache = CredentialCache()
+    cache.add("ab", "c")
+
+    # Act & Assert
+    assert not cache.verified("a", "bc")
+
+
+def test_credential_cache_keeps_no_plaintext():
+    # Arrange
+    cache = CredentialCache()
+
+    # Act
+    cache.add("saber", "hunter2")
+
+    # Assert
+    stored = repr(cache._entries)
+    assert "hunter2" not in stored
+    assert all(len(digest) == 32 for digest in cache._entries)
+
+
+def test_credential_cache_evicts_least_recently_used():
+    # Arrange
+    cache = CredentialCache(max_entries=2)
+    cache.add("first", "1")
+    cache.add("second", "2")
+    cache.verified("first", "1")
+
+    # Act
+    cache.add("third", "3")
+
+    # Assert
+    assert cache.verified("first", "1")
+    assert not cache.verified("second", "2")
+    assert cache.verified("third", "3")
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.security.passwords import (
+    HasherBusyError,
+    InvalidPasswordHashError,
+    PasswordHasher,
+    hash_password,
+    verify_password,
+)
+
+# Cheap cost parameters: these tests check behaviour, not strength.
+FAST_COST = {"n": 2**4, "r": 8, "p": 1}
+
+
+def test_hash_password_is_salted_and_verifies():
+    # Act
+    first = hash_password("correct horse", **FAST_COST)
+    second = hash_password("correct horse", **FAST_COST)
+
+    # Assert
+    assert first != second
+    assert first.startswith("scrypt$16$8$1$")
+    assert verify_password("correct horse", first)
+    assert not verify_password("battery staple", first)
+
+
+def test_hash_made_with_another_cost_still_verifies():
+    # Arrange
+    hashed = hash_password("secret", n=2**5, r=4, p=2)
+
+    # Act & Assert
+    assert verify_password("secret", hashed)
+
+
+@pytest.mark.parametrize("hashed", ["hashed_secret", "bcrypt$1$2$3$4$5", "scrypt$x"])
+def test_verify_password_rejects_unknown_hashes(hashed):
+    # Act & Assert
+    with pytest.raises(InvalidPasswordHashError):
+        verify_password("secret", hashed)
+
+
+async def test_hasher_hashes_off_the_event_loop():
+    # Arrange
+    hasher = PasswordHasher(workers=2, max_pending=4, **FAST_COST)
+
+    # Act
+    hashed = await hasher.hash("secret")
+    many = await hasher.hash_many(["a", None, "b"])
+
+    # Assert
+    assert await hasher.verify("secret", hashed)
+    assert many[1] is None
+    assert await hasher.verify("b", many[2])
+    assert hasher.stats().pending == 0
+
+
+async def test_saturated_hasher_rejects_until_a_slot_frees():
+    # Arrange
+    hasher = PasswordHasher(workers=1, max_pending=2, **FAST_COST)
+    release = threading.Event()
+    blocked = [asyncio.ensure_future(hasher._run(release.wait)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    # Act
+    with pytest.raises(HasherBusyError):
+        await hasher.hash("secret")
+    release.set()
+    await asyncio.gather(*blocked)
+    hashed = await hasher.hash("secret")
+
+    # Assert
+    assert verify_password("secret", hashed)
+    assert hasher.stats().rejected == 1
+    assert hasher.stats().pending == 0
+
+
+async def test_cancelled_hash_keeps_its_slot_until_the_thread_finishes():
+    # Arrange
+    hasher = PasswordHasher(workers=1, max_pending=1, **FAST_COST)
+    release = threading.Event()
+    waiting = asyncio.ensure_future(hasher._run(release.wait))
+    await asyncio.sleep(0)
+
+    # Act
+    waiting.cancel()
+    with pytest.raises(HasherBusyError):
+        await hasher.hash("secret")
+    release.set()
+    while hasher.stats().pending:
+        await asyncio.sleep(0.001)
+
+    # Assert
+    assert verify_password("secret", await hasher.hash("secret"))
@@ -0,0 +1,169 @@
+import pytest
+
+from src.cache import MemoryCache, SQLiteCache, create_cache
+from src.settings import Settings
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_cache(request, tmp_path):
+    """Build a cache of each backend; SQLite caches share one file."""
+
+    def factory(**kwargs):
+        if request.param == "sqlite":
+            return SQLiteCache(path=str(tmp_path / "cache.db"), **kwargs)
+        return MemoryCache(**kwargs)
+
+    return factory
+
+
+async def test_least_recently_used_entry_is_evicted():
+    # Arrange
+    cache = MemoryCache(max_entries=2)
+    await cache.set("a", b"1")
+    await cache.set("b", b"2")
+    await cache.get("a")
+
+    # Act
+    await cache.set("c", b"3")
+
+    # Assert
+    assert await cache.get("a") == b"1"
+    assert await cache.get("b") is None
+    assert await cache.get("c") == b"3"
+    assert (await cache.stats()).evictions == 1
+
+
+async def test_oldest_entry_is_evicted_from_shared_cache(tmp_path):
+    # Arrange
+    clock = FakeClock()
+    cache = SQLiteCache(path=str(tmp_path / "cache.db"), max_entries=2, clock=clock)
+    await cache.set("a", b"1")
+    clock.now = 1
+    await cache.set("b", b"2")
+
+    # Act
+    clock.now = 2
+    await cache.set("c", b"3")
+
+    # Assert
+    assert await cache.get("a") is None
+    assert await cache.get("b") == b"2"
+    assert await cache.get("c") == b"3"
+    assert (await cache.stats()).evictions == 1
+
+
+async def test_entry_expires_after_ttl(make_cache):
+    # Arrange
+    clock = FakeClock()
+    cache = make_cache(ttl_seconds=10, clock=clock)
+    await cache.set("a", b"1")
+
+    # Act
+    clock.now = 9.9
+    fresh = await cache.get("a")
+    clock.now = 10.0
+    expired = await cache.get("a")
+
+    # Assert
+    assert fresh == b"1"
+    assert expired is None
+    assert (await cache.stats()).expirations == 1
+
+
+async def test_invalidating_a_tag_drops_every_entry_carrying_it(make_cache):
+    # Arrange
+    cache = make_cache()
+    await cache.set("hero:1", b"{}", tags=["hero:1", "team:1"])
+    await cache.set("team:1", b"{}", tags=["team:1", "members:1", "hero:1"])
+    await cache.set("team:2", b"{}", tags=["team:2", "members:2"])
+
+    # Act
+    await cache.invalidate_tags(["hero:1"])
+
+    # Assert
+    assert await cache.get("hero:1") is None
+    assert await cache.get("team:1") is None
+    assert await cache.get("team:2") == b"{}"
+    assert (await cache.stats()).entries == 1
+    assert (await cache.stats()).invalidations == 2
+
+
+async def test_read_through_does_not_store_a_read_raced_by_an_invalidation(
+    make_cache,
+):
+    # Arrange
+    cache = make_cache()
+
+    async def load():
+        # A write commits while this read is in flight.
+        await cache.invalidate_tags(["hero:1"])
+        return b"stale", ["hero:1"]
+
+    # Act
+    value = await cache.read_through("hero:1", load)
+
+    # Assert
+    assert value == b"stale"
+    assert await cache.get("hero:1") is None
+
+
+async def test_shared_cache_invalidation_reaches_other_workers(tmp_path):
+    # Arrange
+    path = str(tmp_path / "cache.db")
+    worker_a, worker_b = SQLiteCache(path=path), SQLiteCache(path=path)
+    await worker_a.set("hero:1", b"{}", tags=["hero:1"])
+    generation = await worker_a.generation()
+
+    # Act
+    shared_hit = await worker_b.get("hero:1")
+    await worker_b.invalidate_tags(["hero:1"])
+
+    # Assert
+    assert shared_hit == b"{}"
+    assert await worker_a.get("hero:1") is None
+    assert await worker_a.generation() == generation + 1
+
+
+async def test_shared_cache_evicts_entries_written_by_other_workers(tmp_path):
+    # Arrange
+    clock = FakeClock()
+    path = str(tmp_path / "cache.db")
+    worker_a = SQLiteCache(path=path, max_entries=2, clock=clock)
+    worker_b = SQLiteCache(path=path, max_entries=2, clock=clock)
+    await worker_a.set("a", b"1")
+    clock.now = 1
+    await worker_a.set("b", b"2")
+    await worker_a.set("b", b"2")
+
+    # Act
+    clock.now = 2
+    await worker_b.set("c", b"3")
+
+    # Assert
+    assert await worker_b.get("a") is None
+    assert (await worker_b.stats()).evictions == 1
+    assert (await worker_a.stats()).entries == 2
+
+
+async def test_cache_backend_is_chosen_from_settings(tmp_path):
+    # Arrange
+    path = tmp_path / "cache.db"
+
+    # Act
+    memory = create_cache(Settings(cache_backend="memory"))
+    shared = create_cache(Settings(cache_backend="sqlite", cache_path=str(path)))
+    created_before_use = path.exists()
+
+    # Assert
+    assert isinstance(memory, MemoryCache)
+    assert isinstance(shared, SQLiteCache)
+    assert not created_before_use
+    assert (await shared.stats()).backend == "sqlite"
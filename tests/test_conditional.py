@@ -0,0 +1,57 @@
+import pytest
+
+from src.conditional import (
+    PreconditionFailedError,
+    check_if_match,
+    if_none_match,
+    make_etag,
+    pack_entity,
+    unpack_entity,
+)
+
+
+def test_etag_depends_on_every_part():
+    # Act
+    etag = make_etag("hero", 1, 1)
+
+    # Assert
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag("hero", 1, 1)
+    assert etag != make_etag("hero", 1, 2)
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, False),
+        ('"a"', True),
+        ('"b", "a"', True),
+        ('W/"a"', True),
+        ("*", True),
+        ('"b"', False),
+    ],
+)
+def test_if_none_match_uses_weak_comparison(header, expected):
+    # Act
+    not_modified = if_none_match(header, '"a"')
+
+    # Assert
+    assert not_modified is expected
+
+
+def test_if_match_uses_strong_comparison():
+    # Act / Assert
+    check_if_match(None, '"a"')
+    check_if_match('"b", "a"', '"a"')
+    check_if_match("*", '"a"')
+    with pytest.raises(PreconditionFailedError):
+        check_if_match('W/"a"', '"a"')
+
+
+def test_entity_round_trips_through_cache_value():
+    # Act
+    etag, body = unpack_entity(pack_entity('"a"', b'{"name":"x\\ny"}'))
+
+    # Assert
+    assert etag == '"a"'
+    assert body == b'{"name":"x\\ny"}'
@@ -0,0 +1,181 @@
+import asyncio
+import time
+
+from sqlalchemy import event, insert
+from sqlmodel import func, select, text
+
+from src.database import (
+    SCHEMA_VERSION,
+    SQLITE_PROFILES,
+    Database,
+    SQLiteProfile,
+    ensure_schema,
+    get_database_url,
+    get_engine,
+)
+from src.models.hero import Hero
+from src.models.user import User
+from src.security.passwords import hasher
+from src.settings import Settings
+
+
+def test_profile_renders_only_configured_pragmas():
+    # Arrange
+    profile = SQLiteProfile(journal_mode="WAL", busy_timeout=100, foreign_keys=True)
+
+    # Act
+    pragmas = profile.pragmas()
+
+    # Assert
+    assert pragmas == [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA busy_timeout=100",
+        "PRAGMA foreign_keys=ON",
+    ]
+
+
+async def test_production_profile_applies_to_every_pooled_connection(tmp_path):
+    # Arrange
+    engine = get_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'profile.db'}",
+        profile=SQLITE_PROFILES["production"],
+    )
+
+    async def read_pragmas():
+        async with engine.connect() as connection:
+            values = {}
+            for name in ("journal_mode", "synchronous", "foreign_keys", "busy_timeout"):
+                values[name] = (
+                    await connection.execute(text(f"PRAGMA {name}"))
+                ).scalar()
+            await asyncio.sleep(0.01)  # keep both connections checked out
+            return values
+
+    # Act
+    results = await asyncio.gather(read_pragmas(), read_pragmas())
+    await engine.dispose()
+
+    # Assert
+    for values in results:
+        assert values == {
+            "journal_mode": "wal",
+            "synchronous": 1,  # NORMAL
+            "foreign_keys": 1,
+            "busy_timeout": 5000,
+        }
+
+
+def test_database_url_leaves_an_existing_file_alone(tmp_path):
+    # Arrange
+    path = tmp_path / "crud.db"
+    path.write_bytes(b"data")
+
+    # Act
+    url = get_database_url(name=str(tmp_path / "crud"))
+
+    # Assert
+    assert url == f"sqlite+aiosqlite:///{path}"
+    assert path.read_bytes() == b"data"
+
+
+def test_database_creates_no_engine_until_used(tmp_path):
+    # Act
+    database = Database(Settings(database_name=str(tmp_path / "crud")))
+
+    # Assert
+    assert not (tmp_path / "crud.db").exists()
+    assert database.read_session_factory is None
+
+
+async def test_schema_is_created_once_and_versioned(tmp_path):
+    # Arrange
+    engine = get_engine(f"sqlite+aiosqlite:///{tmp_path / 'schema.db'}")
+
+    # Act
+    created = await asyncio.gather(ensure_schema(engine), ensure_schema(engine))
+    async with engine.connect() as connection:
+        version = (await connection.execute(text("PRAGMA user_version"))).scalar()
+    await engine.dispose()
+
+    # Assert
+    assert sorted(created) == [False, True]
+    assert version == SCHEMA_VERSION
+
+
+async def test_sample_data_is_seeded_only_when_enabled_and_once(tmp_path):
+    # Arrange
+    settings = Settings(database_name=str(tmp_path / "crud"), seed_sample_data=True)
+
+    # Act
+    for _ in range(2):
+        database = Database(settings)
+        await database.start()
+        async with database.session_factory() as session:
+            users = (await session.exec(select(func.count(User.username)))).one()
+            heroes = (await session.exec(select(func.count(Hero.id)))).one()
+        await database.dispose()
+
+    # Assert
+    assert (users, heroes) == (1, 4)
+
+
+async def test_bootstrap_user_is_created_once_and_never_updated(tmp_path):
+    # Arrange
+    name = str(tmp_path / "crud")
+
+    # Act
+    for password in ("first", "second"):
+        database = Database(
+            Settings(
+                database_name=name,
+                bootstrap_username="admin",
+                bootstrap_password=password,
+            )
+        )
+        await database.start()
+        async with database.session_factory() as session:
+            users = (await session.exec(select(User))).all()
+        await database.dispose()
+
+    # Assert
+    assert [user.username for user in users] == ["admin"]
+    assert await hasher.verify("first", users[0].hashed_password)
+
+
+async def test_restart_on_a_large_database_keeps_data_and_skips_schema_checks(
+    tmp_path,
+):
+    # Arrange
+    settings = Settings(database_name=str(tmp_path / "crud"))
+    database = Database(settings)
+    await database.start()
+    async with database.engine.begin() as connection:
+        await connection.execute(
+            insert(Hero),
+            [
+                {"name": f"Hero {i}", "secret_name": f"Secret {i}", "age": i % 60}
+                for i in range(20_000)
+            ],
+        )
+    await database.dispose()
+    restarted = Database(settings)
+    statements = []
+    event.listen(
+        restarted.engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    # Act
+    started = time.perf_counter()
+    await restarted.start()
+    elapsed = time.perf_counter() - started
+    async with restarted.session_factory() as session:
+        heroes = (await session.exec(select(func.count(Hero.id)))).one()
+    await restarted.dispose()
+
+    # Assert
+    assert statements[0] == "PRAGMA user_version"
+    assert len(statements) == 2  # the version check, then the count
+    assert heroes == 20_000
+    assert elapsed < 0.2
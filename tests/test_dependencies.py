@@ -0,0 +1,119 @@
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.crud.hero import create_hero, update_hero
+from src.crud.team import create_team
+from src.dependencies import PRIMARY_COOKIE, get_read_session_factory, get_session
+from src.main import app
+from src.models.hero import Hero, HeroCreate, HeroUpdate
+from src.models.team import TeamCreate
+
+request_session = asynccontextmanager(get_session)
+
+
+@pytest.fixture
+def factory(engine):
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.fixture
+def commits(engine):
+    """Count the transactions the test engine commits."""
+    committed = []
+
+    def on_commit(connection):
+        committed.append(connection)
+
+    event.listen(engine.sync_engine, "commit", on_commit)
+    yield committed
+    event.remove(engine.sync_engine, "commit", on_commit)
+
+
+async def test_composite_request_commits_once(factory, commits, count_queries):
+    # Act
+    with count_queries() as statements:
+        async with request_session(factory) as session:
+            team = await create_team(TeamCreate(name="Unit of Work"), session)
+            hero = await create_hero(
+                HeroCreate(name="Flushed", secret_name="F", team_id=team.id), session
+            )
+            hero = await update_hero(hero.id, HeroUpdate(age=40), session)
+
+    # Assert
+    assert len(commits) == 1
+    assert team.id is not None
+    assert (hero.team_id, hero.age, hero.version) == (team.id, 40, 2)
+    # Generated values come back through RETURNING, not a SELECT per write.
+    inserts = [s for s in statements if s.startswith("INSERT")]
+    assert len(inserts) == 2
+    assert all("RETURNING" in statement for statement in inserts)
+
+
+async def test_failed_request_rolls_back_every_write(factory, commits):
+    # Act
+    with pytest.raises(RuntimeError):
+        async with request_session(factory) as session:
+            await create_hero(HeroCreate(name="Rolled Back", secret_name="R"), session)
+            raise RuntimeError("endpoint failed")
+
+    # Assert
+    assert commits == []
+    async with factory() as session:
+        heroes = await session.exec(select(Hero).where(Hero.name == "Rolled Back"))
+        assert heroes.all() == []
+
+
+@pytest.fixture
+async def replica(client, engine):
+    """Send the client's reads to a read-only connection to the test database."""
+    replica_engine = create_async_engine(
+        f"sqlite+aiosqlite:///file:{engine.url.database}?mode=ro&uri=true",
+        poolclass=NullPool,
+    )
+    factory = async_sessionmaker(
+        replica_engine, class_=AsyncSession, expire_on_commit=False
+    )
+    opened = []
+
+    def open_replica_session():
+        opened.append(True)
+        return factory()
+
+    app.dependency_overrides[get_read_session_factory] = lambda: open_replica_session
+    yield opened
+    await replica_engine.dispose()
+
+
+def test_reads_follow_the_client_to_the_primary_after_a_write(client, replica):
+    # Act
+    listed = client.get("/heroes/")
+    created = client.post("/heroes/", json={"name": "Sticky", "secret_name": "S"})
+    reads_before_write = len(replica)
+    read_back = client.get(f"/heroes/{created.json()['id']}")
+
+    # Assert
+    assert listed.status_code == 200
+    assert reads_before_write == 1
+    assert PRIMARY_COOKIE in created.cookies
+    assert read_back.json()["name"] == "Sticky"
+    assert len(replica) == 1
+
+
+# An expired write timestamp, and a value that is not one.
+@pytest.mark.parametrize("cookie", ["1.0", "garbage"])
+def test_reads_return_to_the_replica_once_the_window_is_over(client, replica, cookie):
+    # Arrange
+    client.cookies.set(PRIMARY_COOKIE, cookie)
+
+    # Act
+    response = client.get("/teams/")
+
+    # Assert
+    assert response.status_code == 200
+    assert len(replica) == 1
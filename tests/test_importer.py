@@ -0,0 +1,84 @@
+from src.export import DataFormat
+from src.importer import import_records, iter_records
+from src.models.bulk import BulkItemResult, BulkItemStatus
+from src.models.hero import HeroCreate
+
+
+async def chunks_of(body: bytes, size: int):
+    for start in range(0, len(body), size):
+        yield body[start : start + size]
+
+
+async def test_iter_records_handles_split_lines_and_quoted_newlines():
+    # Arrange
+    body = 'name,secret_name\r\n"Multi\nLine",x\nZoë,"a ""b"""\n'.encode()
+
+    # Act
+    records = [
+        record async for record in iter_records(chunks_of(body, 3), DataFormat.CSV)
+    ]
+
+    # Assert
+    assert records == [
+        (1, "name,secret_name"),
+        (2, '"Multi\nLine",x'),
+        (4, 'Zoë,"a ""b"""'),
+    ]
+
+
+async def test_import_records_validates_and_writes_in_chunks():
+    # Arrange
+    body = b"\n".join(
+        [
+            b'{"name": "A", "secret_name": "a"}',
+            b'{"name": "B"}',
+            b"not json",
+            b'{"name": "C", "secret_name": "c", "age": 3}',
+            b'{"name": "D", "secret_name": "d"}',
+        ]
+    )
+    written = []
+
+    async def write_chunk(heroes):
+        written.append([hero.name for hero in heroes])
+        return [
+            BulkItemResult(index=index, status=BulkItemStatus.CREATED, id=index)
+            for index, _ in enumerate(heroes)
+        ]
+
+    # Act
+    report = await import_records(
+        chunks_of(body, 7),
+        data_format=DataFormat.NDJSON,
+        schema=HeroCreate,
+        write_chunk=write_chunk,
+        chunk_size=2,
+    )
+
+    # Assert
+    assert written == [["A", "C"], ["D"]]
+    assert (report.rows_read, report.created, report.failed) == (5, 3, 2)
+    assert [(chunk.first_line, chunk.last_line) for chunk in report.chunks] == [
+        (1, 4),
+        (5, 5),
+    ]
+    assert [error.line for error in report.errors] == [2, 3]
+    assert report.errors[0].errors == ["secret_name: Field required"]
+
+
+async def test_import_records_reports_a_line_that_is_not_an_object():
+    # Arrange
+    async def write_chunk(heroes):
+        return []
+
+    # Act
+    report = await import_records(
+        chunks_of(b"[1, 2]\n", 4),
+        data_format=DataFormat.NDJSON,
+        schema=HeroCreate,
+        write_chunk=write_chunk,
+    )
+
+    # Assert
+    assert report.failed == 1
+    assert report.errors[0].errors == ["Each line must be a JSON object"]
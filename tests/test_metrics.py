@@ -0,0 +1,90 @@
+import re
+import time
+
+import src.routers.teams
+from src.metrics import Histogram, RequestMetrics, RequestTiming
+
+
+def test_histogram_renders_cumulative_buckets():
+    # Arrange
+    histogram = Histogram("latency_seconds", "Latency.", ("route",), (0.1, 1))
+
+    # Act
+    for value in (0.05, 0.5, 5):
+        histogram.observe(('/a"b',), value)
+    lines = histogram.render()
+
+    # Assert
+    assert lines == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a\\"b",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a\\"b",le="1"} 2',
+        'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 3',
+        'latency_seconds_sum{route="/a\\"b"} 5.55',
+        'latency_seconds_count{route="/a\\"b"} 3',
+    ]
+
+
+def test_request_metrics_label_unmatched_requests():
+    # Arrange
+    metrics = RequestMetrics()
+
+    # Act
+    metrics.observe("GET", 404, RequestTiming(), 0.002)
+
+    # Assert
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="unmatched",'
+        'status="404"} 1'
+    ) in metrics.render()
+
+
+def test_responses_carry_server_timing(client):
+    # Act
+    response = client.get("/teams/", params={"limit": 2})
+
+    # Assert
+    timing = response.headers["Server-Timing"]
+    assert re.fullmatch(
+        r'db;dur=[\d.]+;desc="[1-9]\d* queries", serialize;dur=[\d.]+, total;dur=[\d.]+',
+        timing,
+    )
+
+
+def test_server_timing_counts_encoding_done_by_the_endpoint(client, monkeypatch):
+    # Arrange
+    teams_to_json = src.routers.teams.teams_to_json
+
+    def slow_teams_to_json(rows, fields):
+        time.sleep(0.05)
+        return teams_to_json(rows, fields)
+
+    monkeypatch.setattr(src.routers.teams, "teams_to_json", slow_teams_to_json)
+
+    # Act
+    response = client.get("/teams/", params={"fields": "name"})
+
+    # Assert
+    serialize = re.search(r"serialize;dur=([\d.]+)", response.headers["Server-Timing"])
+    assert float(serialize.group(1)) >= 50
+
+
+def test_metrics_endpoint_reports_per_route_histograms(client):
+    # Arrange
+    client.get("/heroes/1")
+
+    # Act
+    response = client.get("/metrics")
+
+    # Assert
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    for name in (
+        "http_request_duration_seconds",
+        "http_request_queries",
+        "http_request_query_duration_seconds",
+        "http_request_serialization_duration_seconds",
+    ):
+        assert f"# TYPE {name} histogram" in response.text
+    assert 'route="/heroes/{hero_id}",status="200",le="+Inf"}' in response.text
@@ -0,0 +1,182 @@
+import sqlite3
+
+import pytest
+from sqlmodel import text
+
+from src.database import Database, ensure_schema, get_engine
+from src.migrations import (
+    SCHEMA_VERSION,
+    Backfill,
+    Migration,
+    MigrationProgress,
+    MigrationRunner,
+)
+from src.settings import Settings
+
+# The schema created by the first releases, before it was versioned.
+LEGACY_SCHEMA = [
+    (
+        "CREATE TABLE team (id INTEGER NOT NULL PRIMARY KEY, name VARCHAR NOT NULL, "
+        "headquarters VARCHAR)"
+    ),
+    "CREATE INDEX ix_team_name ON team (name)",
+    (
+        "CREATE TABLE hero (id INTEGER NOT NULL PRIMARY KEY, name VARCHAR NOT NULL, "
+        "secret_name VARCHAR(50), age INTEGER, "
+        "team_id INTEGER REFERENCES team (id) ON DELETE CASCADE, "
+        "hashed_password VARCHAR)"
+    ),
+    "CREATE INDEX ix_hero_name ON hero (name)",
+    "CREATE INDEX ix_hero_age ON hero (age)",
+]
+
+
+def schema_objects(path) -> set[tuple[str, str]]:
+    with sqlite3.connect(path) as connection:
+        rows = connection.execute("SELECT type, name FROM sqlite_master").fetchall()
+    return {(kind, name) for kind, name in rows if not name.startswith("sqlite_")}
+
+
+@pytest.fixture
+def legacy_database(tmp_path):
+    """A database of the pre-versioning schema, with 5 teams of 2 heroes each."""
+    path = tmp_path / "legacy.db"
+    with sqlite3.connect(path) as connection:
+        for statement in LEGACY_SCHEMA:
+            connection.execute(statement)
+        for team_id in range(1, 6):
+            connection.execute(
+                "INSERT INTO team (id, name, headquarters) VALUES (?, ?, 'Gotham')",
+                (team_id, f"Team {team_id}"),
+            )
+            connection.executemany(
+                "INSERT INTO hero (name, secret_name, age, team_id) VALUES (?, ?, ?, ?)",
+                [(f"Hero {team_id}{i}", "Secret", 20 + i, team_id) for i in range(2)],
+            )
+    return path
+
+
+async def test_legacy_database_is_migrated_to_the_current_schema(
+    tmp_path, legacy_database
+):
+    # Arrange
+    fresh = get_engine(f"sqlite+aiosqlite:///{tmp_path / 'fresh.db'}")
+    await ensure_schema(fresh)
+    await fresh.dispose()
+    engine = get_engine(f"sqlite+aiosqlite:///{legacy_database}")
+    progress = []
+
+    # Act
+    applied = await MigrationRunner(
+        engine, batch_size=2, pause_seconds=0, progress=progress.append
+    ).migrate()
+    async with engine.connect() as connection:
+        version = (await connection.execute(text("PRAGMA user_version"))).scalar()
+        counters = (
+            await connection.execute(
+                text("SELECT hero_count, age_sum FROM team_stats ORDER BY team_id")
+            )
+        ).all()
+        found = (
+            await connection.execute(
+                text("SELECT rowid FROM hero_search WHERE hero_search MATCH 'hero'")
+            )
+        ).all()
+        versions = (
+            await connection.execute(text("SELECT DISTINCT version FROM hero"))
+        ).all()
+    await engine.dispose()
+
+    # Assert
+    assert applied == [1]
+    assert version == SCHEMA_VERSION
+    assert schema_objects(legacy_database) == schema_objects(tmp_path / "fresh.db")
+    assert counters == [(2, 41)] * 5
+    assert len(found) == 10
+    assert versions == [(1,)]
+    backfill = [p for p in progress if p.step == "compute the team counters"]
+    assert [(p.done, p.total) for p in backfill] == [(2, 5), (4, 5), (5, 5)]
+
+
+async def test_backfill_releases_the_write_lock_between_batches(tmp_path):
+    # Arrange
+    path = tmp_path / "backfill.db"
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE item (id INTEGER PRIMARY KEY, n INTEGER)")
+        connection.executemany("INSERT INTO item (n) VALUES (?)", [(0,)] * 6)
+    engine = get_engine(f"sqlite+aiosqlite:///{path}")
+    migration = Migration(
+        1,
+        "double",
+        [
+            Backfill(
+                "set n",
+                "item",
+                "UPDATE item SET n = id * 2 WHERE id BETWEEN :first AND :last",
+            )
+        ],
+    )
+    writes = []
+
+    def write_between_batches(progress: MigrationProgress) -> None:
+        # timeout=0: fails at once if the migration still held the write lock.
+        with sqlite3.connect(path, timeout=0) as connection:
+            connection.execute("INSERT INTO item (n) VALUES (-1)")
+        writes.append(progress.done)
+
+    # Act
+    await MigrationRunner(
+        engine, batch_size=2, pause_seconds=0, progress=write_between_batches
+    ).migrate([migration])
+    await engine.dispose()
+
+    # Assert
+    assert writes == [2, 4, 6]
+    with sqlite3.connect(path) as connection:
+        rows = connection.execute("SELECT id, n FROM item ORDER BY id").fetchall()
+    assert rows[:6] == [(i, i * 2) for i in range(1, 7)]
+    assert [n for _, n in rows[6:]] == [-1, -1, -1]
+
+
+async def test_interrupted_migration_runs_again(legacy_database):
+    # Arrange
+    engine = get_engine(f"sqlite+aiosqlite:///{legacy_database}")
+    runner = MigrationRunner(engine, pause_seconds=0, progress=lambda progress: None)
+    await runner.migrate()
+    async with engine.begin() as connection:
+        # As if the process had died before storing the version.
+        await connection.execute(text("PRAGMA user_version=0"))
+
+    # Act
+    applied = await runner.migrate()
+    async with engine.connect() as connection:
+        counters = (
+            await connection.execute(text("SELECT sum(hero_count) FROM team_stats"))
+        ).scalar()
+    await engine.dispose()
+
+    # Assert
+    assert applied == [1]
+    assert counters == 10
+
+
+async def test_startup_migrates_an_existing_database_without_seeding(
+    legacy_database,
+):
+    # Arrange
+    database = Database(
+        Settings(
+            database_name=str(legacy_database.with_suffix("")), seed_sample_data=True
+        )
+    )
+
+    # Act
+    await database.start()
+    async with database.engine.connect() as connection:
+        version = (await connection.execute(text("PRAGMA user_version"))).scalar()
+        heroes = (await connection.execute(text("SELECT count(*) FROM hero"))).scalar()
+    await database.dispose()
+
+    # Assert
+    assert version == SCHEMA_VERSION
+    assert heroes == 10
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+from sqlalchemy import exc
+from sqlmodel import text
+
+from src.database import database, get_engine
+from src.pool import (
+    MonitoredQueuePool,
+    MonitoredStaticPool,
+    PoolConfig,
+    pool_stats,
+)
+from src.settings import Settings
+
+
+def test_pool_config_is_read_from_settings():
+    # Arrange
+    settings = Settings(pool_size=2, pool_max_overflow=0, pool_pre_ping=True)
+
+    # Act
+    options = PoolConfig.from_settings(settings).engine_options()
+
+    # Assert
+    assert options["poolclass"] is MonitoredQueuePool
+    assert (options["pool_size"], options["max_overflow"]) == (2, 0)
+    assert options["pool_pre_ping"] is True
+
+
+def test_static_pool_takes_no_size():
+    # Act
+    options = PoolConfig(kind="static").engine_options()
+
+    # Assert
+    assert options["poolclass"] is MonitoredStaticPool
+    assert "pool_size" not in options
+
+
+async def test_exhausted_pool_records_the_wait(tmp_path):
+    # Arrange
+    engine = get_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        pool=PoolConfig(size=1, max_overflow=0),
+    )
+
+    async def hold(seconds: float) -> None:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+            await asyncio.sleep(seconds)
+
+    # Act
+    await asyncio.gather(hold(0.05), hold(0))
+    stats = pool_stats(engine)
+    await engine.dispose()
+
+    # Assert
+    assert (stats.size, stats.max_overflow, stats.checked_out) == (1, 0, 0)
+    assert stats.checkouts == 2
+    assert stats.waits == 1
+    assert stats.max_wait_seconds > 0
+    assert pool_stats(engine).checkouts == 2  # kept across dispose()
+
+
+async def test_checkout_timeout_is_counted(tmp_path):
+    # Arrange
+    engine = get_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'timeout.db'}",
+        pool=PoolConfig(size=1, max_overflow=0, timeout=0.01),
+    )
+
+    # Act
+    async with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            async with engine.connect():
+                pass
+        during = pool_stats(engine)
+    await engine.dispose()
+
+    # Assert
+    assert (during.checked_out, during.timeouts) == (1, 1)
+    assert pool_stats(engine).checked_out == 0
+
+
+def test_pool_endpoint_reports_the_app_pool(client):
+    # Act
+    response = client.get("/internal/pool")
+
+    # Assert
+    assert response.status_code == 200
+    assert list(response.json()) == ["primary"]
+    assert response.json()["primary"]["pool_class"] == "MonitoredQueuePool"
+    assert response.json()["primary"]["size"] == 5
+
+
+async def test_pool_endpoint_reports_the_replica_pool(client, tmp_path, monkeypatch):
+    # Arrange
+    replica = get_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}",
+        pool=PoolConfig(kind="static"),
+    )
+    monkeypatch.setattr(database, "_replica_engine", replica)
+
+    # Act
+    response = client.get("/internal/pool")
+    await replica.dispose()
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json()["primary"]["pool_class"] == "MonitoredQueuePool"
+    assert response.json()["replica"]["pool_class"] == "MonitoredStaticPool"
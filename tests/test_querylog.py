@@ -0,0 +1,74 @@
+import pytest
+from sqlmodel import select
+
+import src.routers.internal
+from src.models.hero import Hero
+from src.querylog import parameters_shape
+
+
+@pytest.mark.parametrize(
+    ("parameters", "executemany", "shape"),
+    [
+        ((1, "Batman", None), False, "(int, str, NoneType)"),
+        ({"name": "Batman"}, False, "{name: str}"),
+        ([(1, "a"), (2, "b"), (3, "c")], True, "3 x (int, str)"),
+        ((), False, "()"),
+    ],
+)
+def test_parameters_shape_hides_values(parameters, executemany, shape):
+    # Act & Assert
+    assert parameters_shape(parameters, executemany) == shape
+
+
+async def test_statement_repeated_in_a_loop_is_flagged(session, query_log):
+    # Arrange
+    query_log.repeated_statement_threshold = 3
+    heroes = [Hero(name=f"Looped {i}", secret_name="L") for i in range(5)]
+    session.add_all(heroes)
+    await session.commit()
+
+    # Act
+    with query_log.track(route="loop") as tracked:
+        for hero in heroes:
+            await session.exec(select(Hero).where(Hero.id == hero.id))
+
+    # Assert
+    [repeated] = query_log.report().repeated_statements
+    assert repeated.route == "loop"
+    assert repeated.count == 5
+    assert repeated.statement in tracked.statements
+
+
+async def test_slow_query_is_logged_with_its_plan(session, query_log):
+    # Arrange
+    query_log.slow_query_ms = 0
+
+    # Act
+    await session.exec(select(Hero).where(Hero.name == "Batman"))
+
+    # Assert
+    [slow] = [
+        query
+        for query in query_log.report().slow_queries
+        if query.statement.startswith("SELECT")
+    ]
+    assert slow.route is None
+    assert slow.parameters == "(str)"
+    assert any("ix_hero_name" in step for step in slow.plan)
+
+
+def test_findings_are_attributed_to_routes(query_log_client, query_log, monkeypatch):
+    # Arrange
+    query_log.slow_query_ms = 0
+    query_log.repeated_statement_threshold = 1
+    monkeypatch.setattr(src.routers.internal, "query_log", query_log)
+
+    # Act
+    query_log_client.get("/teams/", params={"limit": 5})
+    report = query_log_client.get("/internal/queries").json()
+
+    # Assert
+    assert report["enabled"] is True
+    assert {query["route"] for query in report["slow_queries"]} == {"/teams/"}
+    # Teams and their heroes are loaded with one statement each, not one per team.
+    assert report["repeated_statements"] == []
@@ -0,0 +1,35 @@
+import pytest
+
+from src.crud.hero import HERO_FIELDS
+from src.serialization import InvalidFieldsError, encode_json, parse_fields
+
+
+def test_fields_are_returned_in_canonical_order():
+    # Act
+    fields = parse_fields(" team, id ,name,", HERO_FIELDS)
+
+    # Assert
+    assert fields == ("name", "id", "team")
+
+
+def test_missing_fields_parameter_selects_every_field():
+    # Act
+    fields = parse_fields(None, HERO_FIELDS)
+
+    # Assert
+    assert fields == HERO_FIELDS
+
+
+@pytest.mark.parametrize("value", ["hashed_password", "name,password", "", ","])
+def test_unknown_or_empty_fields_are_rejected(value):
+    # Act / Assert
+    with pytest.raises(InvalidFieldsError):
+        parse_fields(value, HERO_FIELDS)
+
+
+def test_json_is_compact_and_keeps_non_ascii_characters():
+    # Act
+    encoded = encode_json([{"name": "Zoë", "age": None}])
+
+    # Assert
+    assert encoded == '[{"name":"Zoë","age":null}]'.encode()
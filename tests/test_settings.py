@@ -0,0 +1,17 @@
+from src.settings import Settings, get_settings
+
+
+def test_settings_are_read_from_prefixed_environment(monkeypatch):
+    # Arrange
+    monkeypatch.setenv("CRUD_ECHO_SQL", "true")
+    monkeypatch.setenv("CRUD_SQLITE_PROFILE", "default")
+    get_settings.cache_clear()
+
+    # Act
+    settings = get_settings()
+    get_settings.cache_clear()
+
+    # Assert
+    assert settings.echo_sql is True
+    assert settings.sqlite_profile == "default"
+    assert settings.database_name == Settings().database_name